@@ -1,12 +1,25 @@
-import json
+from functools import partial
 import os
-from pathlib import Path
-import time
+from urllib.parse import urlencode
 
 from dotenv import load_dotenv
 import streamlit as st
 
-from insights_renderer import InsightsRenderer
+from columnar_store import open_columnar
+from comparison import (
+    build_comparison, dimension_strength_by_market, framing_by_market, momentum_by_market,
+    persona_share_by_market, shared_themes,
+)
+from data_store import StudyStore
+from insights_renderer import SECTION_TABS, InsightsRenderer
+from jobs import JobRunner
+from precompute_answers import load_answers
+from prerender import fragment_dir
+from reference_ingest import ReferenceIndex
+from search_index import SearchIndex
+from snapshot import open_snapshot
+from space_builder import build_project, build_space
+from theme_history import ThemeHistory
 
 load_dotenv()
 
@@ -18,22 +31,57 @@ if "studies" not in st.session_state:
     st.session_state.studies = []
 if "selected_study" not in st.session_state:
     st.session_state.selected_study = None
+if "jobs" not in st.session_state:
+    st.session_state.jobs = []  # (label, job id) of this session's background work
 
 st.set_page_config(layout="wide")
 
-@st.cache_data
+@st.cache_resource
 def load_all_insights(data_dir="data"):
-    brands = {}
-    for brand_dir in Path(data_dir).iterdir():
-        if not brand_dir.is_dir():
-            continue
-        key = brand_dir.name.lower() 
-        brands.setdefault(key, {})
-        for file in brand_dir.glob("*.json"):
-            brands[key][file.stem] = json.loads(file.read_text())
-    return brands
-
-all_data = load_all_insights()
+    # Manifest only: study payloads are parsed when first selected
+    return StudyStore(data_dir, snapshot=open_snapshot(), columnar=open_columnar())
+
+@st.cache_resource
+def load_search_index():
+    # FTS5 index on disk under build/; only changed studies/notes are re-indexed
+    return SearchIndex()
+
+@st.cache_resource
+def load_theme_history():
+    # Appends one scan per new version of a viewed study to build/theme_history.sqlite
+    return ThemeHistory()
+
+@st.cache_resource
+def load_job_runner():
+    # Shared by all sessions so several projects can build at once
+    return JobRunner(max_workers=4)
+
+store = load_all_insights()
+store.refresh()
+all_data = store.manifest
+
+search_index = load_search_index()
+search_index.update(store)
+theme_history = load_theme_history()
+job_runner = load_job_runner()
+
+def open_study(brand, study, section=None):
+    """Jump to a brand/study (and optionally a section), e.g. from a search hit."""
+    if brand not in all_data or study not in all_data[brand]:
+        return
+    config = st.session_state.get("brand_config") or {}
+    st.session_state.brand_config = {**config, "brand_name": brand}
+    if study != "Global Insights" and study not in [s["name"] for s in st.session_state.studies]:
+        st.session_state.studies.append({"id": str(len(st.session_state.studies) + 1), "name": study})
+    st.session_state.selected_study = study
+    st.session_state.global_configured = True
+    st.session_state.creating_study = False
+    st.session_state.focus_section = section
+
+# Deep links: ?brand=<brand>&study=<study>&section=<section key>
+if "brand" in st.query_params and "study" in st.query_params:
+    open_study(st.query_params["brand"], st.query_params["study"], st.query_params.get("section"))
+    st.query_params.clear()
 
 # 1. Landing page
 if not st.session_state.global_configured:  
@@ -161,6 +209,7 @@ if not st.session_state.global_configured:
                 "Websites & URLs",
                 height=100,
                 placeholder="https://example.com/brand-page\nhttps://competitor.com\nhttps://industry-report.com",
+                key="websites",
                 help="Add websites, brand pages, competitor sites, industry resources (one per line)"
             )
             
@@ -169,6 +218,7 @@ if not st.session_state.global_configured:
                 "Social Media Handles",
                 height=80,
                 placeholder="@brand_handle\n@competitor\n@influencer",
+                key="social_handles",
                 help="List social media accounts that reflect the tone or community of this space. One per line. These will be used for alignment only, not for tracking or monitoring."
             )
         
@@ -177,13 +227,15 @@ if not st.session_state.global_configured:
                 "Upload Documents",
                 accept_multiple_files=True,
                 type=['pdf', 'docx', 'txt', 'csv'],
-                help="Market reports, brand guidelines, research documents"
+                help="Market reports, brand guidelines, research documents. "
+                     "For exports too large to upload, run: python reference_ingest.py <brand> <file or folder>"
             )
             
             st.text_area(
                 "External Report URLs",
                 height=68,
                 placeholder="https://research-firm.com/report.pdf",
+                key="report_urls",
                 help="Links to external research and reports"
             )
             
@@ -194,12 +246,14 @@ if not st.session_state.global_configured:
                     "Brand Keywords",
                     height=80,
                     placeholder="brand name\nproduct line\ncompetitor names\ncampaign hashtags",
+                    key="brand_keywords",
                     help="Brand-specific terms to track (one per line)"
                 )
             with col2:
                 st.text_area(
                     "Cultural Keywords",
                     height=80,
+                    key="cultural_keywords",
                     help="Cultural terms and trends to monitor (one per line)"
                 )
 
@@ -224,8 +278,9 @@ if not st.session_state.global_configured:
             "default_geographies": geographies,
             "default_languages": languages,
             "default_segments": age_groups,
-            "websites": st.session_state.get("websites", []),
-            "social_handles": st.session_state.get("social_handles", []),
+            "websites": st.session_state.get("websites", ""),
+            "social_handles": st.session_state.get("social_handles", ""),
+            "report_urls": st.session_state.get("report_urls", ""),
             "uploaded_files": [f.name for f in uploaded_files] if uploaded_files else [],
             "brand_keywords": st.session_state.get("brand_keywords", ""),
             "cultural_keywords": st.session_state.get("cultural_keywords", "")
@@ -233,66 +288,35 @@ if not st.session_state.global_configured:
 
         if build_clicked:
             if not is_dev_mode:
-                steps = [
-                    ("🔧", "Initializing observatory environment..."),
-                    ("🔗", "Linking relevant data and signal sources..."),
-                    ("🧠", "Applying cultural and contextual frameworks..."),
-                    ("🔍", "Structuring pattern detection models..."),
-                    ("⚡", "Preparing systems for insight extraction..."),
-                    ("🏁", "Finalizing observatory setup..."),
-                ]
-
-                build_container = st.container()
-                
-                with build_container:
-                    build_log = st.empty()
-                    
-                    completed_steps = []
-                    
-                    for i, (emoji, msg) in enumerate(steps):
-                        
-                        current_steps = completed_steps + [f"🔄 {msg}"]
-                        
-                        # Display all steps
-                        log_html = "<div style='font-family: monospace; font-size: 14px; line-height: 1.8;'>"
-                        for step in current_steps[:-1]:  # completed steps
-                            log_html += f"<div style='margin: 5px 0;'>{step}</div>"
-                        # current step with spinner
-                        log_html += f"<div style='margin: 5px 0; animation: pulse 1.5s infinite;'>{current_steps[-1]}</div>"
-                        log_html += "</div>"
-                        
-                        # Add CSS for spinner animation
-                        st.markdown("""
-                        <style>
-                        @keyframes pulse {
-                            0% { opacity: 1; }
-                            50% { opacity: 0.5; }
-                            100% { opacity: 1; }
-                        }
-                        </style>
-                        """, unsafe_allow_html=True)
-                        
-                        build_log.markdown(log_html, unsafe_allow_html=True)
-                        
-                        # Simulate work time
-                        if i in [0, 5]:
-                            time.sleep(1.5)
-                        else:
-                            time.sleep(2.5)
-                        
-                        completed_steps.append(f"✅ {emoji} {msg.replace('...', ' - Complete')}")
-                    
-                    # Final display with all completed steps
-                    final_log_html = "<div style='font-family: monospace; font-size: 14px; line-height: 1.8;'>"
-                    for step in completed_steps:
-                        final_log_html += f"<div style='margin: 5px 0;'>{step}</div>"
-                    final_log_html += "</div>"
-                    
-                    build_log.markdown(final_log_html, unsafe_allow_html=True)
-                    
-                    time.sleep(1)
-                    
-                    st.success("🎉 Observatory Built Successfully!")
+                steps = {
+                    "studies": "🔧 Loading studies",
+                    "search": "🔍 Indexing for search",
+                    "references": "🔗 Ingesting references",
+                    "metrics": "⚡ Precomputing metrics",
+                }
+                build_log = st.empty()
+                progress = {}
+                files = [(f.name, f) for f in uploaded_files or []]
+                references = ReferenceIndex(brand_key)
+
+                def ingest(path, sha256):
+                    # Parsing large uploads happens on the job pool, not in this script run
+                    job_id = job_runner.submit(f"Ingest {path.name}", partial(references.ingest, path, sha256))
+                    st.session_state.jobs.append((f"📎 {path.name}", job_id))
+
+                for event in build_space(store, search_index, st.session_state.brand_config, files, ingest):
+                    if event.step == "done":
+                        break
+                    count = f" ({event.done}/{event.total})" if event.total > 1 else ""
+                    progress[event.step] = (event.done >= event.total, f"{event.message}{count} · {event.elapsed:.1f}s")
+                    log_html = "<div style='font-family: monospace; font-size: 14px; line-height: 1.8;'>"
+                    for step, (finished, detail) in progress.items():
+                        icon = "✅" if finished else "🔄"
+                        log_html += f"<div style='margin: 5px 0;'>{icon} {steps[step]} — {detail}</div>"
+                    log_html += "</div>"
+                    build_log.markdown(log_html, unsafe_allow_html=True)
+
+                st.success(f"🎉 Observatory Built Successfully in {event.elapsed:.1f}s! {event.message}")
             
             st.session_state.selected_study = "Global Insights"
             st.session_state.studies = []
@@ -327,6 +351,17 @@ with st.sidebar:
     if st.button("➕ New Project", use_container_width=True):
         st.session_state.creating_study = True
 
+    can_compare = len(all_data.get(brand, {})) >= 2
+    if not can_compare:
+        # A toggle left on in a space with several studies must not stick disabled-but-on here
+        st.session_state.compare_mode = False
+    st.toggle(
+        "Compare studies",
+        key="compare_mode",
+        disabled=not can_compare,
+        help="Themes, personas, dimensions and framings side by side across this space's studies.",
+    )
+
     brand_options = [b.title() for b in all_data.keys()]
     default_idx = brand_options.index(brand.title()) if brand.title() in brand_options else 0
     selected_brand = st.selectbox("Active Space", brand_options, index=default_idx)
@@ -339,6 +374,49 @@ with st.sidebar:
     if st.button("➕ New Space", use_container_width=True):
         pass
 
+    builds = [(label, job_runner.get(job_id)) for label, job_id in st.session_state.jobs]
+    builds = [(label, job) for label, job in builds if job is not None]
+
+    @st.fragment(run_every=1.0 if any(job.active for _, job in builds) else None)
+    def background_jobs():
+        # Polls only while a job is active; one full rerun once they have all finished
+        jobs = [(label, job_runner.get(job.id)) for label, job in builds]
+        for label, job in jobs:
+            if job.status == "failed":
+                st.error(f"❌ {label}: {job.error}")
+            elif job.active:
+                progress = job.progress
+                detail = progress.message if progress else "Queued..."
+                if progress and progress.total > 1:
+                    detail += f" ({progress.done / progress.total:.0%})"
+                st.caption(f"🔄 {label}: {detail}")
+        if any(job.active for _, job in builds) and not any(job.active for _, job in jobs):
+            st.rerun()
+
+    if builds:
+        background_jobs()
+
+    query = st.text_input("🔎 Search all spaces", placeholder="e.g. halal beauty, run clubs", key="search_query")
+    if query:
+        hits = [h for h in search_index.search(query, limit=20) if h.study in all_data.get(h.brand, {})][:8]
+        reference_hits = ReferenceIndex(brand).search(query, limit=5)  # this space's uploaded documents
+        if not hits and not reference_hits:
+            st.caption("No matches.")
+        for i, hit in enumerate(hits):
+            where = " › ".join((hit.brand.title(), hit.study) + SECTION_TABS.get(hit.section, ()))
+            link = "?" + urlencode({"brand": hit.brand, "study": hit.study, "section": hit.section})
+            st.markdown(f"**{hit.title}**  \n[{where}]({link})")
+            st.caption(hit.snippet)
+            st.button(
+                "Open",
+                key=f"search_hit:{i}",
+                on_click=open_study,
+                args=(hit.brand, hit.study, hit.section),
+            )
+        for hit in reference_hits:
+            st.markdown(f"📎 **{hit.title}**")
+            st.caption(hit.snippet)
+
 # 3. Create Study Form
 if st.session_state.get("creating_study", False):
     st.subheader("Create New Project")
@@ -453,35 +531,61 @@ if st.session_state.get("creating_study", False):
             st.session_state.study_templates_remaining.remove(name)
             st.session_state.selected_study = name
         
-            if not is_dev_mode:
-                steps = [
-                    ("🔧", f"Initializing project '{name}' environment..."),
-                    ("📝", "Generating project structure..."),
-                    ("⚙️", "Integrating parameters and settings..."),
-                    ("🏁", "Finalizing project setup..."),
-                ]
-                log = st.empty()
-                done = []
-                for i, (emoji, msg) in enumerate(steps):
-                    html = "<div style='font-family: monospace;'>"
-                    for step in done:
-                        html += f"<div>✅ {step}</div>"
-                    html += f"<div style='animation: pulse 1.5s infinite;'>🔄 {msg}</div></div>"
-                    st.markdown(
-                        "<style>@keyframes pulse {0%{opacity:1;}50%{opacity:0.5;}100%{opacity:1;}}</style>",
-                        unsafe_allow_html=True
-                    )
-                    log.markdown(html, unsafe_allow_html=True)
-                    time.sleep(1 if i in (0, len(steps)-1) else 1.5)
-                    done.append(f"{emoji} {msg}")
-                # final success
-                st.success(f"🎉 Project '{name}' Created Successfully!")
-        
+            # Setup runs on the shared job pool; the sidebar polls its progress
+            job_id = job_runner.submit(f"Project '{name}'", partial(build_project, store, brand, new))
+            st.session_state.jobs.append((name, job_id))
+
         st.session_state.creating_study = False
         st.rerun()
     st.stop()
 
-# 4. Main Insight Page
+# 4. Comparison Page
+if st.session_state.get("compare_mode"):
+    brand = st.session_state.brand_config["brand_name"]
+    comparison = build_comparison(store, brand)
+    st.markdown(
+        f"<h1 style='text-align:center'>{brand.title()}: Compare Studies</h1>",
+        unsafe_allow_html=True,
+    )
+    for name, error in comparison.errors.items():
+        st.warning(f"{name} is not included: {error}")
+    view = st.radio(
+        "Comparison",
+        ["📖 Shared Themes", "📈 Theme Momentum", "👥 Persona Share", "🔎 Deep Patterns", "🌍 Local Lenses"],
+        horizontal=True,
+        label_visibility="collapsed",
+        key="compare_view",
+    )
+    if view == "📖 Shared Themes":
+        st.caption("Themes that recur across markets (similar names are matched)")
+        shared = shared_themes(comparison.themes)
+        if shared.empty:
+            st.write("No theme appears in more than one study.")
+        else:
+            st.dataframe(shared, hide_index=True, use_container_width=True)
+    elif view == "📈 Theme Momentum":
+        st.caption("Month-over-month growth (%) of each theme by market")
+        st.dataframe(momentum_by_market(comparison.themes).style.format("{:+.0f}%", na_rep="–"),
+                     use_container_width=True)
+    elif view == "👥 Persona Share":
+        st.caption("Audience share (%) of each persona by market")
+        st.dataframe(persona_share_by_market(comparison.personas).style.format("{:.0f}%", na_rep="–"),
+                     use_container_width=True)
+    elif view == "🔎 Deep Patterns":
+        st.caption("Strength of each cultural tension axis by market")
+        if comparison.dimensions.empty:
+            st.write("No dimension data available.")
+        else:
+            st.dataframe(dimension_strength_by_market(comparison.dimensions).fillna("–"), use_container_width=True)
+    else:
+        st.caption("How each market is framed across studies")
+        if comparison.framing.empty:
+            st.write("No framing data available.")
+        else:
+            st.dataframe(framing_by_market(comparison.framing).fillna("–"), hide_index=True, use_container_width=True)
+    st.stop()
+
+# 5. Main Insight Page
 brand = st.session_state.brand_config["brand_name"]
 study = st.session_state.selected_study
 
@@ -494,6 +598,24 @@ if study is None or study not in all_data.get(brand, {}):
     st.error(f"No project selected for {brand}.")
     st.stop()
 
-data = all_data[brand][study]
-renderer = InsightsRenderer(data)
+try:
+    data = store.study(brand, study)
+except ValueError as e:  # StudySchemaError, or JSON caught mid-write on first load
+    st.error(f"Project data for {study} is invalid: {e}")
+    st.stop()
+except OSError as e:
+    st.error(f"Project data for {study} could not be read: {e}")
+    st.stop()
+theme_history.record(store, brand, study)
+renderer = InsightsRenderer(
+    data,
+    content_hash=store.entry(brand, study).checksum,
+    lazy=True,
+    index=store.index(brand, study),
+    focus=st.session_state.pop("focus_section", None),
+    answers=load_answers(store.entry(brand, study)),
+    references=ReferenceIndex(brand),
+    prerendered=fragment_dir(store.entry(brand, study)),
+    history=theme_history.for_study(brand, study),
+)
 renderer.render()
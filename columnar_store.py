@@ -0,0 +1,276 @@
+# columnar_store.py
+"""Partitioned Parquet copy of the tabular parts of every study.
+
+Themes, personas, brokers, framing rows and metaphor rows are written as one
+Parquet file per table and study, in a hive layout:
+
+    build/columnar/<table>/brand=<brand>/study=<study>/part-0.parquet
+
+Readers can project just the columns and partitions they need
+(``ColumnarStore.read("themes", ["title", "volume"], brands=["puma"])``)
+without touching the rest of a study. The "studies" table holds each study's
+checksum and the remaining, non-tabular JSON document. So ``load`` can rebuild
+the original payload and ``data_store.StudyStore`` can serve studies from here
+instead of parsing JSON. Framing and metaphor rows have study-specific
+headers, so they are stored long: one row per (row, column, value).
+
+Scalar and list fields keep their Arrow types; dict-valued fields are stored as
+JSON text. Null fields are dropped on import, the same as an absent key.
+
+Build with:  python columnar_store.py [--data-dir data] [--out build/columnar] [--force]
+"""
+
+import argparse
+import copy
+import json
+import os
+from pathlib import Path
+import shutil
+from urllib.parse import quote
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from data_store import build_manifest
+
+DEFAULT_COLUMNAR_DIR = Path("build") / "columnar"
+TABLES = ("themes", "personas", "brokers", "framing_rows", "metaphor_rows")
+
+# Marks where rows were taken out of the stored document
+_PLACEHOLDER = "$columnar"
+_JSON_COLUMNS = b"json_columns"
+
+
+def _partition(root, table, brand, study):
+    # Same URI encoding pyarrow's hive partitioning decodes on read
+    return Path(root) / table / f"brand={quote(brand, safe='')}" / f"study={quote(study, safe='')}"
+
+
+def _to_table(rows, columns):
+    """Arrow table from dict rows; dict-valued or mixed columns become JSON text."""
+    arrays, json_columns = {}, []
+    for column in columns:
+        values = [row.get(column) for row in rows]
+        try:
+            array = pa.array(values)
+            if pa.types.is_struct(array.type):
+                raise pa.ArrowInvalid("struct")
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            array = pa.array([None if v is None else json.dumps(v, ensure_ascii=False) for v in values], pa.string())
+            json_columns.append(column)
+        arrays[column] = array
+    table = pa.table(arrays)
+    return table.replace_schema_metadata({_JSON_COLUMNS: json.dumps(json_columns).encode()})
+
+
+def _columns(rows, leading):
+    seen = dict.fromkeys(leading)
+    for row in rows:
+        seen.update(dict.fromkeys(row))
+    return list(seen)
+
+
+def _long_rows(items, label, rows_key, prefix):
+    """Framing/metaphor rows as (item position, item title, row position, column, value) records."""
+    records = []
+    for i, item in enumerate(items):
+        for r, row in enumerate(item.get(rows_key) or []):
+            for column, value in row.items():
+                records.append({f"{prefix}_position": i, prefix: item.get(label), "row_position": r,
+                                "column": column, "value": value})
+        if rows_key in item:
+            item[rows_key] = _PLACEHOLDER
+    return records
+
+
+def split_study(data):
+    """Split a study payload into ({table: Arrow table}, remaining document)."""
+    document = copy.deepcopy(data)
+    stories = document.get("stories") or {}
+    influencers = document.get("influencers") or {}
+    tables = {}
+
+    themes = stories.get("themes") or []
+    if "themes" in stories:
+        stories["themes"] = _PLACEHOLDER
+    tables["themes"] = [{"position": i, **t} for i, t in enumerate(themes)], ["position"]
+
+    people = document.get("people") or []
+    if "people" in document:
+        document["people"] = _PLACEHOLDER
+    tables["personas"] = [{"position": i, **p} for i, p in enumerate(people)], ["position"]
+
+    brokers = []
+    for m, market in enumerate(influencers.get("brokers") or []):
+        for b, broker in enumerate(market.get("brokers") or []):
+            brokers.append({"market_position": m, "market": market.get("market"), "position": b, **broker})
+        if "brokers" in market:
+            market["brokers"] = _PLACEHOLDER
+    tables["brokers"] = brokers, ["market_position", "market", "position"]
+
+    tables["framing_rows"] = _long_rows(stories.get("framing") or [], "title", "data", "framing"), []
+    tables["metaphor_rows"] = _long_rows(stories.get("metaphors") or [], "title", "rows", "metaphor"), []
+    return {name: _to_table(rows, _columns(rows, leading)) for name, (rows, leading) in tables.items()}, document
+
+
+def _records(table):
+    json_columns = json.loads((table.schema.metadata or {}).get(_JSON_COLUMNS, b"[]"))
+    rows = table.to_pylist()
+    for row in rows:
+        for column in json_columns:
+            if row[column] is not None:
+                row[column] = json.loads(row[column])
+    return [{k: v for k, v in row.items() if v is not None} for row in rows]
+
+
+def join_study(tables, document):
+    """Inverse of ``split_study``: the full study payload."""
+    data = copy.deepcopy(document)
+    stories = data.get("stories") or {}
+    influencers = data.get("influencers") or {}
+    if stories.get("themes") == _PLACEHOLDER:
+        stories["themes"] = [_strip(r, "position") for r in _records(tables["themes"])]
+    if data.get("people") == _PLACEHOLDER:
+        data["people"] = [_strip(r, "position") for r in _records(tables["personas"])]
+    brokers = _records(tables["brokers"])
+    for m, market in enumerate(influencers.get("brokers") or []):
+        if market.get("brokers") == _PLACEHOLDER:
+            market["brokers"] = [_strip(r, "market_position", "market", "position")
+                                 for r in brokers if r["market_position"] == m]
+    for key, rows_key, prefix, table in (("framing", "data", "framing", "framing_rows"),
+                                         ("metaphors", "rows", "metaphor", "metaphor_rows")):
+        records = _records(tables[table])
+        for i, item in enumerate(stories.get(key) or []):
+            if item.get(rows_key) != _PLACEHOLDER:
+                continue
+            rows = {}
+            for r in records:
+                if r[f"{prefix}_position"] == i:
+                    rows.setdefault(r["row_position"], {})[r["column"]] = r.get("value")
+            item[rows_key] = [rows[r] for r in sorted(rows)]
+    return data
+
+
+def _strip(row, *keys):
+    return {k: v for k, v in row.items() if k not in keys}
+
+
+def _write(table, directory):
+    directory.mkdir(parents=True, exist_ok=True)
+    tmp = directory / "_part-0.parquet.tmp"  # "_" files are skipped by dataset discovery
+    pq.write_table(table, tmp)
+    os.replace(tmp, directory / "part-0.parquet")
+
+
+class ColumnarStore:
+    """Reader over a columnar export; see the module docstring for the layout."""
+
+    def __init__(self, root=DEFAULT_COLUMNAR_DIR):
+        self.root = Path(root)
+        if not (self.root / "studies").is_dir():
+            raise FileNotFoundError(f"No columnar export in {self.root}")
+
+    def checksum(self, brand, study):
+        path = _partition(self.root, "studies", brand, study) / "part-0.parquet"
+        try:
+            return pq.read_table(path, columns=["checksum"]).column("checksum")[0].as_py()
+        except (OSError, pa.ArrowInvalid):
+            return None
+
+    def load(self, entry):
+        """Rebuild a study payload if the stored copy matches ``entry``; None if stale or absent."""
+        if self.checksum(entry.brand, entry.name) != entry.base_checksum:
+            return None
+        try:
+            document = pq.read_table(_partition(self.root, "studies", entry.brand, entry.name) / "part-0.parquet")
+            tables = {name: pq.read_table(_partition(self.root, name, entry.brand, entry.name) / "part-0.parquet")
+                      for name in TABLES}
+        except (OSError, pa.ArrowInvalid):
+            return None
+        if self.checksum(entry.brand, entry.name) != entry.base_checksum:
+            return None  # re-exported while the tables were being read
+        return join_study(tables, json.loads(document.column("document")[0].as_py()))
+
+    def read(self, table, columns=None, brands=None, studies=None):
+        """``table`` rows as a DataFrame with ``brand`` and ``study`` columns.
+
+        Only the requested ``columns`` are read, and only from the partitions
+        matching ``brands`` / ``studies``. Each study's file is read with its
+        own schema (a field may be text in one study and numeric in another)
+        and JSON-encoded columns are decoded.
+        """
+        dataset = ds.dataset(self.root / table, format="parquet", partitioning="hive")
+        condition = None
+        for field, values in (("brand", brands), ("study", studies)):
+            if values is not None:
+                clause = ds.field(field).isin(list(values))
+                condition = clause if condition is None else condition & clause
+        frames = []
+        for fragment in dataset.get_fragments(filter=condition):
+            schema = fragment.physical_schema
+            wanted = schema.names if columns is None else [c for c in columns if c in schema.names]
+            frame = fragment.to_table(columns=wanted, schema=schema).to_pandas()
+            for column in set(json.loads((schema.metadata or {}).get(_JSON_COLUMNS, b"[]"))) & set(wanted):
+                frame[column] = [json.loads(v) if isinstance(v, str) else None for v in frame[column]]
+            keys = ds.get_partition_keys(fragment.partition_expression)
+            frame.insert(0, "study", keys.get("study"))
+            frame.insert(0, "brand", keys.get("brand"))
+            frames.append(frame)
+        if not frames:
+            return pd.DataFrame(columns=["brand", "study", *(columns or [])])
+        return pd.concat(frames, ignore_index=True)
+
+
+def open_columnar(root=DEFAULT_COLUMNAR_DIR):
+    """Open a columnar export, or return None when there is none."""
+    try:
+        return ColumnarStore(root)
+    except FileNotFoundError:
+        return None
+
+
+def export(data_dir="data", root=DEFAULT_COLUMNAR_DIR, force=False):
+    """Write every changed study to ``root``; returns (written, skipped, removed)."""
+    root = Path(root)
+    manifest = build_manifest(data_dir)
+    current = open_columnar(root)
+    written = skipped = 0
+    for brand, studies in manifest.items():
+        for study, entry in studies.items():
+            if not force and current is not None and current.checksum(brand, study) == entry.base_checksum:
+                skipped += 1
+                continue
+            tables, document = split_study(json.loads(entry.path.read_bytes()))
+            # Invalidate first, so no reader pairs the old checksum with half-rewritten tables
+            (_partition(root, "studies", brand, study) / "part-0.parquet").unlink(missing_ok=True)
+            for name, table in tables.items():
+                _write(table, _partition(root, name, brand, study))
+            # Written last: a study counts as exported once its checksum is in place
+            _write(pa.table({"checksum": [entry.base_checksum], "document": [json.dumps(document, ensure_ascii=False)]}),
+                   _partition(root, "studies", brand, study))
+            written += 1
+
+    removed = 0
+    known = {(quote(b, safe=""), quote(s, safe="")) for b, studies in manifest.items() for s in studies}
+    for table in ("studies", *TABLES):
+        for path in sorted((root / table).glob("brand=*/study=*")):
+            if (path.parent.name[len("brand="):], path.name[len("study="):]) not in known:
+                shutil.rmtree(path)
+                removed += table == "studies"
+    return written, skipped, removed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export study tables to partitioned Parquet.")
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--out", default=str(DEFAULT_COLUMNAR_DIR))
+    parser.add_argument("--force", action="store_true", help="rewrite studies whose export is still current")
+    args = parser.parse_args()
+    written, skipped, removed = export(args.data_dir, args.out, args.force)
+    print(f"Exported {written} studies, kept {skipped} current, removed {removed} to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+# comparison.py
+"""Columnar cross-study tables for comparing one brand's market studies.
+
+Each study's themes, personas, dimensions and framings are flattened into
+column lists and concatenated into one long DataFrame per kind, with a
+``study`` column. Comparisons are groupby/pivot operations over those frames.
+
+Markets rarely name the same theme identically ("Herbal Ingredient Surge" vs
+"Herbal Oral Care Surge"), so theme and persona names get a ``key``: names
+from different studies whose TF-IDF cosine similarity reaches
+SIMILARITY_THRESHOLD share the key of the first such name.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import csgraph
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from fragment_cache import FragmentCache
+
+SIMILARITY_THRESHOLD = 0.5
+
+_COMPARISONS = FragmentCache(maxsize=16)
+
+STRENGTH_ORDER = {"Emerging": 1, "Moderate": 2, "Strong": 3}
+
+
+@dataclass(frozen=True, slots=True)
+class BrandComparison:
+    studies: tuple  # study names in store order
+    themes: pd.DataFrame  # study, title, momentum, growth_pct, confidence, volume, maturity, key
+    personas: pd.DataFrame  # study, name, share_pct, key
+    dimensions: pd.DataFrame  # study, axis, strength, key, strength_rank
+    framing: pd.DataFrame  # study, framing, row, column, value
+    errors: dict  # study -> message for studies that failed to load
+
+
+def match_keys(names, studies, threshold=SIMILARITY_THRESHOLD):
+    """Group key for each name: the first name of its cluster of similar names across studies."""
+    names, studies = list(names), np.asarray(studies)
+    if not names:
+        return []
+    try:
+        vectors = TfidfVectorizer(stop_words="english").fit_transform(names)
+    except ValueError:  # only stop words
+        return names
+    similar = (vectors @ vectors.T).tocsr()
+    rows, cols = similar.nonzero()
+    # Two names from the same study are always distinct items
+    keep = (similar.data >= threshold) & (studies[rows] != studies[cols])
+    similar.data = keep.astype(float)
+    similar.eliminate_zeros()
+    _, labels = csgraph.connected_components(similar, directed=False)
+    first = pd.Series(names).groupby(labels).transform("first")
+    return first.tolist()
+
+
+def _frame(columns, match=True):
+    frame = pd.DataFrame(columns)
+    label = frame.columns[1]
+    frame["key"] = match_keys(frame[label], frame["study"]) if match else frame[label]
+    return frame
+
+
+def build_comparison(store, brand):
+    """``BrandComparison`` over every study of ``brand``, cached per set of study checksums."""
+    names = tuple(store.studies(brand))
+    key = (brand, tuple((n, store.entry(brand, n).checksum) for n in names))
+    return _COMPARISONS.get_or_build(key, lambda: _build(store, brand, names))
+
+
+def _build(store, brand, names):
+    themes = {c: [] for c in ("study", "title", "momentum", "growth_pct", "confidence", "volume", "maturity")}
+    personas = {c: [] for c in ("study", "name", "share_pct")}
+    dimensions = {c: [] for c in ("study", "axis", "strength")}
+    framing = {c: [] for c in ("study", "framing", "row", "column", "value")}
+    errors, loaded = {}, []
+    for name in names:
+        try:
+            study = store.study(brand, name)
+        except ValueError as e:
+            errors[name] = str(e)
+            continue
+        loaded.append(name)
+        t = study.stories.themes
+        themes["study"] += [name] * len(t)
+        themes["title"] += [x.title for x in t]
+        themes["momentum"] += [x.momentum for x in t]
+        themes["growth_pct"] += [x.growth_pct for x in t]
+        themes["confidence"] += [x.confidence for x in t]
+        themes["volume"] += [x.volume for x in t]
+        themes["maturity"] += [x.maturity for x in t]
+        personas["study"] += [name] * len(study.people)
+        personas["name"] += [p.name for p in study.people]
+        personas["share_pct"] += [p.share_pct for p in study.people]
+        d = study.stories.dimensions
+        dimensions["study"] += [name] * len(d)
+        dimensions["axis"] += [x.axis for x in d]
+        dimensions["strength"] += [x.strength for x in d]
+        for f in study.stories.framing:
+            for row in f.rows:
+                label = next(iter(row.values()), "")  # first column names the row (e.g. the country)
+                for column, value in list(row.items())[1:]:
+                    framing["study"].append(name)
+                    framing["framing"].append(f.title)
+                    framing["row"].append(label)
+                    framing["column"].append(column)
+                    framing["value"].append(value)
+
+    dimension_frame = _frame(dimensions, match=False)
+    dimension_frame["strength_rank"] = dimension_frame["strength"].map(STRENGTH_ORDER)
+    return BrandComparison(
+        studies=tuple(loaded),
+        themes=_frame(themes).astype({"growth_pct": float, "confidence": float, "volume": float}),
+        personas=_frame(personas).astype({"share_pct": float}),
+        dimensions=dimension_frame,
+        framing=pd.DataFrame(framing),
+        errors=errors,
+    )
+
+
+def shared_themes(themes, min_studies=2):
+    """Themes found in at least ``min_studies`` studies, most widespread first."""
+    grouped = themes.groupby("key").agg(
+        titles=("title", lambda s: " / ".join(dict.fromkeys(s))),
+        studies=("study", "nunique"),
+        markets=("study", lambda s: ", ".join(sorted(set(s)))),
+        mean_confidence=("confidence", "mean"),
+        total_volume=("volume", "sum"),
+        mean_growth_pct=("growth_pct", "mean"),
+    )
+    shared = grouped[grouped["studies"] >= min_studies]
+    return shared.sort_values(["studies", "total_volume"], ascending=False).rename_axis("theme").reset_index()
+
+
+def momentum_by_market(themes):
+    """Theme × study matrix of month-over-month growth (%), matched themes on one row."""
+    table = themes.pivot_table(index="key", columns="study", values="growth_pct", aggfunc="mean")
+    return table.loc[table.mean(axis=1).sort_values(ascending=False).index].rename_axis("theme")
+
+
+def persona_share_by_market(personas):
+    """Persona × study matrix of audience share (%), matched personas on one row.
+
+    Unknown shares (e.g. "Emergent") stay NaN rather than summing to 0%.
+    """
+    table = personas.groupby(["key", "study"])["share_pct"].sum(min_count=1).unstack("study")
+    return table.loc[table.notna().sum(axis=1).sort_values(ascending=False, kind="stable").index].rename_axis("persona")
+
+
+def dimension_strength_by_market(dimensions):
+    """Dimension axis × study matrix of strength labels."""
+    table = dimensions.pivot_table(index="axis", columns="study", values="strength", aggfunc="first")
+    rank = dimensions.groupby("axis")["strength_rank"].max()
+    return table.loc[rank.reindex(table.index).sort_values(ascending=False, kind="stable").index]
+
+
+def framing_by_market(framing):
+    """(framing, row) × study table of framing values, one block per column."""
+    table = framing.pivot_table(
+        index=["framing", "column", "row"], columns="study", values="value", aggfunc="first"
+    )
+    return table.reset_index()
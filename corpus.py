@@ -0,0 +1,100 @@
+# corpus.py
+"""Flatten studies and research notes into small, addressable text documents.
+
+Each ``Document`` carries enough location data (brand, study, section key) to
+deep-link back into the app. Used by the search index and by Kultie retrieval.
+"""
+
+from dataclasses import dataclass
+from pathlib import Path
+import re
+
+from research_docs import load_research
+
+
+@dataclass(frozen=True, slots=True)
+class Document:
+    brand: str
+    study: str
+    section: str  # renderer section key, e.g. "themes", "brokers", "research"
+    title: str
+    body: str
+    source: str  # file the document came from
+
+
+_MD_LINK_RE = re.compile(r"\[([^\]]+)\]\(([^)]+)\)")
+
+
+def _plain(text):
+    """Strip markdown link targets and emphasis so they do not pollute the index."""
+    text = _MD_LINK_RE.sub(r"\1", text)
+    return text.replace("**", "").replace("*", "")
+
+
+def _join(*parts):
+    return "\n".join(_plain(p) for p in parts if p)
+
+
+def study_documents(brand, name, study, source=""):
+    """Yield one Document per theme, persona, broker, idea, etc. of a ``Study``."""
+    def doc(section, title, *parts):
+        return Document(brand, name, section, _plain(title), _join(*parts), source)
+
+    stories = study.stories
+    for t in stories.themes:
+        yield doc("themes", t.title, t.story, t.impact, t.symbolic_meaning, t.value_conflicts,
+                  t.representative_signal, t.evolution, *t.evidence)
+    for d in stories.dimensions:
+        yield doc("dimensions", d.axis, d.intuitive_label, d.narrative, d.key_markers_display)
+    for m in stories.metaphors:
+        rows = [" ".join(str(v) for v in row.values()) for row in m.rows]
+        yield doc("metaphors", m.title, m.metaphor, m.narrative, *rows)
+    for f in stories.framing:
+        rows = [" ".join(str(v) for v in row.values()) for row in f.rows]
+        yield doc("framing", f.title, f.strategic_impact, *rows, *f.evidence)
+    for e in stories.evolution:
+        yield doc("evolution", e.title, e.shift_driver, *(f"{year}: {meaning}" for year, meaning in e.evolution))
+    for p in study.people:
+        yield doc("people", p.name, " ".join(p.traits), p.behaviors, p.implications, *p.evidence)
+
+    influencers = study.influencers
+    for n in influencers.narratives:
+        yield doc("narratives", n.title, n.story, n.takeaway, *n.evidence)
+    for pw in influencers.pathways:
+        yield doc("pathways", pw.name, *(f"{node.label}: {node.tooltip}" for node in pw.nodes))
+    for market in influencers.brokers:
+        for b in market.brokers:
+            yield doc("brokers", f"{b.name} ({market.market})", b.role, b.impact, b.specialty,
+                      b.followers, b.engagement, b.brands_display)
+
+    ideas = study.ideas
+    for h in ideas.hypotheses:
+        yield doc("hypotheses", h.statement, h.source)
+    for g in ideas.gaps:
+        yield doc("gaps", g.title, g.body, g.source)
+    for c in ideas.playbooks:
+        yield doc("playbooks", c.title, c.goal, *c.steps, *c.metrics, c.source)
+    for s in ideas.scenarios:
+        yield doc("scenarios", s.title, s.body, s.source)
+    for r in ideas.recommendations:
+        yield doc("recommendations", r.title, r.body)
+
+
+def research_documents(path, brand="", study=""):
+    """Yield one Document per section and subsection of a research markdown file."""
+    path = Path(path)
+    research = load_research(path)
+
+    def doc(title, body):
+        return Document(brand, study, "research", _plain(title), _plain(body), str(path))
+
+    if research.preamble:
+        yield doc(research.title or path.stem, research.preamble)
+    for section in research.sections:
+        if section.body:
+            yield doc(section.title, section.body)
+        for child in section.children:
+            if child.body:
+                yield doc(child.title, child.body)
+    if research.sources:
+        yield doc("Sources", research.sources)
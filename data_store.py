@@ -0,0 +1,230 @@
+# data_store.py
+
+from dataclasses import dataclass
+import hashlib
+import json
+from pathlib import Path
+import threading
+import time
+
+# Studies whose payload, model and index stay in memory at once (least recently used go first)
+DEFAULT_CACHE_SIZE = 32
+from fragment_cache import FragmentCache
+from study_index import build_index
+from study_journal import journal_path, replay
+from study_model import parse_study
+
+
+@dataclass(frozen=True)
+class StudyEntry:
+    """Manifest record for one study file; built from stat + hash, never parsed."""
+    brand: str
+    name: str
+    path: Path
+    size: int
+    mtime_ns: int
+    checksum: str  # version of the study: the file plus its journal
+    base_checksum: str  # sha256 of the file alone
+    journal_size: int = 0  # bytes in data/<brand>/journal/<study>.jsonl
+
+
+def file_checksum(path, chunk_size=1 << 16):
+    """sha256 of a file, read in chunks so large studies are never held in memory."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def study_checksum(base_checksum, journal_size):
+    """Version of a study file plus its journal (append-only, so its size identifies it)."""
+    if not journal_size:
+        return base_checksum
+    return hashlib.sha256(f"{base_checksum}:{journal_size}".encode()).hexdigest()
+
+
+def _journal_size(path):
+    try:
+        return journal_path(path).stat().st_size
+    except FileNotFoundError:
+        return 0
+
+
+def build_manifest(data_dir="data", previous=None):
+    """Index every data/<brand>/<study>.json as {brand: {study: StudyEntry}}.
+
+    Entries from ``previous`` whose size and mtime are unchanged are reused
+    as-is, so a rescan only hashes files that were actually touched. A grown
+    journal changes the entry's checksum without rehashing the file.
+    """
+    previous = previous or {}
+    manifest = {}
+    root = Path(data_dir)
+    if not root.is_dir():
+        return manifest
+    for brand_dir in sorted(root.iterdir()):
+        if not brand_dir.is_dir():
+            continue
+        key = brand_dir.name.lower()
+        studies = manifest.setdefault(key, {})
+        for file in sorted(brand_dir.glob("*.json")):
+            stat = file.stat()
+            journal = _journal_size(file)
+            known = previous.get(key, {}).get(file.stem)
+            if known and known.size == stat.st_size and known.mtime_ns == stat.st_mtime_ns:
+                if known.journal_size == journal:
+                    studies[file.stem] = known
+                    continue
+                base = known.base_checksum
+            else:
+                base = file_checksum(file)
+            studies[file.stem] = StudyEntry(
+                brand=key,
+                name=file.stem,
+                path=file,
+                size=stat.st_size,
+                mtime_ns=stat.st_mtime_ns,
+                checksum=study_checksum(base, journal),
+                base_checksum=base,
+                journal_size=journal,
+            )
+    return manifest
+
+
+def read_study(entry):
+    """Payload of one study: its file plus its journal, read without a store or manifest scan."""
+    data, _ = replay(json.loads(entry.path.read_bytes()), journal_path(entry.path), 0, entry.journal_size)
+    return data
+
+
+class StudyStore:
+    """Process-wide study registry: a cheap manifest plus payloads parsed on first use.
+
+    ``refresh()`` rescans the tree and swaps in a new manifest; only studies whose
+    checksum changed are re-parsed on their next ``load()``. A file that fails to
+    parse (e.g. caught mid-write) keeps serving its last good version.
+
+    An optional ``snapshot`` (see snapshot.py) seeds the manifest without hashing
+    unchanged files and serves payloads whose checksum still matches the file.
+    An optional ``columnar`` export (see columnar_store.py) serves payloads the
+    same way when the snapshot has no current copy.
+
+    Deltas journaled for a study (see study_journal.py) are replayed on top of
+    its file. When only the journal grew, ``load()`` reads just the new bytes
+    and applies them to the cached payload.
+
+    Payloads, models and indexes are kept for the ``cache_size`` most recently
+    used studies, so memory stays flat however large the corpus grows.
+    """
+
+    def __init__(self, data_dir="data", refresh_interval=2.0, snapshot=None, columnar=None,
+                 cache_size=DEFAULT_CACHE_SIZE):
+        self.data_dir = Path(data_dir)
+        self.refresh_interval = refresh_interval
+        self.snapshot = snapshot
+        self.columnar = columnar
+        self._lock = threading.Lock()
+        seed = snapshot.manifest(self.data_dir) if snapshot is not None else None
+        self._manifest = build_manifest(self.data_dir, previous=seed)
+        self._scanned_at = time.monotonic()
+        self._loaded = FragmentCache(cache_size)  # (brand, study) -> (checksum, dict, file checksum, journal offset)
+        self._models = FragmentCache(cache_size)  # (brand, study, checksum) -> study_model.Study
+        self._indexes = FragmentCache(cache_size)  # (brand, study, checksum) -> study_index.StudyIndex
+
+    @property
+    def manifest(self):
+        return self._manifest
+
+    def brands(self):
+        return list(self._manifest)
+
+    def studies(self, brand):
+        return list(self._manifest.get(brand, {}))
+
+    def entry(self, brand, study):
+        return self._manifest.get(brand, {}).get(study)
+
+    def refresh(self, force=False):
+        """Rescan the data tree if the refresh interval has elapsed.
+
+        Returns the set of (brand, study) keys that were added, changed or removed.
+        """
+        now = time.monotonic()
+        if not force and now - self._scanned_at < self.refresh_interval:
+            return set()
+        old = self._manifest
+        new = build_manifest(self.data_dir, previous=old)
+        changed = set()
+        for brand in set(old) | set(new):
+            before, after = old.get(brand, {}), new.get(brand, {})
+            for study in set(before) | set(after):
+                if before.get(study) != after.get(study):
+                    changed.add((brand, study))
+        with self._lock:
+            self._manifest = new
+            self._scanned_at = now
+            for key in changed:
+                if self.entry(*key) is None:
+                    self._loaded.discard(key)  # models and indexes are keyed by checksum and age out
+        return changed
+
+    def load(self, brand, study):
+        """Parse a study the first time it is requested, or after it changed on disk."""
+        loaded = self._load(brand, study)
+        return None if loaded is None else loaded[1]
+
+    def _load(self, brand, study):
+        """(checksum, payload) of a study's current version, or None if it is unknown."""
+        entry = self.entry(brand, study)
+        if entry is None:
+            return None
+        key = (brand, study)
+        cached = self._loaded.get(key)
+        if cached is not None and cached[0] == entry.checksum:
+            return cached[:2]
+        try:
+            if cached is not None and cached[2] == entry.base_checksum and cached[3] <= entry.journal_size:
+                data, base, start = cached[1], cached[2], cached[3]
+            else:
+                (data, base), start = self._load_file(entry), 0
+            data, offset = replay(data, journal_path(entry.path), start, entry.journal_size)
+        except (OSError, ValueError):
+            if cached is not None:
+                return cached[:2]
+            raise
+        checksum = study_checksum(base, entry.journal_size)
+        self._loaded.put(key, (checksum, data, base, offset))
+        return checksum, data
+
+    def _load_file(self, entry):
+        """(payload, checksum) of the study file alone, from a current snapshot or export if possible."""
+        for source in (self.snapshot, self.columnar):
+            data = source.load(entry) if source is not None else None
+            if data is not None:
+                return data, entry.base_checksum
+        raw = entry.path.read_bytes()
+        return json.loads(raw), hashlib.sha256(raw).hexdigest()
+
+    def study(self, brand, study):
+        """Typed ``Study`` for a study, validated once per file version.
+
+        Raises ``study_model.StudySchemaError`` if the payload is malformed.
+        """
+        loaded = self._study(brand, study)
+        return None if loaded is None else loaded[1]
+
+    def _study(self, brand, study):
+        loaded = self._load(brand, study)
+        if loaded is None:
+            return None
+        checksum, data = loaded
+        return checksum, self._models.get_or_build((brand, study, checksum), lambda: parse_study(data))
+
+    def index(self, brand, study):
+        """Sort/filter indexes for a study, built once per file version."""
+        loaded = self._study(brand, study)
+        if loaded is None:
+            return None
+        checksum, model = loaded
+        return self._indexes.get_or_build((brand, study, checksum), lambda: build_index(model))
@@ -0,0 +1,52 @@
+# fragment_cache.py
+
+from collections import OrderedDict
+import threading
+
+
+class FragmentCache:
+    """Thread-safe, size-bounded LRU for rendered HTML fragments.
+
+    Keys are content-addressed, e.g. (study checksum, section, renderer version),
+    so entries never need explicit invalidation: a changed study or a renderer
+    bump simply produces new keys and the old ones age out.
+    """
+
+    def __init__(self, maxsize=512):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._entries:
+                return default
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def get_or_build(self, key, build):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        value = build()
+        self.put(key, value)
+        return value
+
+    def discard(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,168 @@
+# influence_graph.py
+"""Broker influence scores computed on a sparse graph of a study's influencer data.
+
+Nodes are the brokers plus the steps of every pathway, keyed per pathway since
+step ids ("1", "n1") repeat across pathways. Pathways add a step -> next step
+edge for each hop, and a broker gets an edge to each step whose label or tooltip
+shares a keyword with the broker's own description (the channels it works in,
+e.g. "2.1M TikTok followers" -> "TikTok Algorithm"). Each broker gets three
+scores, all computed with scipy.sparse so they scale to tens of thousands of
+accounts:
+
+* reach: followers × engagement rate;
+* influence: PageRank on the reversed graph, so rank flows back from each step
+  to whoever feeds it. Teleports are half uniform and half in proportion to
+  reach, then scaled so the top broker scores 100;
+* betweenness: Brandes betweenness estimated from a sample of source nodes,
+  i.e. how often a node sits on shortest routes through the network.
+"""
+
+from dataclasses import dataclass
+import re
+
+import numpy as np
+from scipy import sparse
+from scipy.sparse import csgraph
+
+from study_model import parse_count, parse_percent
+
+BETWEENNESS_SAMPLES = 64
+
+_WORD_RE = re.compile(r"[a-z][a-z0-9]{3,}")
+_STOPWORDS = frozenset(
+    "with from into that this their they them across over more most than based "
+    "followers follower engagement average rate high strong network combined".split()
+)
+
+
+@dataclass(frozen=True, slots=True)
+class BrokerScores:
+    """Per-broker scores in ``study_index.StudyIndex.broker_rows`` order."""
+    reach: np.ndarray  # NaN when followers are unknown
+    influence: np.ndarray
+    betweenness: np.ndarray
+
+
+def _keywords(*texts):
+    return {w for text in texts for w in _WORD_RE.findall(str(text).lower())} - _STOPWORDS
+
+
+def _engagement_rate(text):
+    """'Average 45% engagement rate' -> 0.45; None for counts or prose without a percentage."""
+    if "%" not in str(text):
+        return None
+    value = parse_percent(text)
+    return None if value is None else value / 100
+
+
+def _followers(text):
+    try:
+        return parse_count(text)
+    except ValueError:
+        return None
+
+
+def reach_scores(brokers):
+    """followers × engagement rate; brokers without a stated rate use the median rate."""
+    followers = np.array([np.nan if (f := _followers(b.followers)) is None else f for b in brokers], dtype=float)
+    rates = np.array([np.nan if (r := _engagement_rate(b.engagement)) is None else r for b in brokers], dtype=float)
+    known = rates[~np.isnan(rates)]
+    rates[np.isnan(rates)] = np.median(known) if known.size else 1.0
+    return followers * rates
+
+
+def pagerank(adjacency, personalization, alpha=0.85, tol=1e-10, max_iter=200):
+    """PageRank of a sparse adjacency matrix (row -> column) by power iteration."""
+    n = adjacency.shape[0]
+    out = np.asarray(adjacency.sum(axis=1)).ravel()
+    inverse = np.divide(1.0, out, out=np.zeros(n), where=out > 0)
+    transition = (sparse.diags(inverse) @ adjacency).T.tocsr()
+    dangling = out == 0
+    p = personalization / personalization.sum()
+    rank = p.copy()
+    for _ in range(max_iter):
+        updated = alpha * (transition @ rank + rank[dangling].sum() * p) + (1 - alpha) * p
+        converged = np.abs(updated - rank).sum() < tol * n
+        rank = updated
+        if converged:
+            break
+    return rank
+
+
+def sampled_betweenness(adjacency, samples=BETWEENNESS_SAMPLES, seed=0):
+    """Betweenness on the undirected graph, estimated from ``samples`` source nodes.
+
+    Brandes' algorithm per source: shortest-path counts are accumulated down
+    the BFS levels and pair dependencies back up them, so every shortest path
+    counts, not just one per target. Sums are scaled up to all ``n`` sources
+    and halved (each unordered pair is reached from both ends); with
+    ``n <= samples`` the result is exact.
+    """
+    graph = ((adjacency + adjacency.T) > 0).astype(np.float64).tocoo()
+    n = graph.shape[0]
+    if n == 0:
+        return np.zeros(0)
+    sources = np.arange(n) if n <= samples else np.random.default_rng(seed).choice(n, samples, replace=False)
+    dist = csgraph.shortest_path(graph.tocsr(), unweighted=True, indices=sources)
+    rows, cols = graph.row, graph.col
+    scores = np.zeros(n)
+    for source, d in zip(sources, dist):
+        # Edges of the shortest-path DAG, grouped by the level of their lower end
+        dag = np.isfinite(d[rows]) & (d[cols] == d[rows] + 1)
+        order = np.argsort(d[cols[dag]], kind="stable")
+        u, v = rows[dag][order], cols[dag][order]
+        levels = d[v].astype(int)
+        depth = levels[-1] if levels.size else 0
+        bounds = np.searchsorted(levels, np.arange(1, depth + 2))
+        sigma = np.zeros(n)  # shortest paths from source
+        sigma[source] = 1
+        for level in range(depth):
+            at = slice(bounds[level], bounds[level + 1])
+            np.add.at(sigma, v[at], sigma[u[at]])
+        delta = np.zeros(n)  # dependency of source on each node
+        for level in range(depth - 1, -1, -1):
+            at = slice(bounds[level], bounds[level + 1])
+            np.add.at(delta, u[at], sigma[u[at]] / sigma[v[at]] * (1 + delta[v[at]]))
+        delta[source] = 0
+        scores += delta
+    return scores * n / len(sources) / 2
+
+
+def broker_scores(influencers):
+    """``BrokerScores`` for every broker of a ``study_model.Influencers``, markets in file order."""
+    brokers = [b for market in influencers.brokers for b in market.brokers]
+    steps = {}  # (pathway position, step id) -> node number (brokers come first)
+    by_keyword = {}
+    for i, p in enumerate(influencers.pathways):
+        for step in p.nodes:
+            if (i, step.id) not in steps:
+                steps[i, step.id] = node = len(brokers) + len(steps)
+                for word in _keywords(step.label, step.tooltip):
+                    by_keyword.setdefault(word, []).append(node)
+    n = len(brokers) + len(steps)
+
+    rows, cols = [], []
+    for i, p in enumerate(influencers.pathways):
+        for a, b in zip(p.nodes, p.nodes[1:]):
+            rows.append(steps[i, a.id])
+            cols.append(steps[i, b.id])
+    for i, b in enumerate(brokers):
+        for word in _keywords(b.name, b.role, b.impact, b.specialty, b.followers):
+            for node in by_keyword.get(word, ()):
+                rows.append(i)
+                cols.append(node)
+    # Duplicate (row, col) pairs sum, so shared keywords strengthen a link
+    adjacency = sparse.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(n, n))
+
+    reach = reach_scores(brokers)
+    personalization = np.full(n, 0.5 / n) if n else np.zeros(0)
+    known = np.nan_to_num(reach[: len(brokers)])
+    if known.sum() > 0:
+        personalization[: len(brokers)] += 0.5 * known / known.sum()
+    elif n:
+        personalization += 0.5 / n
+    influence = pagerank(adjacency.T.tocsr(), personalization)[: len(brokers)] if n else np.zeros(0)
+    if influence.size and influence.max() > 0:
+        influence = 100 * influence / influence.max()
+    betweenness = sampled_betweenness(adjacency)[: len(brokers)]
+    return BrokerScores(reach=reach, influence=influence, betweenness=betweenness)
@@ -1,14 +1,39 @@
 # customers/insights_renderer.py
 
-from datetime import datetime
+import json
 import os
 import pathlib
+import re
 import time
 
-import openai
+import altair as alt
+import numpy as np
 import pandas as pd
 import streamlit as st
 
+from fragment_cache import FragmentCache
+from llm_client import (
+    DEFAULT_SYSTEM_CONTEXT, KULTIE_MODEL, KULTIE_TEMPERATURE, LLMBusyError, StreamStats, get_client, kultie_messages,
+)
+from pathway_graph import prune_pathways, render_svg, to_dot
+from research_docs import load_research
+from response_cache import ResponseCache, normalize_prompt, response_key
+from retrieval import ContextRetriever, pack_chunks
+from study_index import build_index
+
+# Bump whenever generated HTML changes so cached fragments are not reused
+RENDERER_VERSION = 5
+
+_MARKDOWN_LINK_RE = re.compile(r'\[([^\]]+)\]\(([^)]+)\)')
+
+THEME_SORTS = {"File order": None, "Momentum": "momentum", "Confidence": "confidence",
+               "Volume": "volume", "Maturity": "maturity"}
+PEOPLE_SORTS = {"File order": None, "Share": "share"}
+BROKER_SORTS = {"File order": None, "Influence": "influence", "Reach": "reach", "Betweenness": "betweenness",
+                "Followers": "followers", "Engagement": "engagement"}
+# Pathway maps larger than this are pruned to their most-travelled nodes by default
+PATHWAY_NODE_LIMIT = 300
+
 TOOLTIPS = {
     "stories": {
         "themes": {
@@ -154,7 +179,12 @@ TOOLTIPS = {
                 "followers": "Number of social media followers (reach indicator).",
                 "engagement": "Engagement rate (likes, shares, comments as % of followers).",
                 "specialty": "Main topical focus or specialization of this broker.",
-                "brands": "Brands currently associated or partnered with this broker."
+                "brands": "Brands currently associated or partnered with this broker.",
+                "influence": (
+                    "Network influence (0–100, top broker = 100): PageRank over the brokers and diffusion "
+                    "pathway steps they feed, weighted by reach."
+                ),
+                "reach": "Estimated engaged audience: followers × engagement rate (study median when no rate is given)."
             }
         }
     },
@@ -187,332 +217,259 @@ TOOLTIPS = {
     }
 }
 
-themes2 = [
-            {
-                "title": "AR Commerce Boom",
-                "story": (
-                    "This theme captures a cultural redefinition of how consumers experience shopping in oral care. "
-                    "Augmented reality is no longer just a novelty—it is reshaping expectations of trust and product engagement. "
-                    "Consumers are using AR try-ons to preview outcomes before committing, reframing oral care as a lifestyle "
-                    "decision rather than a commodity purchase. Younger, digital-native consumers are spearheading this shift, "
-                    "seeking experiences that collapse the barrier between digital browsing and physical trial. "
-                    "Retailers like Sephora demonstrate how immersive try-on mirrors influence not just conversion rates "
-                    "but also identity and self-expression in wellness routines."
-                ),
-                "evidence": [
-                    "[Beauty AR Research](https://www.brandxr.io/research-report-how-beauty-brands-are-using-ar-mirrors-to-increase-sales)",
-                    "[AR Use Cases](https://rockpaperreality.com/insights/ar-use-cases/ar-beauty-cosmetics-industry/)"
-                ],
-                "impact": "Invest in AR visualization tools and experiential commerce strategies to build trust and drive conversion.",
-                "first_seen": "2024-01-15",
-                "last_seen": "2025-08-01",
-                "current_volume": 320000, 
-                "previous_volume": 110000,
-                "volume": 3200000,
-                "confidence": 92,
-                "perspectives": {
-                    "Consumers": "Expect seamless, immersive product experiences before purchase.",
-                    "Retailers": "Adopting AR to increase conversion and differentiate from competitors.",
-                    "Tech Providers": "Positioning AR platforms as critical retail infrastructure."
-                },
-                "coder_views": "Consensus among analyst agents: AR enhances trust; younger users see it as playful identity expression.",
-                "interpretive_conflict": "Low disagreement (0.12) – consistent interpretation across coding agents.",
-                "symbolic_meaning": "Represents technology as a trust-building ritual, merging digital and physical identity validation.",
-                "value_conflicts": "Convenience vs authenticity in personal retail experiences.",
-                "representative_signal": "\"This AR try-on convinced me to switch brands—it felt like testing in person.\"",
-                "evolution": "Initially an experiment in beauty and fashion, AR try-ons are now expanding into oral care, framing it as part of a broader self-care ecosystem.",
-                "trend_color": "#FF6B6B"
-            },
-            {
-                "title": "Live Shopping Surge",
-                "story": (
-                    "Live commerce in oral care is transforming the act of purchase into an interactive performance. "
-                    "What began as influencer experiments has matured into a core retail channel where trust is built in real time. "
-                    "Younger consumers engage with oral care products as part of social entertainment, guided by micro-creators "
-                    "who blend expertise with relatability. The theme illustrates a deep shift in value exchange: consumers no longer "
-                    "just buy products—they co-create moments of discovery with the sellers and communities they trust."
-                ),
-                "evidence": [
-                    "[Social Commerce Growth](https://pmc.ncbi.nlm.nih.gov/articles/PMC11346642/)",
-                    "[Live Shopping Insights](https://clear.co/blog/transform-ecomm-with-live-shopping)"
-                ],
-                "impact": "Adopt live shopping formats and influencer partnerships to accelerate consumer trust and conversion.",
-                "first_seen": "2023-10-10",
-                "last_seen": "2025-08-01",
-                "current_volume": 280000, 
-                "previous_volume": 43000,
-                "volume": 1700000,
-                "confidence": 89,
-                "perspectives": {
-                    "Influencers": "Leverage live content as an income channel and credibility platform.",
-                    "Brands": "See live shopping as essential for Gen Z conversion.",
-                    "Consumers": "Treat live shopping as entertainment and trusted advice."
-                },
-                "coder_views": "Most agents framed live shopping as co-creation and social entertainment; one agent noted privacy risks as a counterpoint.",
-                "interpretive_conflict": "Moderate disagreement (0.28) – discussion focused on entertainment value vs surveillance concerns.",
-                "symbolic_meaning": "Embodies commerce as performance and trust-building via human connection.",
-                "value_conflicts": "Spontaneity and entertainment vs consumer data privacy and control.",
-                "representative_signal": "\"I bought toothpaste during a TikTok Live demo—it felt like hanging out with a trusted friend.\"",
-                "evolution": "Once limited to beauty and fashion, live shopping now includes wellness and oral care, driven by consumer comfort with parasocial commerce.",
-                "trend_color": "#FFD93D"
-            },
-            {
-                "title": "Herbal Toothpaste Shift",
-                "story": (
-                    "This theme reflects a reframing of oral care as part of a holistic wellness practice. "
-                    "Herbal toothpaste represents a rejection of purely synthetic formulations in favor of ingredient transparency, "
-                    "sustainability, and ancestral wisdom. The rise of neem, clove, and bamboo-based products is more than just "
-                    "a materials trend—it signifies consumers making oral care choices aligned with values of environmental ethics "
-                    "and personal health sovereignty."
-                ),
-                "evidence": [
-                    "[Herbal Toothpaste Market](https://www.mordorintelligence.com/industry-reports/herbal-toothpaste-market)",
-                    "[Ingredient Trends](https://jdentalpanacea.org/article-details/21501)"
-                ],
-                "impact": "Develop herbal formulations and emphasize transparency and sustainability to meet shifting consumer expectations.",
-                "first_seen": "2024-08-20",
-                "last_seen": "2025-08-01",
-                "current_volume": 120000, 
-                "previous_volume": 111000,
-                "volume": 1200000,
-                "confidence": 87,
-                "perspectives": {
-                    "Consumers": "Seek alignment with natural and sustainable lifestyles.",
-                    "Brands": "Use herbal differentiation to stand out in crowded markets.",
-                    "Regulators": "Increase scrutiny on ingredient labeling and health claims."
-                },
-                "coder_views": "Agents consistently interpreted herbal oral care as symbolic of natural living and ancestral wisdom; one flagged market hype risk.",
-                "interpretive_conflict": "Low disagreement (0.15) – convergence on wellness symbolism.",
-                "symbolic_meaning": "Represents purity, ancestral wisdom, and harmony with nature.",
-                "value_conflicts": "Traditional knowledge vs modern science; authenticity vs marketing greenwashing.",
-                "representative_signal": "\"Finally switched to bamboo toothpaste—healthier and eco-friendly!\"",
-                "evolution": "Once niche health-store offerings, herbal oral care products are now mainstreamed through online marketplaces and major retail chains.",
-                "trend_color": "#34D399"
-            },
-            {
-                "title": "Digital Gifting Growth",
-                "story": (
-                    "Digital gifting is reframing oral care as part of a broader culture of wellness exchange. "
-                    "What was once a private personal hygiene product is now positioned as a thoughtful gift, signaling "
-                    "care for health and wellbeing. This shift is driven by digital gifting platforms and consumer interest in "
-                    "expressive, non-traditional wellness gifting—blurring the line between personal use and social gesture."
-                ),
-                "evidence": [
-                    "[Online Gifting Trends](https://ecommercecoffeebreak.com/rise-of-online-gifting-and-how-ecommerce-brands-can-leverage-this-sales-channel/)",
-                    "[Dental Gifting Ideas](https://www.dennishahndds.com/dental-gift-ideas-unique-and-thoughtful-gifts-for-a-healthy-smile/)"
-                ],
-                "impact": "Position oral care products as premium wellness gifts and integrate into curated digital gifting platforms.",
-                "first_seen": "2023-12-01",
-                "last_seen": "2025-08-01",
-                "current_volume": 95000, 
-                "previous_volume": 53000,
-                "volume": 950000,
-                "confidence": 84,
-                "perspectives": {
-                    "Consumers": "See oral care as part of expressing wellbeing and care for others.",
-                    "E-commerce Platforms": "Expand curated gifting categories to wellness products.",
-                    "Brands": "Reframe oral care as part of premium self-care gifting."
-                },
-                "coder_views": "Agents agreed on gifting as symbolic care and wellness signaling; divergent views on commodification of intimacy.",
-                "interpretive_conflict": "Moderate disagreement (0.22) – debate over authenticity of digital gift-giving.",
-                "symbolic_meaning": "Frames wellness products as relational tokens of care and status.",
-                "value_conflicts": "Authenticity of gesture vs commercialization of personal expression.",
-                "representative_signal": "\"I gifted a premium electric toothbrush as a wellness present—it was surprisingly appreciated.\"",
-                "evolution": "Gifting trends have expanded from digital vouchers to curated health and wellness bundles, normalizing oral care as a luxury wellness item.",
-                "trend_color": "#60A5FA"
-            },
-            {
-                "title": "Micro-Influencer Effect",
-                "story": (
-                    "This theme captures a shift from celebrity-driven marketing to authentic, community-level influence. "
-                    "Micro-influencers in oral care have higher engagement because they embody relatability and trust. "
-                    "The emphasis has moved from one-off endorsements to long-term creator partnerships, reflecting a cultural "
-                    "demand for authenticity and sustained relationship-building between consumers and brands."
-                ),
-                "evidence": [
-                    "[Micro-Influencer Impact](https://stackinfluence.com/beauty-brands-that-work-with-micro-influencers/)",
-                    "[Creator Partnerships](https://stackinfluence.com/micro-influencer-tips-brand-partnerships-2025/)"
-                ],
-                "impact": "Develop long-term partnerships with micro-influencers for sustainable brand advocacy.",
-                "first_seen": "2024-07-18",
-                "last_seen": "2025-08-01",
-                "current_volume": 140000, 
-                "previous_volume": 56000,
-                "volume": 1400000,
-                "confidence": 90,
-                "perspectives": {
-                    "Micro-Influencers": "Seek sustainable brand relationships with creative freedom.",
-                    "Consumers": "View micro-creators as authentic and trustworthy sources.",
-                    "Brands": "Shift budgets from celebrity endorsements to micro-influencer ecosystems."
-                },
-                "coder_views": "Agents emphasized authenticity and community-building as core meanings; one agent noted risk of saturation and distrust.",
-                "interpretive_conflict": "Low disagreement (0.18) – consensus on shift from celebrity to relatable creators.",
-                "symbolic_meaning": "Represents decentralization of influence and grassroots trust-building.",
-                "value_conflicts": "Authenticity vs monetization; individuality vs algorithm-driven sameness.",
-                "representative_signal": "\"I trust micro-influencers more than celebrity endorsements—they feel genuine.\"",
-                "evolution": "Influencer marketing has evolved from transaction-based celebrity shoutouts to community-rooted, long-term partnerships with relatable creators.",
-                "trend_color": "#F97316"
-            }
-        ]
+# Section key (as used by corpus.Document.section) -> labels of the tabs that show it
+SECTION_TABS = {
+    "themes": ("Stories", "📖 Themes"),
+    "dimensions": ("Stories", "🔎 Deep Patterns"),
+    "metaphors": ("Stories", "🔗 Shared Signals"),
+    "framing": ("Stories", "🌍 Local Lenses"),
+    "evolution": ("Stories", "🧠 Word Shifts"),
+    "people": ("People",),
+    "narratives": ("Influencers", "🕸️ Network Types"),
+    "pathways": ("Influencers", "🛤️ Diffusion Paths"),
+    "brokers": ("Influencers", "👑 Key Brokers"),
+    "hypotheses": ("Ideas", "🧪 Hypotheses"),
+    "gaps": ("Ideas", "🔍 Opportunity Gaps"),
+    "playbooks": ("Ideas", "🎨 Culture Creation"),
+    "scenarios": ("Ideas", "❓ What If"),
+    "recommendations": ("Ideas", "🚀 Actions"),
+    "research": ("Kultie ✨",),
+}
+
+_FRAGMENTS = FragmentCache(maxsize=512)
+# TF-IDF retrievers per (study checksum, research file version)
+_RETRIEVERS = FragmentCache(maxsize=32)
+
+# Kultie answers shared across sessions and restarts (build/kultie_cache.sqlite)
+_RESPONSES = ResponseCache(ttl=24 * 3600, max_entries=2000)
+
+# Seconds a Kultie answer may take, end to end, before it is cut off
+KULTIE_TIMEOUT = 60.0
+
+# Upstream Kultie calls allowed at once across all sessions; the rest queue
+KULTIE_MAX_CONCURRENCY = 8
+
+# Max tokens of retrieved study/research excerpts sent with each Kultie question
+CONTEXT_TOKEN_BUDGET = 1500
+# ...and from the space's uploaded reference documents
+REFERENCE_TOKEN_BUDGET = 800
 
 class InsightsRenderer:
-    def __init__(self, data: dict):
-        self.data = data
+    def __init__(self, study, content_hash=None, lazy=False, index=None, focus=None, answers=None,
+                 references=None, prerendered=None, history=None):
+        self.study = study
+        # Precomputed sort orders / filter facets for themes, people and brokers
+        self.index = index if index is not None else build_index(study)
+        # Checksum of the study file; enables the shared HTML fragment cache
+        self.content_hash = content_hash
+        # Lazy mode swaps st.tabs for a selector so only the chosen section executes
+        self.lazy = lazy
+        # Section key to open on this run (e.g. from a search result); lazy mode only
+        self.focus = SECTION_TABS.get(focus, ())
+        # {normalized question: (question, answer)} precomputed for this study version
+        self.answers = answers or {}
+        # reference_ingest.ReferenceIndex of the space's uploaded documents
+        self.references = references
+        # Directory of fragments compiled by prerender.py for this study version
+        self.prerendered = pathlib.Path(prerendered) if prerendered else None
+        # theme_history.StudyHistory of this study's scans, for trend charts
+        self.history = history
 
     def render(self):
-        stories = self.data.get("stories", {})
-        people = self.data.get("people", [])
-        influencers = self.data.get("influencers", {})
-        ideas = self.data.get("ideas", {})
-        context = self.data.get("ai_context", {})
-
-        tabs = st.tabs(["Stories", "People", "Influencers", "Ideas", "Kultie ✨"])
-        with tabs[0]:
-            self._render_stories(stories)
-        with tabs[1]:
-            self._render_people(people)
-        with tabs[2]:
-            self._render_influencers(influencers)
-        with tabs[3]:
-            self._render_ideas(ideas)
-        with tabs[4]:
-            self._render_ask(context)
+        stories = self.study.stories
+        people = self.study.people
+        influencers = self.study.influencers
+        ideas = self.study.ideas
+        context = self.study.ai_context
+
+        self._render_tabs("main", [
+            ("Stories", stories, self._render_stories),
+            ("People", people, self._render_people),
+            ("Influencers", influencers, self._render_influencers),
+            ("Ideas", ideas, self._render_ideas),
+            ("Kultie ✨", context, self._render_ask),
+        ])
+
+    def _render_tabs(self, key, sections):
+        """Render (label, data, fn) sections as tabs.
+
+        st.tabs executes every tab body on each rerun; in lazy mode a horizontal
+        selector is used instead and only the selected section's fn is called.
+        """
+        labels = [label for label, _, _ in sections]
+        if not self.lazy:
+            tabs = st.tabs(labels)
+            for (label, data, fn), tab in zip(sections, tabs):
+                with tab:
+                    fn(data)
+            return
+        widget_key = f"tab:{key}:{'|'.join(labels)}"
+        target = next((label for label in labels if label in self.focus), None)
+        if target is not None:
+            st.session_state[widget_key] = target
+        choice = st.radio(
+            key,
+            labels,
+            horizontal=True,
+            label_visibility="collapsed",
+            key=widget_key,
+        )
+        _, data, fn = sections[labels.index(choice)]
+        fn(data)
+
+    def _fragments(self, section, build, data):
+        """Build a section's HTML once per (study content, section, renderer version)."""
+        if self.content_hash is None:
+            return build(data)
+        key = (self.content_hash, section, RENDERER_VERSION)
+        return _FRAGMENTS.get_or_build(key, lambda: self._prerendered(section) or build(data))
+
+    def _prerendered(self, section):
+        """Fragments for ``section`` from prerender.py output, or None if not compiled.
+
+        Paged sections are keyed (name, positions) and stitched from the
+        per-item fragments of the full list.
+        """
+        if self.prerendered is None:
+            return None
+        name, positions = section if isinstance(section, tuple) else (section, None)
+        items = _FRAGMENTS.get_or_build(
+            (self.content_hash, ("prerendered", name), RENDERER_VERSION), lambda: self._read_fragments(name)
+        )
+        if items is None or positions is None:
+            return items
+        return [items[i] for i in positions]
+
+    def _read_fragments(self, name):
+        try:
+            return json.loads((self.prerendered / f"{name}.json").read_text())
+        except (OSError, ValueError):
+            return None
+
+    def _list_controls(self, key, list_index, sorts, facets, page_size):
+        """Sort, filter and page widgets for a long list; returns (visible positions, total)."""
+        if list_index.size == 0:
+            return [], 0
+        cols = st.columns([2, 3, 1])
+        sort_label = cols[0].selectbox("Sort by", list(sorts), key=f"{key}:sort")
+        filters = {}
+        with cols[1]:
+            for facet, label in facets.items():
+                options = sorted(list_index.facets[facet])
+                filters[facet] = st.multiselect(label, options, key=f"{key}:{facet}:{'|'.join(options)}")
+        _, total = list_index.select(sorts[sort_label], filters, page=1, page_size=page_size)
+        pages = max(1, -(-total // page_size))
+        page = 1
+        if pages > 1:
+            page = cols[2].number_input("Page", min_value=1, max_value=pages, value=1, key=f"{key}:page:{total}")
+        positions, _ = list_index.select(sorts[sort_label], filters, page=page, page_size=page_size)
+        if pages > 1:
+            st.caption(f"Showing {(page - 1) * page_size + 1}–{(page - 1) * page_size + len(positions)} of {total}")
+        return positions, total
 
     def _parse_markdown_links(self, text):
         """Convert markdown-style links [text](url) to HTML <a> tags"""
-        import re
         # if they passed a list of strings, join into one
         if isinstance(text, (list, tuple)):
             text = "<br>".join(text)
-        pattern = r'\[([^\]]+)\]\(([^)]+)\)'
-        return re.sub(pattern, r'<a href="\2" target="_blank">\1</a>', text)
+        return _MARKDOWN_LINK_RE.sub(r'<a href="\2" target="_blank">\1</a>', text)
     
     def _render_stories(self, stories):
         # 1. Collect only non-empty sections
         sections = []
-        if stories.get("themes"):
-            sections.append(("📖 Themes", stories["themes"]))
-        if stories.get("dimensions"):
-            sections.append(("🔎 Deep Patterns", stories["dimensions"]))
-        if stories.get("metaphors"):
-            sections.append(("🔗 Shared Signals", stories["metaphors"]))
-        if stories.get("framing"):
-            sections.append(("🌍 Local Lenses", stories["framing"]))
-        if stories.get("evolution"):
-            sections.append(("🧠 Word Shifts", stories["evolution"]))
+        if stories.themes:
+            sections.append(("📖 Themes", stories.themes, self._render_themes))
+        if stories.dimensions:
+            sections.append(("🔎 Deep Patterns", stories.dimensions, self._render_dimensions))
+        if stories.metaphors:
+            sections.append(("🔗 Shared Signals", stories.metaphors, self._render_metaphors))
+        if stories.framing:
+            sections.append(("🌍 Local Lenses", stories.framing, self._render_framing))
+        if stories.evolution:
+            sections.append(("🧠 Word Shifts", stories.evolution, self._render_evolution))
 
         # 2. If nothing to show, bail out
         if not sections:
             st.write("No story data available.")
             return
 
-        # 3. Create tabs dynamically
-        labels, datas = zip(*sections)
-        tabs = st.tabs(labels)
-
-        # 4. Dispatch each tab to its renderer
-        for (label, data), tab in zip(sections, tabs):
-            with tab:
-                if label == "📖 Themes":
-                    self._render_themes(data)
-                elif label == "🔎 Deep Patterns":
-                    self._render_dimensions(data)
-                elif label == "🔗 Shared Signals":
-                    self._render_metaphors(data)
-                elif label == "🌍 Local Lenses":
-                    self._render_framing(data)
-                elif label == "🧠 Word Shifts":
-                    self._render_evolution(data)
+        # 3. Create tabs dynamically and dispatch each to its renderer
+        self._render_tabs("stories", sections)
        
     def _render_themes(self, themes):
         st.caption("Observable stories and behaviors shaping culture right now • Last scan: 2 hours ago")
-                         
-        def format_number(n):
-            """Convert raw integers to readable strings (e.g., 210000 -> 210k)."""
-            if n >= 1_000_000:
-                return f"{n/1_000_000:.1f}M"
-            if n >= 1_000:
-                return f"{n/1_000:.0f}k"
-            return str(n)
-
-        def derive_momentum(current_volume, previous_volume):
-            """
-            Derive velocity, growth percentage, and momentum label.
-            """
-            velocity = current_volume - previous_volume
-
-            if previous_volume <= 0:
-                growth_pct = 100.0 if velocity > 0 else 0.0
-            else:
-                growth_pct = (velocity / previous_volume) * 100
-
-            if growth_pct > 50:
-                label = "Surging"
-            elif growth_pct > 10:
-                label = "Rising"
-            elif growth_pct > -10:
-                label = "Stable"
-            elif growth_pct > -50:
-                label = "Plateauing"
-            else:
-                label = "Declining"
-
-            return label, growth_pct, velocity
-
-        def derive_maturity(first_seen, last_seen):
-            """Map theme lifecycle stage based on observation period."""
-            first_date = datetime.strptime(first_seen, "%Y-%m-%d")
-            last_date = datetime.strptime(last_seen, "%Y-%m-%d")
-            months = (last_date.year - first_date.year) * 12 + (last_date.month - first_date.month)
-            if months < 3:
-                return "Nascent"
-            elif months < 6:
-                return "Emerging"
-            elif months < 18:
-                return "Scaling"
-            elif months >= 18:
-                return "Established"
-            # Optionally, you could include Established or Declining logic based on longer observation.
-
-        for idx, nar in enumerate(themes2):
-            confidence_pct = int(nar["confidence"])
-            evidence_html = self._parse_markdown_links(nar["evidence"])
-            theme_tooltips = TOOLTIPS["stories"]["themes"]
-
-            maturity = derive_maturity(nar["first_seen"], nar["last_seen"])
-
-            momentum_label, growth_pct, velocity = derive_momentum(
-                nar["current_volume"], nar["previous_volume"]
+        positions, _ = self._list_controls(
+            "themes", self.index.themes, THEME_SORTS, {"maturity": "Maturity", "momentum": "Momentum"}, page_size=10
+        )
+        visible = [themes[i] for i in positions]
+        trends = self._theme_trends(visible)
+        for theme, card_html in zip(visible, self._fragments(("themes", tuple(positions)), self._themes_html, visible)):
+            st.markdown(card_html, unsafe_allow_html=True)
+            points = trends.get(theme.title)
+            if points is not None and len(points) > 1:
+                st.altair_chart(self._sparkline(points, theme.trend_color), use_container_width=True)
+
+    def _theme_trends(self, themes):
+        """{theme title: bucketed history} for the given themes, if a history store is attached."""
+        if self.history is None or not themes:
+            return {}
+        series = self.history.series()
+        if series.empty:
+            return {}
+        with st.expander(f"📈 Volume trends across scans ({series['date'].nunique()} dates)"):
+            titles = [t.title for t in themes]
+            shown = series[series["theme"].isin(titles)]
+            chart = alt.Chart(shown).mark_line(point=True).encode(
+                x=alt.X("date:T", title=None),
+                y=alt.Y("volume:Q", title="Signals"),
+                color=alt.Color("theme:N", sort=titles, legend=alt.Legend(orient="bottom", columns=2)),
+                tooltip=["theme:N", "date:T", alt.Tooltip("volume:Q", format=",.0f"),
+                         alt.Tooltip("rolling_volume:Q", title="rolling mean", format=",.0f"),
+                         alt.Tooltip("rolling_growth_pct:Q", title="rolling growth %", format="+.1f")],
             )
-            momentum_display = f"{momentum_label} ({growth_pct:+.1f}% MoM)"
-            volume_str = f'{format_number(nar["volume"])} signals'
-            sign = "+" if velocity > 0 else ""
-            velocity_str = f'{sign}{format_number(velocity)} signals (MoM)'
+            st.altair_chart(chart, use_container_width=True)
+        return {title: points for title, points in series.groupby("theme", sort=False)}
+
+    def _sparkline(self, points, color):
+        base = alt.Chart(points).encode(x=alt.X("date:T", axis=None))
+        volume = base.mark_line(color=color, point=alt.OverlayMarkDef(color=color, size=20)).encode(
+            y=alt.Y("volume:Q", axis=None, scale=alt.Scale(zero=False)),
+            tooltip=[alt.Tooltip("date:T"), alt.Tooltip("volume:Q", title="signals", format=",.0f"),
+                     alt.Tooltip("points:Q", title="scans")],
+        )
+        rolling = base.mark_line(color=color, strokeDash=[4, 3], opacity=0.6).encode(y="rolling_volume:Q")
+        return (volume + rolling).properties(height=60)
+
+    def _themes_html(self, themes):
+        theme_tooltips = TOOLTIPS["stories"]["themes"]
+        cards = []
+        for idx, nar in enumerate(themes):
+            evidence_html = self._parse_markdown_links(nar.evidence)
 
             perspectives_html = "".join(
                 f'<li><strong>{actor}:</strong> {view}</li>'
-                for actor, view in nar.get("perspectives", {}).items()
+                for actor, view in nar.perspectives
             )
 
             card_html = f"""
-            <div style="border: 2px solid {nar['trend_color']}; border-radius: 8px; padding: 16px; margin-bottom: 16px;">
+            <div style="border: 2px solid {nar.trend_color}; border-radius: 8px; padding: 16px; margin-bottom: 16px;">
                 <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 8px;">
-                    <strong style="font-size: 16px;" title="{theme_tooltips['title']}">{nar['title']}</strong>
-                    <b><small style="background-color: {nar['trend_color']}; color: black; padding: 2px 6px; border-radius: 4px; font-size: 14px;"
-                        title="{theme_tooltips['maturity']}">{maturity}</small></b>
+                    <strong style="font-size: 16px;" title="{theme_tooltips['title']}">{nar.title}</strong>
+                    <b><small style="background-color: {nar.trend_color}; color: black; padding: 2px 6px; border-radius: 4px; font-size: 14px;"
+                        title="{theme_tooltips['maturity']}">{nar.maturity}</small></b>
                 </div>
                 <div style="display: grid; grid-template-columns: 1fr 1fr; gap: 8px; margin: 12px 0;">
-                    <div title="{theme_tooltips['momentum']}"><strong>Momentum:</strong> {momentum_display}</div>
-                    <div title="{theme_tooltips['confidence']}"><strong>Confidence:</strong> {confidence_pct}%</div>
-                    <div title="{theme_tooltips['volume']}"><strong>Volume:</strong> {volume_str}</div>
-                    <div title="{theme_tooltips['velocity']}"><strong>Velocity:</strong> {velocity_str}</div>
+                    <div title="{theme_tooltips['momentum']}"><strong>Momentum:</strong> {nar.momentum_display}</div>
+                    <div title="{theme_tooltips['confidence']}"><strong>Confidence:</strong> {nar.confidence}%</div>
+                    <div title="{theme_tooltips['volume']}"><strong>Volume:</strong> {nar.volume_display}</div>
+                    <div title="{theme_tooltips['velocity']}"><strong>Velocity:</strong> {nar.velocity_display}</div>
                 </div>
                 <details style="margin-top: 16px; border-radius: 8px; overflow: hidden;">
                     <summary style="font-weight: bold; cursor: pointer;">Full Details</summary>
                     <div style="padding: 0 16px 16px; border-top: 1px solid; line-height: 1.6;">
                         <section style="margin: 12px 0;" title="{theme_tooltips['story']}">
                             <h4 style="margin: 0 0 4px; font-size: 14px;">Story</h4>
-                            <p style="margin: 0;">{nar['story']}</p>
+                            <p style="margin: 0;">{nar.story}</p>
                         </section>
                         <section style="margin: 12px 0;" title="{theme_tooltips['perspectives']}">
                             <h4 style="margin: 0 0 4px; font-size: 14px;">Stakeholder Perspectives</h4>
@@ -520,23 +477,23 @@ class InsightsRenderer:
                         </section>
                         <section style="margin: 12px 0;" title="{theme_tooltips['coder_views']}">
                             <h4 style="margin: 0 0 4px; font-size: 14px;">Analyst Perspectives (Multi-Agent)</h4>
-                            <p style="margin: 0;">{nar.get('coder_views','No divergent coder views captured')}</p>
+                            <p style="margin: 0;">{nar.coder_views or 'No divergent coder views captured'}</p>
                         </section>
                         <section style="margin: 12px 0;" title="{theme_tooltips['symbolic_meaning']}">
                             <h4 style="margin: 0 0 4px; font-size: 14px;">Symbolic Meaning</h4>
-                            <p style="margin: 0;">{nar.get('symbolic_meaning','No symbolic/archetypal interpretation provided')}</p>
+                            <p style="margin: 0;">{nar.symbolic_meaning or 'No symbolic/archetypal interpretation provided'}</p>
                         </section>
                         <section style="margin: 12px 0;" title="{theme_tooltips['value_conflicts']}">
                             <h4 style="margin: 0 0 4px; font-size: 14px;">Value Conflicts</h4>
-                            <p style="margin: 0;">{nar.get('value_conflicts','No explicit value conflicts detected')}</p>
+                            <p style="margin: 0;">{nar.value_conflicts or 'No explicit value conflicts detected'}</p>
                         </section>
                         <section style="margin: 12px 0;" title="{theme_tooltips['representative_signal']}">
                             <h4 style="margin: 0 0 4px; font-size: 14px;">Representative Signal</h4>
-                            <p style="margin: 0;">{nar['representative_signal']} <a href='#'>(source)</a></p>
+                            <p style="margin: 0;">{nar.representative_signal} <a href='#'>(source)</a></p>
                         </section>
                         <section style="margin: 12px 0;" title="{theme_tooltips['evolution']}">
                             <h4 style="margin: 0 0 4px; font-size: 14px;">Evolution</h4>
-                            <p style="margin: 0;">{nar['evolution']}</p>
+                            <p style="margin: 0;">{nar.evolution}</p>
                         </section>
                         <section style="margin: 12px 0;" title="{theme_tooltips['evidence']}">
                             <h4 style="margin: 0 0 4px; font-size: 14px;">Evidence</h4>
@@ -544,21 +501,28 @@ class InsightsRenderer:
                         </section>
                         <section style="margin: 12px 0;" title="{theme_tooltips['impact']}">
                             <h4 style="margin: 0 0 4px; font-size: 14px;">Strategic Impact</h4>
-                            <p style="margin: 0;">{nar['impact']}</p>
+                            <p style="margin: 0;">{nar.impact}</p>
                         </section>
                         <section style="margin: 12px 0;">
                             <h4 style="margin: 0 0 4px; font-size: 14px;">Timeline</h4>
-                            <p style="margin: 0;" title="{theme_tooltips['first_seen']}">First seen: {nar['first_seen']}</p>
-                            <p style="margin: 0;" title="{theme_tooltips['last_seen']}">Last seen: {nar['last_seen']}</p>
+                            <p style="margin: 0;" title="{theme_tooltips['first_seen']}">First seen: {nar.first_seen_display}</p>
+                            <p style="margin: 0;" title="{theme_tooltips['last_seen']}">Last seen: {nar.last_seen_display}</p>
                         </section>
                     </div>
                 </details>
             </div>
             """
-            st.markdown(card_html, unsafe_allow_html=True)
+            cards.append(card_html)
+        return cards
 
     def _render_dimensions(self, dimensions):
         st.caption("Underlying conceptual tensions organizing meaning across domains")
+        cols = st.columns(3)
+        for idx, card_html in enumerate(self._fragments("dimensions", self._dimensions_html, dimensions)):
+            with cols[idx % 3]:
+                st.markdown(card_html, unsafe_allow_html=True)
+
+    def _dimensions_html(self, dimensions):
         strength_colors = {
             "Emerging": "#FFA500",   # orange
             "Moderate": "#FFD700",   # gold
@@ -566,140 +530,145 @@ class InsightsRenderer:
         }
         dim_tooltips = TOOLTIPS["stories"]["dimensions"]
 
-        cols = st.columns(3)
-        for idx, dim in enumerate(dimensions):
-            col = cols[idx % 3]
-            border_color = strength_colors.get(dim["strength"], "#DDD")
-            with col:
-                card_html = (
+        cards = []
+        for dim in dimensions:
+            border_color = strength_colors.get(dim.strength, "#DDD")
+            cards.append(
                         f'<div style="border:2px solid {border_color}; border-radius:8px; padding:16px; margin-bottom:16px;">'
                         f'  <div style="display:flex; justify-content:space-between; align-items:center; margin-bottom:8px;">'
-                        f'    <strong style="font-size:16px;" title="{dim_tooltips["axis"]}">{dim["axis"]}</strong>'
+                        f'    <strong style="font-size:16px;" title="{dim_tooltips["axis"]}">{dim.axis}</strong>'
                         f'  </div>'
                         f'  <div style="display:grid; grid-template-columns:1fr 1fr; gap:8px; margin:12px 0;">'
                         f'    <div title="{dim_tooltips["strength"]}"><strong>Signal Strength:</strong> '
-                        f'<span style="background-color: {border_color}; color: black; padding: 2px 8px; border-radius: 12px; font-size: 12px; font-weight: bold;">{dim["strength"]}</span></div>'
-                        f'    <div title="{dim_tooltips["key_markers"]}"><strong>Key Markers:</strong> {", ".join(dim["key_markers"])}</div>'
+                        f'<span style="background-color: {border_color}; color: black; padding: 2px 8px; border-radius: 12px; font-size: 12px; font-weight: bold;">{dim.strength}</span></div>'
+                        f'    <div title="{dim_tooltips["key_markers"]}"><strong>Key Markers:</strong> {dim.key_markers_display}</div>'
                         f'  </div>'
                         f'  <details style="margin-top:16px; border-radius:8px; overflow:hidden;">'
                         f'    <summary style="font-weight:bold; cursor:pointer;">Full Details</summary>'
                         f'    <div style="padding:0 16px 16px; border-top:1px solid #CCC; line-height:1.6;" title="{dim_tooltips["narrative"]}">'
-                        f'      <p>{dim["narrative"]}</p>'
+                        f'      <p>{dim.narrative}</p>'
                         f'    </div>'
                         f'  </details>'
                         f'</div>'
-                )
-                st.markdown(card_html, unsafe_allow_html=True)
+            )
+        return cards
 
     def _render_metaphors(self, metaphors):
-        metaphor_tooltips = TOOLTIPS["stories"]["metaphors"]
-
         st.caption("Illustrative parallels showing shared structure across domains")
-        tabs = st.tabs([m["title"] for m in metaphors])
+        self._render_tabs("metaphors", [(m.title, m, self._render_metaphor) for m in metaphors])
 
-        for tab, m in zip(tabs, metaphors):
-            with tab:
-                st.markdown(
-                    f"*<span title='{metaphor_tooltips['metaphor']}'>{m['metaphor']}</span>*",
-                    unsafe_allow_html=True
-                )
-                st.caption(
-                    f"<span title='{metaphor_tooltips['narrative']}'>{m['narrative']}</span>",
-                    unsafe_allow_html=True
-                )
-                df = pd.DataFrame(m["rows"])
-                col_cfg = {
-                    col: st.column_config.TextColumn(
-                        col, width="medium", help=metaphor_tooltips["rows"]
-                    )
-                    for col in m["columns"]
-                }
-                st.dataframe(
-                    df,
-                    use_container_width=True,
-                    hide_index=True,
-                    column_config=col_cfg
-                )
+    def _render_metaphor(self, m):
+        metaphor_tooltips = TOOLTIPS["stories"]["metaphors"]
+        st.markdown(
+            f"*<span title='{metaphor_tooltips['metaphor']}'>{m.metaphor}</span>*",
+            unsafe_allow_html=True
+        )
+        st.caption(
+            f"<span title='{metaphor_tooltips['narrative']}'>{m.narrative}</span>",
+            unsafe_allow_html=True
+        )
+        df = pd.DataFrame(list(m.rows))
+        col_cfg = {
+            col: st.column_config.TextColumn(
+                col, width="medium", help=metaphor_tooltips["rows"]
+            )
+            for col in m.columns
+        }
+        st.dataframe(
+            df,
+            use_container_width=True,
+            hide_index=True,
+            column_config=col_cfg
+        )
 
     def _render_framing(self, framing):
-        framing_tooltips = TOOLTIPS["stories"]["framing"]
         st.caption("How core ideas are locally interpreted and emphasized across cultures")
-        
-        titles = [item["title"] for item in framing]
-        framing_tabs = st.tabs(titles)
-        for tab, content in zip(framing_tabs, framing):
-            with tab:
-                df = pd.DataFrame(content["data"])
-
-                st.dataframe(
-                    df,
-                    use_container_width=True,
-                    hide_index=True,
-                    column_config={
-                        "Country": st.column_config.TextColumn(
-                            "Country", width="small", help=framing_tooltips["data"]
-                        ),
-                        "Cultural Framing": st.column_config.TextColumn(
-                            "Cultural Framing", width="large", help=framing_tooltips["data"]
-                        ),
-                        "Key Indicators": st.column_config.TextColumn(
-                            "Key Indicators", width="medium", help=framing_tooltips["data"]
-                        )
-                    }
-                )
-                st.markdown(
-                    f"**Evidence Sources:** <span title='{framing_tooltips['evidence']}'>{', '.join(content['evidence'])}</span>",
-                    unsafe_allow_html=True
-                )
-                st.markdown(
-                    f"**Strategic Impact:** <span title='{framing_tooltips['strategic_impact']}'>{content['strategic_impact']}</span>",
-                    unsafe_allow_html=True
+        self._render_tabs("framing", [(item.title, item, self._render_framing_lens) for item in framing])
+
+    def _render_framing_lens(self, content):
+        framing_tooltips = TOOLTIPS["stories"]["framing"]
+        df = pd.DataFrame(list(content.rows))
+
+        st.dataframe(
+            df,
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                "Country": st.column_config.TextColumn(
+                    "Country", width="small", help=framing_tooltips["data"]
+                ),
+                "Cultural Framing": st.column_config.TextColumn(
+                    "Cultural Framing", width="large", help=framing_tooltips["data"]
+                ),
+                "Key Indicators": st.column_config.TextColumn(
+                    "Key Indicators", width="medium", help=framing_tooltips["data"]
                 )
+            }
+        )
+        st.markdown(
+            f"**Evidence Sources:** <span title='{framing_tooltips['evidence']}'>{', '.join(content.evidence)}</span>",
+            unsafe_allow_html=True
+        )
+        st.markdown(
+            f"**Strategic Impact:** <span title='{framing_tooltips['strategic_impact']}'>{content.strategic_impact}</span>",
+            unsafe_allow_html=True
+        )
         
     def _render_evolution(self, evolution):
-        evolution_tooltips = TOOLTIPS["stories"]["evolution"]
-
         st.caption("How key terms shift meaning across contexts and time")
 
-        tab_names = [m['title'] for m in evolution]
-        evolution_tabs = st.tabs(tab_names)
-        
-        for tab, data in zip(evolution_tabs, evolution):
-            with tab:
-                timeline_html = (
-                    '<div style="border:1px solid #ddd; border-radius:8px; padding:16px; margin-bottom:16px;">'
-                )
-                for year, meaning in data["evolution"].items():
-                    timeline_html += (
-                        f'<div style="margin-bottom:12px;" '
-                        f'title="{evolution_tooltips["evolution"]}">'
-                        f'<strong>{year}</strong> → {meaning}</div>'
-                    )
-                timeline_html += '</div>'
-                st.markdown(timeline_html, unsafe_allow_html=True)
-
-                st.markdown(
-                    f"<span title='{evolution_tooltips['shift_driver']}'><strong>Shift driver:</strong> {data['shift_driver']}</span>",
-                    unsafe_allow_html=True
+        fragments = self._fragments("evolution", self._evolution_html, evolution)
+        self._render_tabs("evolution", [
+            (m.title, fragment, self._render_word_shift) for m, fragment in zip(evolution, fragments)
+        ])
+
+    def _render_word_shift(self, fragment):
+        timeline_html, driver_html = fragment
+        st.markdown(timeline_html, unsafe_allow_html=True)
+        st.markdown(driver_html, unsafe_allow_html=True)
+
+    def _evolution_html(self, evolution):
+        evolution_tooltips = TOOLTIPS["stories"]["evolution"]
+        fragments = []
+        for data in evolution:
+            timeline_html = (
+                '<div style="border:1px solid #ddd; border-radius:8px; padding:16px; margin-bottom:16px;">'
+            )
+            for year, meaning in data.evolution:
+                timeline_html += (
+                    f'<div style="margin-bottom:12px;" '
+                    f'title="{evolution_tooltips["evolution"]}">'
+                    f'<strong>{year}</strong> → {meaning}</div>'
                 )
+            timeline_html += '</div>'
+            driver_html = (
+                f"<span title='{evolution_tooltips['shift_driver']}'><strong>Shift driver:</strong> {data.shift_driver}</span>"
+            )
+            fragments.append((timeline_html, driver_html))
+        return fragments
 
     def _render_people(self, personas):
+        positions, _ = self._list_controls("people", self.index.people, PEOPLE_SORTS, {}, page_size=9)
+        visible = [personas[i] for i in positions]
+        cols = st.columns(3)
+        for idx, card_html in enumerate(self._fragments(("people", tuple(positions)), self._people_html, visible)):
+            cols[idx % 3].markdown(card_html, unsafe_allow_html=True)
 
+    def _people_html(self, personas):
         persona_tooltips = TOOLTIPS["people"]
-        cols = st.columns(3)
-        for idx, p in enumerate(personas):
-            col = cols[idx % 3]
-            evidence_html = self._parse_markdown_links(p["evidence"])
-            traits_list = "".join(f"<li>{t}</li>" for t in p["traits"])
-            border_color = p.get("border_color", "#DDD")
+        cards = []
+        for p in personas:
+            evidence_html = self._parse_markdown_links(p.evidence)
+            traits_list = "".join(f"<li>{t}</li>" for t in p.traits)
+            border_color = p.border_color
             
             card_html = f"""
             <div style="border:2px solid {border_color};border-radius:8px;padding:16px;margin:16px 0;">
             <div style="display:flex;justify-content:space-between;align-items:center;margin-bottom:8px;">
-                <strong style="font-size:16px;" title="{persona_tooltips['name']}">{p['name']}</strong>
+                <strong style="font-size:16px;" title="{persona_tooltips['name']}">{p.name}</strong>
                 <b><small style="background-color:{border_color};color:#000;padding:2px 6px;border-radius:4px;font-size:14px;"
                     title="{persona_tooltips['share']}">
-                    Share: {p['share']}
+                    Share: {p.share}
                 </small></b>
             </div>
             <div style="margin:12px 0;" title="{persona_tooltips['traits']}">
@@ -712,7 +681,7 @@ class InsightsRenderer:
                 <summary style="font-weight:bold;cursor:pointer;">Full Details</summary>
                 <section style="margin:12px 0;" title="{persona_tooltips['behaviors']}">
                     <h4 style="margin:0 0 4px;font-size:14px;">Behaviors</h4>
-                    <p style="margin:0;">{p['behaviors']}</p>
+                    <p style="margin:0;">{p.behaviors}</p>
                 </section>
                 <section style="margin:12px 0;" title="{persona_tooltips['evidence']}">
                     <h4 style="margin:0 0 4px;font-size:14px;">Evidence</h4>
@@ -720,58 +689,56 @@ class InsightsRenderer:
                 </section>
                 <section style="margin:12px 0;" title="{persona_tooltips['implications']}">
                     <h4 style="margin:0 0 4px;font-size:14px;">Implications</h4>
-                    <p style="margin:0;">{p['implications']}</p>
+                    <p style="margin:0;">{p.implications}</p>
                 </section>
             </details>
             </div>
             """.strip()
-
-            col.markdown(card_html, unsafe_allow_html=True)
+            cards.append(card_html)
+        return cards
 
     def _render_influencers(self, infl):
         sections = []
-        if infl.get("narratives"):
-            sections.append(("🕸️ Network Types", infl["narratives"], self._render_narratives))
-        if infl.get("pathways"):
-            sections.append(("🛤️ Diffusion Paths", infl["pathways"], self._render_pathways))
-        if infl.get("brokers"):
-            sections.append(("👑 Key Brokers", infl["brokers"], self._render_brokers))
+        if infl.narratives:
+            sections.append(("🕸️ Network Types", infl.narratives, self._render_narratives))
+        if infl.pathways:
+            sections.append(("🛤️ Diffusion Paths", infl.pathways, self._render_pathways))
+        if infl.brokers:
+            sections.append(("👑 Key Brokers", infl.brokers, self._render_brokers))
 
         # 2. Nothing to show?
         if not sections:
             st.write("No influencer data available.")
             return
 
-        # 3. Create tabs dynamically
-        labels = [label for label, _, _ in sections]
-        tabs   = st.tabs(labels)
-
-        # 4. Dispatch into helper methods
-        for (label, data, fn), tab in zip(sections, tabs):
-            with tab:
-                fn(data)
+        # 3. Create tabs dynamically and dispatch
+        self._render_tabs("influencers", sections)
 
     def _render_narratives(self, narratives):
-        narrative_tooltips = TOOLTIPS["influencers"]["narratives"]
         st.caption("Key influencer ecosystems shaping cultural conversations and commerce")
         cols = st.columns(2)
-        for idx, nar in enumerate(narratives):
-            col = cols[idx % 2]
-            color = nar["color"]
-            evidence_html = self._parse_markdown_links(nar["evidence"])
-            with col:
-                st.markdown(
-                    f'<div style="border:2px solid {color};border-radius:8px;padding:16px;margin:8px;">'
-                    f'  <strong style="font-size:16px;" title="{narrative_tooltips["title"]}">{nar["title"]}</strong>'
-                    f'  <details style="border-top:1px solid {color};margin-top:12px;">'
-                    f'    <summary style="font-weight:bold;color:{color};" title="Click to view full details">Full Details</summary>'
-                    f'    <p title="{narrative_tooltips["story"]}">{nar["story"]}</p>'
-                    f'    <p title="{narrative_tooltips["evidence"]}">{evidence_html}</p>'
-                    f'    <p title="{narrative_tooltips["takeaway"]}"><strong>Takeaway:</strong> {nar["takeaway"]}</p>'
-                    f'  </details>'
-                    f'</div>',
-                    unsafe_allow_html=True
-                )
+        for idx, card_html in enumerate(self._fragments("narratives", self._narratives_html, narratives)):
+            with cols[idx % 2]:
+                st.markdown(card_html, unsafe_allow_html=True)
+
+    def _narratives_html(self, narratives):
+        narrative_tooltips = TOOLTIPS["influencers"]["narratives"]
+        cards = []
+        for nar in narratives:
+            color = nar.color
+            evidence_html = self._parse_markdown_links(nar.evidence)
+            cards.append(
+                f'<div style="border:2px solid {color};border-radius:8px;padding:16px;margin:8px;">'
+                f'  <strong style="font-size:16px;" title="{narrative_tooltips["title"]}">{nar.title}</strong>'
+                f'  <details style="border-top:1px solid {color};margin-top:12px;">'
+                f'    <summary style="font-weight:bold;color:{color};" title="Click to view full details">Full Details</summary>'
+                f'    <p title="{narrative_tooltips["story"]}">{nar.story}</p>'
+                f'    <p title="{narrative_tooltips["evidence"]}">{evidence_html}</p>'
+                f'    <p title="{narrative_tooltips["takeaway"]}"><strong>Takeaway:</strong> {nar.takeaway}</p>'
+                f'  </details>'
+                f'</div>'
+            )
+        return cards
 
     def _render_pathways(self, pathways):
         pathways_tooltips = TOOLTIPS["influencers"]["pathways"]
@@ -780,87 +747,102 @@ class InsightsRenderer:
             "How cultural moments spread through influencer networks to drive adoption",
             help=pathways_tooltips["name"]
         )
-
-        dot = [
-            "digraph G {",
-            "  rankdir=LR; graph [bgcolor=transparent,nodesep=1,ranksep=1];",
-            "  node [shape=circle,fixedsize=true,width=1.2,height=1.2,style=filled,fontname=\"Helvetica-Bold\",fontsize=10];",
-            "  edge [penwidth=2];"
-        ]
-
-        for p in pathways:
-            ids = [f'"{n["id"]}"' for n in p["nodes"]]
-            dot.append(f"  {' -> '.join(ids)} [color=\"{p['color']}\"];")
-            for n in p["nodes"]:
-                # Preserve the node-specific tooltip provided by the data
-                dot.append(
-                    f'  "{n["id"]}" [fillcolor="{p["color"]}", label="{n["label"]}", tooltip="{n["tooltip"]}"];'
-                )
-
-        dot.append("}")
-        st.graphviz_chart("\n".join(dot))
+        graph_size = len({n.id for p in pathways for n in p.nodes})
+        max_nodes = PATHWAY_NODE_LIMIT
+        if graph_size > PATHWAY_NODE_LIMIT:
+            max_nodes = st.slider(
+                "Nodes shown", min_value=min(50, PATHWAY_NODE_LIMIT), max_value=graph_size,
+                value=PATHWAY_NODE_LIMIT, step=50, key=f"pathways:nodes:{graph_size}",
+                help="Keeps the nodes on the most pathways; dashed edges skip hidden nodes.",
+            )
+            st.caption(f"Showing {min(max_nodes, graph_size)} of {graph_size} nodes")
+        # The default view is the one prerender.py compiles
+        section = "pathways" if max_nodes == PATHWAY_NODE_LIMIT else f"pathways_top{max_nodes}"
+        dot = self._fragments(section, lambda data: self._pathways_dot(data, max_nodes), pathways)
+        svg = render_svg(dot)
+        if svg is None:
+            # No Graphviz on the server: fall back to layout in the browser
+            st.graphviz_chart(dot)
+        else:
+            st.html(f'<div style="overflow:auto;">{svg}</div>')
+
+    def _pathways_dot(self, pathways, max_nodes=PATHWAY_NODE_LIMIT):
+        return to_dot(prune_pathways(pathways, max_nodes=max_nodes))
 
     def _render_brokers(self, brokers_list):
         st.caption("Most influential voices shaping brand perception and cultural trends")
+        positions, _ = self._list_controls(
+            "brokers", self.index.brokers, BROKER_SORTS, {"market": "Market", "tier": "Influence"}, page_size=12
+        )
+        rows = [self.index.broker_rows[i] for i in positions]
+        # Group the visible page by market, keeping the selected order within each
+        grouped = {}
+        for i, (m, b) in zip(positions, rows):
+            grouped.setdefault(m, []).append((brokers_list[m].brokers[b], i))
+        visible = [(brokers_list[m], brokers) for m, brokers in grouped.items()]
+        for container in self._fragments(("brokers", tuple(rows)), self._brokers_html, visible):
+            st.markdown(container, unsafe_allow_html=True)
+
+    def _brokers_html(self, brokers_list):
         broker_tooltips = TOOLTIPS["influencers"]["brokers"]
         entity_tooltips = broker_tooltips["broker"]
 
-        for market_data in brokers_list:
+        scores = self.index.broker_scores
+        containers = []
+        for market_data, brokers in brokers_list:
             cards = []
-            for b in market_data["brokers"]:
+            for b, i in brokers:
+                reach = "unknown" if np.isnan(scores.reach[i]) else f"{scores.reach[i]:,.0f}"
                 cards.append(
-                    f'<div style="flex:1;min-width:220px;border:1px solid {market_data["color"]};'
+                    f'<div style="flex:1;min-width:220px;border:1px solid {market_data.color};'
                     f'border-radius:6px;padding:12px;margin:8px;" title="{entity_tooltips["name"]}">'
-                    f'<strong style="color:{market_data["color"]};" title="{entity_tooltips["name"]}">{b["name"]}</strong><br>'
-                    f'<em title="{entity_tooltips["role"]}">{b["role"]}</em>'
-                    f'<p title="{entity_tooltips["impact"]}">{b["impact"]}</p>'
-                    f'<details><summary style="color:{market_data["color"]};">Details</summary>'
-                    f'<p title="{entity_tooltips["followers"]}">Followers: {b["followers"]}</p>'
-                    f'<p title="{entity_tooltips["engagement"]}">Engagement: {b["engagement"]}</p>'
-                    f'<p title="{entity_tooltips["specialty"]}">Specialty: {b["specialty"]}</p>'
-                    f'<p title="{entity_tooltips["brands"]}">Brands: {", ".join(b["brands"])}</p>'
+                    f'<strong style="color:{market_data.color};" title="{entity_tooltips["name"]}">{b.name}</strong><br>'
+                    f'<em title="{entity_tooltips["role"]}">{b.role}</em>'
+                    f'<p title="{entity_tooltips["impact"]}">{b.impact}</p>'
+                    f'<p title="{entity_tooltips["influence"]}">Influence: <strong>{scores.influence[i]:.0f}</strong>'
+                    f' · <span title="{entity_tooltips["reach"]}">Reach: {reach}</span></p>'
+                    f'<details><summary style="color:{market_data.color};">Details</summary>'
+                    f'<p title="{entity_tooltips["followers"]}">Followers: {b.followers}</p>'
+                    f'<p title="{entity_tooltips["engagement"]}">Engagement: {b.engagement}</p>'
+                    f'<p title="{entity_tooltips["specialty"]}">Specialty: {b.specialty}</p>'
+                    f'<p title="{entity_tooltips["brands"]}">Brands: {b.brands_display}</p>'
                     f'</details>'
                     f'</div>'
                 )
             container = (
-                f'<div style="flex:1;min-width:220px;border:1px solid {market_data["color"]};'
+                f'<div style="flex:1;min-width:220px;border:1px solid {market_data.color};'
                 f'border-radius:6px;padding:12px;margin:8px;" title="{broker_tooltips["description"]}">'
-                f'<strong style="font-size:18px;" title="{broker_tooltips["market"]}">{market_data["market"]}</strong>'
-                f'<p style="opacity:0.8;" title="{broker_tooltips["description"]}"><em>{market_data["description"]}</em></p>'
+                f'<strong style="font-size:18px;" title="{broker_tooltips["market"]}">{market_data.market}</strong>'
+                f'<p style="opacity:0.8;" title="{broker_tooltips["description"]}"><em>{market_data.description}</em></p>'
                 f'<div style="display:flex;flex-wrap:wrap;justify-content:space-between;">'
                 + "".join(cards) +
                 '</div></div>'
             )
-            st.markdown(container, unsafe_allow_html=True)
+            containers.append(container)
+        return containers
 
     def _render_ideas(self, ideas):
         sections = []
-        if ideas.get("hypotheses"):
-            sections.append(("🧪 Hypotheses", ideas["hypotheses"], self._render_hypotheses))
-        if ideas.get("gaps"):
-            sections.append(("🔍 Opportunity Gaps", ideas["gaps"], self._render_gaps))
-        if ideas.get("playbooks"):
-            sections.append(("🎨 Culture Creation", ideas["playbooks"], self._render_playbooks))
-        if ideas.get("scenarios"):
-            sections.append(("❓ What If", ideas["scenarios"], self._render_scenarios))
-        if ideas.get("recommendations"):
-            sections.append(("🚀 Actions", ideas["recommendations"], self._render_recommendations))
+        if ideas.hypotheses:
+            sections.append(("🧪 Hypotheses", ideas.hypotheses, self._render_hypotheses))
+        if ideas.gaps:
+            sections.append(("🔍 Opportunity Gaps", ideas.gaps, self._render_gaps))
+        if ideas.playbooks:
+            sections.append(("🎨 Culture Creation", ideas.playbooks, self._render_playbooks))
+        if ideas.scenarios:
+            sections.append(("❓ What If", ideas.scenarios, self._render_scenarios))
+        if ideas.recommendations:
+            sections.append(("🚀 Actions", ideas.recommendations, self._render_recommendations))
 
         # 2. nothing to show?
         if not sections:
             st.write("No ideas data available.")
             return
 
-        # 3. create tabs dynamically
-        labels = [label for label, _, _ in sections]
-        tabs   = st.tabs(labels)
-
-        # 4. dispatch
-        for (label, data, fn), tab in zip(sections, tabs):
-            with tab:
-                fn(data)
+        # 3. create tabs dynamically and dispatch
+        self._render_tabs("ideas", sections)
 
-    def _render_card(self, title, body_lines, *, border="1px solid #ccc", bg_color=None, details=None):
+    def _card_html(self, title, body_lines, *, border="1px solid #ccc", bg_color=None, details=None):
             style = f"border:{border};"
             if bg_color:
                 style += f"background-color:{bg_color};"
@@ -877,63 +859,82 @@ class InsightsRenderer:
                     f"<summary style='font-weight:bold;cursor:pointer;'>{summary}</summary>"
                     f"{detail_content}</details>"
                 )
-            # Render the card
-            st.markdown(
+            return (
                 f"<div style='{style}'>"
                 f"<strong style='display:block;margin-bottom:6px;'>{title}</strong>"
-                f"{body_html}{details_html}</div>",
-                unsafe_allow_html=True
+                f"{body_html}{details_html}</div>"
             )
           
     def _render_hypotheses(self, hypotheses):
-        hypotheses_tooltips = TOOLTIPS["ideas"]["hypotheses"]
         st.caption("Key if–then hypotheses to test.")
         cols = st.columns(2)
-        for idx, h in enumerate(hypotheses):
+        for idx, card_html in enumerate(self._fragments("hypotheses", self._hypotheses_html, hypotheses)):
             with cols[idx % 2]:
-                self._render_card(
-                    title=f"<span title='{hypotheses_tooltips['title']}'>{h['statement']}</span>",
-                    body_lines=[
-                        f"<span title='{hypotheses_tooltips['source']}'>Source: {self._parse_markdown_links(h['source'])}</span>"
-                    ],
-                    border="1px solid #888",
-                    details=("Full Hypothesis", [h["statement"]])
-                )
+                st.markdown(card_html, unsafe_allow_html=True)
+
+    def _hypotheses_html(self, hypotheses):
+        hypotheses_tooltips = TOOLTIPS["ideas"]["hypotheses"]
+        return [
+            self._card_html(
+                title=f"<span title='{hypotheses_tooltips['title']}'>{h.statement}</span>",
+                body_lines=[
+                    f"<span title='{hypotheses_tooltips['source']}'>Source: {self._parse_markdown_links(h.source)}</span>"
+                ],
+                border="1px solid #888",
+                details=("Full Hypothesis", [h.statement])
+            )
+            for h in hypotheses
+        ]
 
     def _render_gaps(self, gaps):
         st.caption("Unmet opportunities—each gap is a trigger for action.")
+        for card_html in self._fragments("gaps", self._gaps_html, gaps):
+            st.markdown(card_html, unsafe_allow_html=True)
+
+    def _gaps_html(self, gaps):
         gaps_tooltips = TOOLTIPS["ideas"]["gaps"]
-        for g in gaps:
-            self._render_card(
-                title=f"<span title='{gaps_tooltips['title']}'>🎯 {g['title']}</span>",
+        return [
+            self._card_html(
+                title=f"<span title='{gaps_tooltips['title']}'>🎯 {g.title}</span>",
                 body_lines=[
-                    f"<span title='{gaps_tooltips['body']}'>{g['body']}</span>",
-                    f"<span title='{gaps_tooltips['source']}'>Source: {self._parse_markdown_links(g['source'])}</span>"
+                    f"<span title='{gaps_tooltips['body']}'>{g.body}</span>",
+                    f"<span title='{gaps_tooltips['source']}'>Source: {self._parse_markdown_links(g.source)}</span>"
                 ],
                 border="1px dashed #999"
             )
+            for g in gaps
+        ]
 
     def _render_playbooks(self, playbooks):
         st.caption("Activation Playbooks—frameworks distilled by AI from 50K+ cultural data points")
+        for card_html in self._fragments("playbooks", self._playbooks_html, playbooks):
+            st.markdown(card_html, unsafe_allow_html=True)
+
+    def _playbooks_html(self, playbooks):
         playbooks_tooltips = TOOLTIPS["ideas"]["playbooks"]
+        cards = []
         for c in playbooks:
             parts = [
-                f"<p title='{playbooks_tooltips['goal']}'><strong>Goal:</strong> {c['goal']}</p>",
+                f"<p title='{playbooks_tooltips['goal']}'><strong>Goal:</strong> {c.goal}</p>",
                 "<p title='{0}'><strong>Steps:</strong></p><ul style='margin:4px 0 8px 16px;'>".format(playbooks_tooltips['steps'])
-                + "".join(f"<li title='{playbooks_tooltips['steps']}'>{s}</li>" for s in c["steps"]) + "</ul>",
+                + "".join(f"<li title='{playbooks_tooltips['steps']}'>{s}</li>" for s in c.steps) + "</ul>",
                 "<p title='{0}'><strong>Metrics:</strong></p><ul style='margin:4px 0 8px 16px;'>".format(playbooks_tooltips['metrics'])
-                + "".join(f"<li title='{playbooks_tooltips['metrics']}'>{m}</li>" for m in c["metrics"]) + "</ul>",
-                f"<p style='font-size:0.85em; color:gray;' title='{playbooks_tooltips['source']}'><em>Source: {self._parse_markdown_links(c['source'])}</em></p>"
+                + "".join(f"<li title='{playbooks_tooltips['metrics']}'>{m}</li>" for m in c.metrics) + "</ul>",
+                f"<p style='font-size:0.85em; color:gray;' title='{playbooks_tooltips['source']}'><em>Source: {self._parse_markdown_links(c.source)}</em></p>"
             ]
             body_html = "".join(parts)
-            self._render_card(
-                title=f"<span title='{playbooks_tooltips['title']}'>{c['title']}</span>",
+            cards.append(self._card_html(
+                title=f"<span title='{playbooks_tooltips['title']}'>{c.title}</span>",
                 body_lines=[body_html],
-                border=c.get("border", "1px solid #ccc")
-            )
+                border=c.border
+            ))
+        return cards
 
     def _render_scenarios(self, scenarios):
         st.caption("What If Scenarios — projected outcomes")
+        st.markdown(self._fragments("scenarios", self._scenarios_html, scenarios), unsafe_allow_html=True)
+
+    def _scenarios_html(self, scenarios):
         scenarios_tooltips = TOOLTIPS["ideas"]["scenarios"]
         container = '<div style="display:flex;flex-direction:column;gap:16px;">'
         for idx, s in enumerate(scenarios, start=1):
@@ -944,37 +945,73 @@ class InsightsRenderer:
                 f'justify-content:center;font-weight:bold;font-size:14px;">{idx}</div>'
                 f'<div style="flex:1;">'
                 f'<div style="font-size:15px;font-weight:bold;color:#FF5722;margin-bottom:4px;" '
-                f'title="{scenarios_tooltips["title"]}">{s["title"]}</div>'
+                f'title="{scenarios_tooltips["title"]}">{s.title}</div>'
                 f'<div style="font-size:14px;line-height:1.5;margin-bottom:6px;" '
-                f'title="{scenarios_tooltips["body"]}">{s["body"]}</div>'
+                f'title="{scenarios_tooltips["body"]}">{s.body}</div>'
                 f'<div style="font-size:12px;color:gray;" '
-                f'title="{scenarios_tooltips["source"]}">Source: {self._parse_markdown_links(s["source"])}</div>'
+                f'title="{scenarios_tooltips["source"]}">Source: {self._parse_markdown_links(s.source)}</div>'
                 f'</div></div>'
             )
         container += "</div>"
-        st.markdown(container, unsafe_allow_html=True)
+        return container
 
     def _render_recommendations(self, recs):
         st.caption("Next steps—priority actions.")
-        for r in recs:
-            recommendations_tooltips = TOOLTIPS["ideas"]["recommendations"]
-            st.markdown(
-                f"<div style='border-left:5px solid #4CAF50;padding:12px;margin-bottom:8px;' "
-                f"title='{recommendations_tooltips['title']}'>"
-                f"<strong>{r['priority']}. {r['title']}</strong>"
-                f"<p style='margin:4px 0;' title='{recommendations_tooltips['body']}'>{r['body']}</p>"
-                f"</div>",
-                unsafe_allow_html=True
-            )
+        for card_html in self._fragments("recommendations", self._recommendations_html, recs):
+            st.markdown(card_html, unsafe_allow_html=True)
+
+    def _recommendations_html(self, recs):
+        recommendations_tooltips = TOOLTIPS["ideas"]["recommendations"]
+        return [
+            f"<div style='border-left:5px solid #4CAF50;padding:12px;margin-bottom:8px;' "
+            f"title='{recommendations_tooltips['title']}'>"
+            f"<strong>{r.priority}. {r.title}</strong>"
+            f"<p style='margin:4px 0;' title='{recommendations_tooltips['body']}'>{r.body}</p>"
+            f"</div>"
+            for r in recs
+        ]
     
-    def _render_ask(self, ai_context):
-        DEFAULT_SYSTEM_CONTEXT = (
-            "You are Kultie, an assistant for exploring market and cultural insights. "
-            "Provide clear, evidence-based recommendations."
-        )
+    def _retriever(self, research_path):
+        """Retrieval index over this study and its research note, built once per version."""
+        build = lambda: ContextRetriever.for_study(self.study, research_path)
+        if self.content_hash is None:
+            return build()
+        research_version = None
+        if research_path is not None and research_path.exists():
+            stat = research_path.stat()
+            research_version = (str(research_path), stat.st_size, stat.st_mtime_ns)
+        return _RETRIEVERS.get_or_build((self.content_hash, research_version), build)
+
+    def _render_research(self, doc, key):
+        """Table of contents plus only the selected section of a parsed research note."""
+        if doc.title:
+            st.markdown(f"### {doc.title}")
+        if doc.preamble:
+            st.markdown(doc.preamble, unsafe_allow_html=True)
+        labels = [section.title for section in doc.sections]
+        if doc.sources:
+            labels.append("📑 Sources & Links")
+        if not labels:
+            return
+        toc, content = st.columns([1, 3])
+        with toc:
+            choice = st.radio("Contents", range(len(labels)), format_func=labels.__getitem__,
+                              key=f"research_toc:{key}")
+        with content:
+            if choice == len(doc.sections):
+                st.markdown(doc.sources, unsafe_allow_html=True)
+                return
+            section = doc.sections[choice]
+            st.markdown(f"#### {section.title}")
+            if section.body:
+                st.markdown(section.body, unsafe_allow_html=True)
+            for child in section.children:
+                with st.expander(child.title):
+                    st.markdown(child.body, unsafe_allow_html=True)
 
-        system_context = ai_context.get("system_context") or DEFAULT_SYSTEM_CONTEXT
-        research_file = ai_context.get("research_file")
+    def _render_ask(self, ai_context):
+        system_context = ai_context.system_context or DEFAULT_SYSTEM_CONTEXT
+        research_file = ai_context.research_file
         research_path = None
         if research_file:
             research_path = pathlib.Path("research") /pathlib.Path(research_file)
@@ -1024,7 +1061,16 @@ class InsightsRenderer:
 
         st.markdown('<div class="space-title">Kultie ✨</div>', unsafe_allow_html=True)
         st.markdown('<div class="space-subtitle">Your assistent for exploring insights</div>', unsafe_allow_html=True)
-        
+
+        # Starter questions answered offline by precompute_answers.py are served instantly
+        if self.answers:
+            starters = [question for question, _ in self.answers.values()]
+            starter = st.pills("Starter questions", starters, key=f"kultie_starter:{self.content_hash}")
+            if starter:
+                st.markdown("#### 💡 Cultural Insights & Recommendations")
+                st.markdown(self.answers[normalize_prompt(starter)][1])
+                st.caption("⚡ Precomputed answer")
+
         # Initialize OpenAI client with API key from secrets
         try:
             api_key = st.secrets.get("OPENAI_API_KEY") or os.getenv("OPENAI_API_KEY")
@@ -1032,7 +1078,8 @@ class InsightsRenderer:
                 st.error("OpenAI API key not found. Please add OPENAI_API_KEY to your Streamlit secrets or environment variables.")
                 return
             
-            client = openai.OpenAI(api_key=api_key)
+            # One pooled, rate-limited client per process, shared by all sessions
+            client = get_client(api_key, max_concurrency=KULTIE_MAX_CONCURRENCY, timeout=KULTIE_TIMEOUT)
             
             user_prompt = st.text_area(
                 "",
@@ -1080,49 +1127,73 @@ class InsightsRenderer:
                     final_html += "</div>"
                     build_log.markdown(final_html, unsafe_allow_html=True)
 
-                    # 3) Load & display your local markdown
-                    try:
-                        raw_md = research_path.read_text()
-                    except Exception:
-                        st.error(f"Could not load research file: {research_file}")
-                        return
-
-                    # Split on the "## Sources" header
-                    if "## Sources" in raw_md:
-                        main_md, sources_md = raw_md.split("## Sources", 1)
-                        sources_md = "## Sources" + sources_md  # re‑attach the header
-                    else:
-                        main_md = raw_md
-                        sources_md = ""
-
-                    st.markdown(
-                        main_md,
-                        unsafe_allow_html=True
-                    )
-
-                    # 2) Collapsible Sources expander
-                    if sources_md:
-                        with st.expander("📑 Sources & Links", expanded=False):
-                            st.markdown(sources_md, unsafe_allow_html=True)
+                    # 3) Open the parsed research note below; it stays open across TOC reruns
+                    st.session_state["research_open"] = research_file
+
+                elif normalize_prompt(user_prompt) in self.answers:
+                    st.markdown("#### 💡 Cultural Insights & Recommendations")
+                    st.markdown(self.answers[normalize_prompt(user_prompt)][1])
+                    st.caption("⚡ Precomputed answer")
 
                 else:
-                    with st.spinner("Analyzing cultural context..."):
-                        try:
-                            response = client.chat.completions.create(
-                                model="gpt-4o-mini",  # Cheapest OpenAI model
-                                messages=[
-                                    {"role": "system", "content": system_context},
-                                    {"role": "user", "content": user_prompt}
-                                ],
+                    try:
+                        with st.spinner("Analyzing cultural context..."):
+                            # Ground the answer in the most relevant study/research excerpts
+                            context, used = self._retriever(research_path).build_context(
+                                user_prompt, budget_tokens=CONTEXT_TOKEN_BUDGET
+                            )
+                            if self.references is not None:
+                                # Plus the best matches from documents uploaded to this space
+                                hits = self.references.search(user_prompt, limit=6, any_term=True)
+                                extra, extra_used = pack_chunks(
+                                    (("references", h.title, h.body) for h in hits), REFERENCE_TOKEN_BUDGET
+                                )
+                                context = "\n\n".join(part for part in (context, extra) if part)
+                                used += extra_used
+                        messages = kultie_messages(system_context, context, user_prompt)
+                        model, temperature = KULTIE_MODEL, KULTIE_TEMPERATURE
+                        stats = StreamStats()
+
+                        def ask():
+                            return client.stream(
+                                stats,
+                                deadline=KULTIE_TIMEOUT,
+                                model=model,
+                                messages=messages,
                                 max_tokens=800,
-                                temperature=0.7
+                                temperature=temperature,
                             )
-                            
-                            # Display the response
-                            st.markdown("#### 💡 Cultural Insights & Recommendations")
-                            st.markdown(response.choices[0].message.content)   
-                        except Exception as e:
-                            st.error(f"Error generating insights: {str(e)}")
-                        
+
+                        # Identical questions on the same study reuse one upstream answer
+                        key = response_key(model, system_context, context, user_prompt, temperature)
+                        answer = _RESPONSES.stream(key, ask, timeout=KULTIE_TIMEOUT)
+
+                        # Stream the response into the page as tokens arrive
+                        st.markdown("#### 💡 Cultural Insights & Recommendations")
+                        try:
+                            st.write_stream(answer)
+                        except TimeoutError as e:
+                            st.warning(f"Kultie timed out ({e}); the answer above is incomplete.")
+                        except LLMBusyError as e:
+                            st.warning(str(e))
+                        if answer.cached:
+                            st.caption("⚡ Answered from cache")
+                        elif stats.ttft is not None:
+                            st.caption(f"First token in {stats.ttft:.2f}s")
+                        if used:
+                            with st.expander("📎 Context used", expanded=False):
+                                for section, title in used:
+                                    st.markdown(f"- **{section}** · {title}")
+                    except Exception as e:
+                        st.error(f"Error generating insights: {str(e)}")
+
+            if deep_research and research_path is not None and st.session_state.get("research_open") == research_file:
+                try:
+                    doc = load_research(research_path)
+                except OSError:
+                    st.error(f"Could not load research file: {research_file}")
+                    return
+                self._render_research(doc, research_file)
+
         except Exception as e:
             st.error(f"Error setting up OpenAI client: {str(e)}")
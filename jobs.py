@@ -0,0 +1,68 @@
+# jobs.py
+"""Background job runner shared by every session of the app.
+
+Work is handed to a thread pool and tracked by job id, so the Streamlit script
+that started it can return immediately and poll for progress on later reruns.
+A job's work is a callable returning an iterable of progress events (e.g.
+``space_builder.BuildEvent``); the last event is kept as the job's progress.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
+import threading
+import time
+import uuid
+
+
+@dataclass(frozen=True, slots=True)
+class Job:
+    id: str
+    title: str
+    status: str  # "queued", "running", "done" or "failed"
+    progress: object = None  # last event yielded by the work
+    error: str | None = None
+    submitted: float = 0.0
+    finished: float | None = None
+
+    @property
+    def active(self):
+        return self.status in ("queued", "running")
+
+
+class JobRunner:
+    def __init__(self, max_workers=4, keep=200):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._lock = threading.Lock()
+        self._jobs = {}  # id -> Job, in submission order
+        self.keep = keep
+
+    def submit(self, title, work):
+        """Queue ``work()`` and return the new job's id."""
+        job = Job(id=uuid.uuid4().hex[:12], title=title, status="queued", submitted=time.time())
+        with self._lock:
+            self._jobs[job.id] = job
+            # Forget the oldest finished jobs beyond the retention limit
+            finished = [j.id for j in self._jobs.values() if not j.active]
+            for old in finished[:max(0, len(self._jobs) - self.keep)]:
+                del self._jobs[old]
+        self._pool.submit(self._run, job.id, work)
+        return job.id
+
+    def _update(self, job_id, **changes):
+        with self._lock:
+            self._jobs[job_id] = replace(self._jobs[job_id], **changes)
+
+    def _run(self, job_id, work):
+        self._update(job_id, status="running")
+        try:
+            for event in work() or ():
+                self._update(job_id, progress=event)
+        except Exception as e:
+            self._update(job_id, status="failed", error=str(e), finished=time.time())
+        else:
+            self._update(job_id, status="done", finished=time.time())
+
+    def get(self, job_id):
+        """Current (immutable) state of a job, or None if unknown."""
+        with self._lock:
+            return self._jobs.get(job_id)
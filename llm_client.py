@@ -0,0 +1,161 @@
+# llm_client.py
+"""Process-wide chat completion client used by Kultie.
+
+One ``LLMClient`` per API key is shared by every Streamlit session: it reuses
+the OpenAI SDK's pooled HTTP connections, caps concurrent upstream calls with a
+semaphore, retries 429/5xx/connection errors with jittered exponential backoff
+and applies a timeout to every call.
+"""
+
+from dataclasses import dataclass, field
+import random
+import threading
+import time
+
+import openai
+
+RETRYABLE_ERRORS = (openai.RateLimitError, openai.InternalServerError, openai.APIConnectionError)
+
+KULTIE_MODEL = "gpt-4o-mini"  # Cheapest OpenAI model
+KULTIE_TEMPERATURE = 0.7
+
+DEFAULT_SYSTEM_CONTEXT = (
+    "You are Kultie, an assistant for exploring market and cultural insights. "
+    "Provide clear, evidence-based recommendations."
+)
+
+
+def kultie_messages(system_context, context, prompt):
+    """Chat messages for one Kultie question, grounded in retrieved ``context``."""
+    messages = [{"role": "system", "content": system_context or DEFAULT_SYSTEM_CONTEXT}]
+    if context:
+        messages.append({
+            "role": "system",
+            "content": "Relevant excerpts from this project's study data and research "
+                       "notes (cite them where useful):\n\n" + context,
+        })
+    messages.append({"role": "user", "content": prompt})
+    return messages
+
+
+class LLMBusyError(RuntimeError):
+    """Raised when no upstream slot frees up within the queue timeout."""
+
+
+@dataclass
+class StreamStats:
+    """Timing of one streamed completion (monotonic seconds)."""
+    started: float = field(default_factory=time.monotonic)
+    first_token: float | None = None
+    finished: float | None = None
+
+    @property
+    def ttft(self):
+        """Time to first token, or None if nothing arrived."""
+        return None if self.first_token is None else self.first_token - self.started
+
+
+def stream_text(stream, stats, deadline=60.0):
+    """Yield the text deltas of an OpenAI chat completion stream.
+
+    Raises ``TimeoutError`` once ``deadline`` seconds have passed since
+    ``stats.started``, or when the client's read timeout fires on a stalled
+    stream; the upstream response is closed however iteration ends
+    (finished, timed out, or abandoned by a Streamlit rerun).
+    """
+    try:
+        for chunk in stream:
+            if time.monotonic() - stats.started > deadline:
+                raise TimeoutError(f"no complete answer within {deadline:g}s")
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                if stats.first_token is None:
+                    stats.first_token = time.monotonic()
+                yield delta
+    except openai.APITimeoutError:
+        raise TimeoutError(f"stream stalled after {time.monotonic() - stats.started:.0f}s") from None
+    finally:
+        stats.finished = time.monotonic()
+        close = getattr(stream, "close", None)
+        if close is not None:
+            close()
+
+
+def _retry_delay(error, attempt, base_delay, max_delay):
+    """Server-requested Retry-After if present, else full-jitter exponential backoff."""
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    try:
+        return min(float(retry_after), max_delay)
+    except (TypeError, ValueError):
+        return random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+
+
+class LLMClient:
+    """Shared, concurrency-limited wrapper around ``openai.OpenAI``."""
+
+    def __init__(self, api_key, max_concurrency=8, queue_timeout=30.0, timeout=60.0,
+                 max_retries=4, base_delay=0.5, max_delay=8.0):
+        # The SDK's own retries are disabled so backoff happens while holding a slot exactly once
+        self._client = openai.OpenAI(api_key=api_key, timeout=timeout, max_retries=0)
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self.queue_timeout = queue_timeout
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def _acquire(self):
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise LLMBusyError("Kultie is busy right now; please try again in a moment.")
+
+    def _create(self, **kwargs):
+        """``chat.completions.create`` with retries on rate limits and transient failures."""
+        kwargs.setdefault("timeout", self.timeout)
+        for attempt in range(self.max_retries + 1):
+            try:
+                return self._client.chat.completions.create(**kwargs)
+            except RETRYABLE_ERRORS as error:
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(_retry_delay(error, attempt, self.base_delay, self.max_delay))
+
+    def complete(self, **kwargs):
+        """Blocking completion; returns the SDK response object."""
+        self._acquire()
+        try:
+            return self._create(**kwargs)
+        finally:
+            self._slots.release()
+
+    def stream(self, stats, deadline=60.0, stall_timeout=15.0, **kwargs):
+        """Yield text deltas of a streamed completion, holding one slot until it ends.
+
+        Only opening the stream is retried; once tokens flow, an error surfaces
+        to the caller rather than replaying a half-delivered answer. Each read
+        times out after ``stall_timeout`` seconds, so a stream that stops
+        sending ends with ``TimeoutError`` instead of waiting on the deadline
+        check, which only runs when a chunk arrives.
+        """
+        kwargs.setdefault("timeout", openai.Timeout(min(self.timeout, deadline), read=min(stall_timeout, deadline)))
+        self._acquire()
+        try:
+            response = self._create(stream=True, **kwargs)
+            yield from stream_text(response, stats, deadline=deadline)
+        finally:
+            self._slots.release()
+
+
+_CLIENTS = {}
+_CLIENTS_LOCK = threading.Lock()
+
+
+def get_client(api_key, **options):
+    """The process-wide ``LLMClient`` for ``api_key``, created on first use."""
+    with _CLIENTS_LOCK:
+        client = _CLIENTS.get(api_key)
+        if client is None:
+            client = _CLIENTS[api_key] = LLMClient(api_key, **options)
+        return client
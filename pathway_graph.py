@@ -0,0 +1,122 @@
+# pathway_graph.py
+"""Diffusion-pathway graphs: merged, pruned, and laid out once on the server.
+
+Pathways that share nodes are merged into one graph where every node and edge
+is declared once, weighted by how many pathways pass through it. Large graphs
+can be pruned to their heaviest nodes; a pruned node's pathways are bridged
+with dashed edges so routes stay connected. Layout runs through Graphviz
+``dot -Tsvg`` and the SVG is cached under build/graphs/<sha256 of the DOT>.svg,
+so a graph is laid out once no matter how many sessions view it.
+"""
+
+from dataclasses import dataclass
+import hashlib
+import os
+from pathlib import Path
+import shutil
+import subprocess
+
+from fragment_cache import FragmentCache
+
+GRAPHS_DIR = Path("build") / "graphs"
+DOT_TIMEOUT = 120.0
+
+_SVGS = FragmentCache(maxsize=64)
+
+
+@dataclass(frozen=True, slots=True)
+class PathwayGraph:
+    nodes: dict  # id -> (label, tooltip, color, weight)
+    edges: dict  # (source id, target id) -> (color, weight, bridged)
+    hidden: int = 0  # nodes pruned away
+
+
+def merge_pathways(pathways):
+    """One graph over all pathways; attributes of later pathways win, as repeated DOT declarations did."""
+    nodes, edges = {}, {}
+    for p in pathways:
+        for node in {n.id: n for n in p.nodes}.values():  # a node repeated in one pathway counts once
+            weight = nodes.get(node.id, (None, None, None, 0))[3]
+            nodes[node.id] = (node.label, node.tooltip, p.color, weight + 1)
+        for a, b in zip(p.nodes, p.nodes[1:]):
+            weight = edges.get((a.id, b.id), (None, 0, False))[1]
+            edges[a.id, b.id] = (p.color, weight + 1, False)
+    return PathwayGraph(nodes, edges)
+
+
+def prune_pathways(pathways, max_nodes=None, min_weight=1):
+    """Merged graph keeping at most ``max_nodes`` nodes of weight >= ``min_weight``.
+
+    Ties in weight keep the node seen first. Consecutive kept nodes of a pathway
+    whose route ran through pruned nodes are joined by a bridged edge.
+    """
+    full = merge_pathways(pathways)
+    ranked = [n for n, attrs in full.nodes.items() if attrs[3] >= min_weight]
+    if max_nodes is not None and len(ranked) > max_nodes:
+        ranked = sorted(ranked, key=lambda n: -full.nodes[n][3])[:max_nodes]
+    keep = set(ranked)
+    if len(keep) == len(full.nodes):
+        return full
+    edges = {}
+    for p in pathways:
+        route = [(i, n.id) for i, n in enumerate(p.nodes) if n.id in keep]
+        for (i, a), (j, b) in zip(route, route[1:]):
+            _, weight, bridged = edges.get((a, b), (None, 0, False))
+            edges[a, b] = (p.color, weight + 1, bridged or j - i > 1)
+    nodes = {n: attrs for n, attrs in full.nodes.items() if n in keep}
+    return PathwayGraph(nodes, edges, hidden=len(full.nodes) - len(nodes))
+
+
+def _quote(text):
+    return '"' + str(text).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def to_dot(graph):
+    dot = [
+        "digraph G {",
+        "  rankdir=LR; graph [bgcolor=transparent,nodesep=1,ranksep=1];",
+        "  node [shape=circle,fixedsize=true,width=1.2,height=1.2,style=filled,fontname=\"Helvetica-Bold\",fontsize=10];",
+        "  edge [penwidth=2];",
+    ]
+    for node_id, (label, tooltip, color, _) in graph.nodes.items():
+        dot.append(f"  {_quote(node_id)} [fillcolor={_quote(color)}, label={_quote(label)}, tooltip={_quote(tooltip)}];")
+    for (a, b), (color, weight, bridged) in graph.edges.items():
+        style = ", style=dashed" if bridged else ""
+        width = f", penwidth={min(2 + weight - 1, 8)}" if weight > 1 else ""
+        dot.append(f"  {_quote(a)} -> {_quote(b)} [color={_quote(color)}{width}{style}];")
+    dot.append("}")
+    return "\n".join(dot)
+
+
+def svg_path(dot, graphs_dir=GRAPHS_DIR):
+    return Path(graphs_dir) / f"{hashlib.sha256(dot.encode()).hexdigest()}.svg"
+
+
+def render_svg(dot, graphs_dir=GRAPHS_DIR):
+    """SVG layout of ``dot``, computed once and cached on disk; None if Graphviz is unavailable."""
+    path = svg_path(dot, graphs_dir)
+
+    def build():
+        if path.exists():
+            return path.read_text()
+        executable = shutil.which("dot")
+        if executable is None:
+            return None
+        try:
+            result = subprocess.run(
+                [executable, "-Tsvg"], input=dot, capture_output=True, text=True, timeout=DOT_TIMEOUT, check=True
+            )
+        except (OSError, subprocess.SubprocessError):
+            return None
+        svg = result.stdout[result.stdout.find("<svg"):]  # drop the XML prolog so it embeds inline
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".svg.{os.getpid()}.tmp")
+        tmp.write_text(svg)
+        os.replace(tmp, path)
+        return svg
+
+    svg = _SVGS.get_or_build(path.name, build)
+    if svg is None:
+        # Not cached, so Graphviz installed later (or another worker's layout) is picked up
+        _SVGS.discard(path.name)
+    return svg
@@ -0,0 +1,211 @@
+# precompute_answers.py
+"""Batch-generate Kultie answers to each study's starter questions.
+
+Walks every data/<brand>/<study>.json, grounds each question with the same
+retrieval the live assistant uses, and calls the model concurrently under a
+requests-per-minute limit. Results go to data/<brand>/answers/<study>.json and
+are tied to the study checksum and backend, so a study edited afterwards stops
+serving them. The offline stub backend writes to build/answers-stub/ instead,
+and the app only serves answers from a real backend.
+
+    python precompute_answers.py                    # OpenAI (needs OPENAI_API_KEY)
+    python precompute_answers.py --backend stub     # offline, deterministic test run
+"""
+
+import argparse
+import asyncio
+from datetime import datetime, timezone
+import json
+import os
+from pathlib import Path
+
+from data_store import StudyStore
+from llm_client import KULTIE_MODEL, KULTIE_TEMPERATURE, kultie_messages
+from response_cache import normalize_prompt
+from retrieval import ContextRetriever
+
+STARTER_QUESTIONS = [
+    "What are the biggest opportunities in this market?",
+    "Which personas should we target first?",
+    "Which themes are gaining momentum fastest?",
+    "Who are the key influencers we should partner with?",
+    "What should our next campaign focus on?",
+]
+
+# Backends whose answers the app may show as precomputed
+REAL_BACKENDS = frozenset({"openai"})
+STUB_ANSWERS_DIR = Path("build") / "answers-stub"
+
+
+def answers_path(entry, out_dir=None):
+    """data/<brand>/answers/<study>.json for a ``data_store.StudyEntry``, or <out_dir>/<brand>/<study>.json."""
+    if out_dir is not None:
+        return Path(out_dir) / entry.brand / f"{entry.name}.json"
+    return entry.path.parent / "answers" / f"{entry.name}.json"
+
+
+def load_answers(entry, out_dir=None, backends=REAL_BACKENDS):
+    """{normalized question: (question, answer)} precomputed for this exact study version by one of ``backends``."""
+    path = answers_path(entry, out_dir)
+    try:
+        payload = json.loads(path.read_text())
+    except (OSError, ValueError):
+        return {}
+    if payload.get("study_checksum") != entry.checksum or payload.get("backend") not in backends:
+        return {}
+    return {normalize_prompt(a["question"]): (a["question"], a["answer"]) for a in payload.get("answers", [])}
+
+
+class RateLimiter:
+    """Spaces call starts evenly so at most ``per_minute`` begin in any minute."""
+
+    def __init__(self, per_minute):
+        self.interval = 60.0 / per_minute
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            now = loop.time()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            await asyncio.sleep(start - now)
+
+
+class StubBackend:
+    """Offline backend that echoes the question and how much context it was given."""
+
+    name = "stub"
+
+    def __init__(self, latency=0.05):
+        self.latency = latency
+
+    async def answer(self, messages, model, temperature, max_tokens):
+        await asyncio.sleep(self.latency)
+        context = sum(len(m["content"]) for m in messages[1:-1])
+        return f"[stub:{model}] {messages[-1]['content']} (grounded in {context} characters of context)"
+
+
+class OpenAIBackend:
+    name = "openai"
+
+    def __init__(self, api_key, timeout=60.0):
+        import openai
+
+        self._client = openai.AsyncOpenAI(api_key=api_key, timeout=timeout, max_retries=4)
+
+    async def answer(self, messages, model, temperature, max_tokens):
+        response = await self._client.chat.completions.create(
+            model=model, messages=messages, temperature=temperature, max_tokens=max_tokens
+        )
+        return response.choices[0].message.content
+
+
+async def precompute(store, backend, questions, *, model=KULTIE_MODEL, temperature=KULTIE_TEMPERATURE,
+                     max_tokens=800, per_minute=60, concurrency=8, research_dir="research", force=False,
+                     out_dir=None):
+    """Answer ``questions`` for every study in ``store``; returns (answered, skipped, failed).
+
+    Answers go next to each study, or under ``out_dir`` when given. Only
+    answers from this same backend count as already done.
+    """
+    limiter = RateLimiter(per_minute)
+    slots = asyncio.Semaphore(concurrency)
+    counts = {"answered": 0, "skipped": 0, "failed": 0}
+
+    async def ask(messages, question):
+        async with slots:
+            await limiter.wait()
+            try:
+                return await backend.answer(messages, model, temperature, max_tokens)
+            except Exception as e:
+                print(f"  failed: {question!r}: {e}")
+                return None
+
+    async def run_study(entry):
+        try:
+            study = store.study(entry.brand, entry.name)
+        except ValueError as e:
+            print(f"{entry.brand}/{entry.name}: skipped, invalid study ({e})")
+            return
+        done = {} if force else load_answers(entry, out_dir, backends={backend.name})
+        todo = [q for q in questions if normalize_prompt(q) not in done]
+        counts["skipped"] += len(questions) - len(todo)
+        if not todo:
+            return
+        research_file = study.ai_context.research_file
+        research_path = Path(research_dir) / research_file if research_file else None
+        # Built off the event loop: vectorizing a study is CPU-bound
+        retriever = await asyncio.to_thread(ContextRetriever.for_study, study, research_path)
+
+        async def answer(question):
+            context, _ = retriever.build_context(question)
+            messages = kultie_messages(study.ai_context.system_context, context, question)
+            return question, await ask(messages, question)
+
+        results = await asyncio.gather(*(answer(q) for q in todo))
+        fresh = {normalize_prompt(q): (q, a) for q, a in results if a is not None}
+        counts["answered"] += len(fresh)
+        counts["failed"] += len(todo) - len(fresh)
+        merged = {**done, **fresh}
+        payload = {
+            "study_checksum": entry.checksum,
+            "backend": backend.name,
+            "model": model,
+            "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "answers": [{"question": q, "answer": a} for q, a in merged.values()],
+        }
+        path = answers_path(entry, out_dir)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps(payload, indent=2, ensure_ascii=False))
+        os.replace(tmp, path)
+        print(f"{entry.brand}/{entry.name}: {len(fresh)} answered, {len(todo) - len(fresh)} failed")
+
+    entries = [store.entry(b, s) for b in store.brands() for s in store.studies(b)]
+    await asyncio.gather(*(run_study(e) for e in entries))
+    return counts["answered"], counts["skipped"], counts["failed"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute Kultie answers for each study's starter questions.")
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--research-dir", default="research")
+    parser.add_argument("--questions", help="text file with one question per line (default: built-in starters)")
+    parser.add_argument("--backend", choices=["openai", "stub"], default="openai")
+    parser.add_argument("--model", default=KULTIE_MODEL)
+    parser.add_argument("--per-minute", type=int, default=60, help="max upstream requests started per minute")
+    parser.add_argument("--concurrency", type=int, default=8, help="max requests in flight")
+    parser.add_argument("--force", action="store_true", help="regenerate answers that are still current")
+    parser.add_argument("--out", help=f"write answers here instead of next to each study "
+                                      f"(stub runs default to {STUB_ANSWERS_DIR})")
+    args = parser.parse_args()
+
+    questions = STARTER_QUESTIONS
+    if args.questions:
+        questions = [q.strip() for q in Path(args.questions).read_text().splitlines() if q.strip()]
+    out_dir = args.out
+    if args.backend == "stub":
+        # Stub answers must never land where the app serves precomputed answers from
+        out_dir = Path(out_dir or STUB_ANSWERS_DIR)
+        if out_dir.resolve().is_relative_to(Path(args.data_dir).resolve()):
+            parser.error(f"--backend stub cannot write into {args.data_dir}")
+        backend = StubBackend()
+    else:
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            parser.error("OPENAI_API_KEY is not set (use --backend stub for an offline run)")
+        backend = OpenAIBackend(api_key)
+
+    store = StudyStore(args.data_dir)
+    answered, skipped, failed = asyncio.run(precompute(
+        store, backend, questions, model=args.model, per_minute=args.per_minute,
+        concurrency=args.concurrency, research_dir=args.research_dir, force=args.force, out_dir=out_dir,
+    ))
+    print(f"Answered {answered}, kept {skipped} current, {failed} failed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+# prerender.py
+"""Compile every study's HTML fragments ahead of time.
+
+For each data/<brand>/<study>.json this writes the link-resolved fragments the
+renderer would build on first view to build/html/<brand>/<study>/<section>.json,
+plus a manifest.json recording the study checksum and renderer version. Studies
+whose manifest is still current are skipped, and the rest are compiled in
+parallel worker processes. Pathway graphs are also laid out to SVG when Graphviz
+is installed. The live app then only stitches fragments together.
+
+    python prerender.py [--data-dir data] [--out build/html] [--workers N] [--force]
+"""
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import json
+import os
+from pathlib import Path
+
+from data_store import build_manifest, read_study
+from insights_renderer import RENDERER_VERSION, InsightsRenderer
+from pathway_graph import render_svg
+from study_index import build_index
+from study_model import parse_study
+
+DEFAULT_HTML_DIR = Path("build") / "html"
+
+# Paged lists (themes, people) get one fragment per item, stitched by position
+SECTIONS = {
+    "themes": (lambda s: s.stories.themes, "_themes_html"),
+    "dimensions": (lambda s: s.stories.dimensions, "_dimensions_html"),
+    "evolution": (lambda s: s.stories.evolution, "_evolution_html"),
+    "people": (lambda s: s.people, "_people_html"),
+    "narratives": (lambda s: s.influencers.narratives, "_narratives_html"),
+    "pathways": (lambda s: s.influencers.pathways, "_pathways_dot"),
+    "hypotheses": (lambda s: s.ideas.hypotheses, "_hypotheses_html"),
+    "gaps": (lambda s: s.ideas.gaps, "_gaps_html"),
+    "playbooks": (lambda s: s.ideas.playbooks, "_playbooks_html"),
+    "scenarios": (lambda s: s.ideas.scenarios, "_scenarios_html"),
+    "recommendations": (lambda s: s.ideas.recommendations, "_recommendations_html"),
+}
+
+
+def study_dir(entry, out_dir=DEFAULT_HTML_DIR):
+    return Path(out_dir) / entry.brand / entry.name
+
+
+def _read_manifest(directory):
+    try:
+        return json.loads((Path(directory) / "manifest.json").read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def is_current(entry, out_dir=DEFAULT_HTML_DIR):
+    manifest = _read_manifest(study_dir(entry, out_dir))
+    return manifest.get("checksum") == entry.checksum and manifest.get("renderer_version") == RENDERER_VERSION
+
+
+def fragment_dir(entry, out_dir=DEFAULT_HTML_DIR):
+    """Directory of pre-rendered fragments for this exact study version, or None."""
+    if entry is None or not is_current(entry, out_dir):
+        return None
+    return study_dir(entry, out_dir)
+
+
+def _write_json(path, payload):
+    tmp = path.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps(payload, ensure_ascii=False))
+    os.replace(tmp, path)
+
+
+def compile_study(entry, out_dir=DEFAULT_HTML_DIR):
+    """Render one study's sections to disk; returns the number of sections written.
+
+    ``entry`` is the study's manifest entry, so a worker reads only that study.
+    """
+    study = parse_study(read_study(entry))
+    renderer = InsightsRenderer(study, index=build_index(study))
+    directory = study_dir(entry, out_dir)
+    directory.mkdir(parents=True, exist_ok=True)
+    # Drop the manifest first so a half-written study is never served
+    (directory / "manifest.json").unlink(missing_ok=True)
+    written = []
+    for section, (select, builder) in SECTIONS.items():
+        data = select(study)
+        if not data:
+            (directory / f"{section}.json").unlink(missing_ok=True)
+            continue
+        fragments = getattr(renderer, builder)(data)
+        if section == "pathways":
+            render_svg(fragments)  # lay the graph out now (no-op without Graphviz)
+        _write_json(directory / f"{section}.json", fragments)
+        written.append(section)
+    _write_json(directory / "manifest.json", {
+        "checksum": entry.checksum,
+        "renderer_version": RENDERER_VERSION,
+        "sections": written,
+    })
+    return len(written)
+
+
+def prerender(data_dir="data", out_dir=DEFAULT_HTML_DIR, workers=None, force=False):
+    """Compile every study that changed since its last pre-render; returns (compiled, skipped, failed)."""
+    entries = [entry for studies in build_manifest(data_dir).values() for entry in studies.values()]
+    todo = [e for e in entries if force or not is_current(e, out_dir)]
+    failed = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(compile_study, e, out_dir): e for e in todo}
+        for future, entry in futures.items():
+            try:
+                print(f"{entry.brand}/{entry.name}: {future.result()} sections")
+            except Exception as e:
+                failed += 1
+                print(f"{entry.brand}/{entry.name}: failed ({e})")
+    return len(todo) - failed, len(entries) - len(todo), failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-render study HTML fragments for the app.")
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--out", default=str(DEFAULT_HTML_DIR))
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--force", action="store_true", help="recompile studies that are still current")
+    args = parser.parse_args()
+    compiled, skipped, failed = prerender(args.data_dir, args.out, args.workers, args.force)
+    print(f"Compiled {compiled}, kept {skipped} current, {failed} failed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+# reference_ingest.py
+"""Streaming ingestion of a space's uploaded reference documents.
+
+Each upload is parsed incrementally (CSV row by row, text and DOCX paragraph by
+paragraph, PDF page by page) into bounded-size chunks that are written in
+batches to a per-space SQLite FTS5 index, build/spaces/<brand>/references.sqlite.
+Memory use depends on the chunk and batch size, not on the file size.
+
+Browser uploads are held in memory by Streamlit until the script reads them, so
+they stay under Streamlit's default upload limit. Large exports are ingested
+from disk instead:
+
+    python reference_ingest.py <brand> exports/mentions.csv reports/
+"""
+
+import argparse
+from contextlib import contextmanager
+import codecs
+import csv
+import hashlib
+from pathlib import Path
+import sqlite3
+import time
+import xml.etree.ElementTree as ET
+import zipfile
+
+from search_index import SearchHit, fts_query
+from space_builder import BuildEvent, space_dir
+
+CHUNK_CHARS = 1200
+BATCH_SIZE = 200
+CSV_ROWS_PER_CHUNK = 20
+SUFFIXES = (".csv", ".docx", ".pdf", ".txt")
+
+_W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    name TEXT PRIMARY KEY,
+    sha256 TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    chunks INTEGER NOT NULL,
+    status TEXT NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS chunks USING fts5(
+    body, file UNINDEXED, locator UNINDEXED,
+    tokenize = 'porter unicode61'
+);
+"""
+
+
+def _text_lines(fh, block_size=1 << 16):
+    """Decode a binary stream incrementally and yield its lines."""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    pending = ""
+    for block in iter(lambda: fh.read(block_size), b""):
+        pending += decoder.decode(block)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
+
+
+def _paragraph_chunks(paragraphs, label):
+    """Pack paragraphs into chunks of about CHUNK_CHARS; yields (locator, text)."""
+    piece, size, first, last = [], 0, 0, 0
+    for n, para in enumerate(paragraphs, 1):
+        para = para.strip()
+        if not para:
+            continue
+        for i in range(0, len(para), CHUNK_CHARS):  # split run-on paragraphs
+            part = para[i:i + CHUNK_CHARS]
+            if piece and size + len(part) > CHUNK_CHARS:
+                yield f"{label} {first}–{last}", "\n".join(piece)
+                piece, size = [], 0
+            if not piece:
+                first = n
+            piece.append(part)
+            size += len(part) + 1
+            last = n
+    if piece:
+        yield f"{label} {first}–{last}", "\n".join(piece)
+
+
+def _csv_chunks(fh):
+    reader = csv.reader(_text_lines(fh))
+    header = next(reader, None)
+    if header is None:
+        return
+    rows, size, first = [], 0, 2
+    for line_no, row in enumerate(reader, 2):
+        text = "; ".join(f"{h}: {v}" for h, v in zip(header, row) if v.strip())[:CHUNK_CHARS]
+        rows.append(text)
+        size += len(text) + 1
+        if len(rows) == CSV_ROWS_PER_CHUNK or size >= CHUNK_CHARS:
+            yield f"rows {first}–{line_no}", "\n".join(rows)
+            rows, size, first = [], 0, line_no + 1
+    if rows:
+        yield f"rows {first}–{first + len(rows) - 1}", "\n".join(rows)
+
+
+def _docx_paragraphs(fh):
+    with zipfile.ZipFile(fh) as archive, archive.open("word/document.xml") as xml:
+        for _, element in ET.iterparse(xml, events=("end",)):
+            if element.tag == f"{_W_NS}p":
+                yield "".join(t.text or "" for t in element.iter(f"{_W_NS}t"))
+                element.clear()
+
+
+def _pdf_pages(fh):
+    from pypdf import PdfReader
+
+    for page in PdfReader(fh).pages:
+        yield page.extract_text() or ""
+
+
+def iter_chunks(fh, suffix):
+    """Yield (locator, text) chunks of an open binary reference file."""
+    suffix = suffix.lower()
+    if suffix == ".csv":
+        yield from _csv_chunks(fh)
+    elif suffix == ".docx":
+        yield from _paragraph_chunks(_docx_paragraphs(fh), "paragraphs")
+    elif suffix == ".pdf":
+        yield from _paragraph_chunks(_pdf_pages(fh), "pages")
+    else:
+        yield from _paragraph_chunks(_text_lines(fh), "lines")
+
+
+class ReferenceIndex:
+    """Full-text index over one space's ingested reference documents."""
+
+    def __init__(self, brand):
+        self.path = space_dir(brand) / "references.sqlite"
+
+    @contextmanager
+    def _connect(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                conn.executescript(_SCHEMA)
+                yield conn
+        finally:
+            conn.close()
+
+    def files(self):
+        """[(name, size, chunks, status)] of every ingested file."""
+        if not self.path.exists():
+            return []
+        with self._connect() as conn:
+            return conn.execute("SELECT name, size, chunks, status FROM files ORDER BY name").fetchall()
+
+    def ingest(self, path, sha256=None):
+        """Index ``path`` chunk by chunk, yielding ``BuildEvent`` progress.
+
+        A file already indexed with the same content hash is skipped.
+        """
+        path = Path(path)
+        started = time.monotonic()
+        size = path.stat().st_size
+        event = lambda message, done: BuildEvent("references", message, done, size, time.monotonic() - started)
+        if sha256 is None:
+            digest = hashlib.sha256()
+            with open(path, "rb") as fh:
+                for block in iter(lambda: fh.read(1 << 16), b""):
+                    digest.update(block)
+            sha256 = digest.hexdigest()
+        with self._connect() as conn:
+            known = conn.execute("SELECT sha256, status FROM files WHERE name = ?", (path.name,)).fetchone()
+        if known == (sha256, "indexed"):
+            yield event(f"{path.name} already indexed", size)
+            return
+
+        with self._connect() as conn:
+            conn.execute("DELETE FROM chunks WHERE file = ?", (path.name,))
+            conn.execute(
+                "INSERT OR REPLACE INTO files (name, sha256, size, chunks, status) VALUES (?, ?, ?, 0, 'indexing')",
+                (path.name, sha256, size),
+            )
+        count, batch = 0, []
+        try:
+            with open(path, "rb") as fh:
+                for locator, text in iter_chunks(fh, path.suffix):
+                    batch.append((text, path.name, locator))
+                    if len(batch) == BATCH_SIZE:
+                        count += self._write(batch)
+                        batch = []
+                        # Bytes consumed so far (approximate for zipped/seekable formats)
+                        yield event(f"{path.name}: {count} chunks", min(fh.tell(), size))
+                count += self._write(batch)
+        except Exception as e:
+            self._finish(path.name, count, f"failed: {e}")
+            raise
+        self._finish(path.name, count, "indexed")
+        yield event(f"{path.name}: {count} chunks indexed", size)
+
+    def _write(self, batch):
+        if not batch:
+            return 0
+        with self._connect() as conn:
+            conn.executemany("INSERT INTO chunks (body, file, locator) VALUES (?, ?, ?)", batch)
+        return len(batch)
+
+    def _finish(self, name, count, status):
+        with self._connect() as conn:
+            conn.execute("UPDATE files SET chunks = ?, status = ? WHERE name = ?", (count, status, name))
+
+    def search(self, text, limit=10, any_term=False):
+        """Best-ranked reference chunks for ``text`` as ``search_index.SearchHit``s."""
+        query = fts_query(text, any_term=any_term)
+        if not query or not self.path.exists():
+            return []
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT file, locator, snippet(chunks, 0, '**', '**', ' … ', 12), body, bm25(chunks)"
+                " FROM chunks WHERE chunks MATCH ? ORDER BY bm25(chunks) LIMIT ?",
+                (query, limit),
+            ).fetchall()
+        return [SearchHit("", "", "references", f"{file} · {locator}", snippet, score, body)
+                for file, locator, snippet, body, score in rows]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest reference documents into a space's index.")
+    parser.add_argument("brand")
+    parser.add_argument("paths", nargs="+", help="files, or directories whose documents are ingested")
+    args = parser.parse_args()
+
+    files = []
+    for path in map(Path, args.paths):
+        if path.is_dir():
+            files.extend(p for p in sorted(path.iterdir()) if p.suffix.lower() in SUFFIXES)
+        elif path.is_file():
+            files.append(path)
+        else:
+            parser.error(f"No file or directory at {path}")
+    references = ReferenceIndex(args.brand.lower())
+    failed = 0
+    for path in files:
+        try:
+            for event in references.ingest(path):
+                pass
+            print(event.message)
+        except Exception as e:
+            failed += 1
+            print(f"{path.name}: failed ({e})")
+    print(f"Ingested {len(files) - failed} files, {failed} failed")
+
+
+if __name__ == "__main__":
+    main()
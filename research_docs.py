@@ -0,0 +1,92 @@
+# research_docs.py
+"""Research notes (research/*.md) parsed once into a section tree.
+
+Level-2 headings become sections and level-3 headings their subsections; the
+"## Sources" section and ``[^n]: url`` footnote definitions are collected
+separately. Parsed documents are cached per file version, so Deep Research
+only pays for the sections a reader actually opens.
+"""
+
+from dataclasses import dataclass
+from pathlib import Path
+import re
+
+from fragment_cache import FragmentCache
+
+_HEADING_RE = re.compile(r"^(#{1,3})\s+(.*?)\s*#*\s*$")
+_FOOTNOTE_RE = re.compile(r"^\[\^[^\]]+\]:\s+\S")
+
+_DOCS = FragmentCache(maxsize=32)
+
+
+@dataclass(frozen=True, slots=True)
+class Section:
+    title: str
+    body: str
+    children: tuple = ()  # subsections (Section) in document order
+
+
+@dataclass(frozen=True, slots=True)
+class ResearchDoc:
+    title: str
+    preamble: str
+    sections: tuple
+    sources: str  # markdown, "" if the note cites nothing
+
+
+def _clean_title(title):
+    return title.replace("**", "").strip().rstrip(":")
+
+
+def parse_research(text):
+    """Split research markdown into a ``ResearchDoc``."""
+    title, preamble, sources = "", [], []
+    sections = []  # [title, body lines, [[child title, child body lines], ...]]
+    in_sources = False
+    current = preamble
+    for line in text.splitlines():
+        if _FOOTNOTE_RE.match(line):
+            sources.append(line)
+            continue
+        match = _HEADING_RE.match(line)
+        if match:
+            level, heading = len(match.group(1)), _clean_title(match.group(2))
+            if level == 1 and not title and not sections:
+                title, current = heading, preamble
+                continue
+            in_sources = level <= 2 and heading.lower() == "sources"
+            if in_sources:
+                continue
+            if level <= 2 or not sections:
+                sections.append([heading, [], []])
+                current = sections[-1][1]
+            else:
+                sections[-1][2].append([heading, []])
+                current = sections[-1][2][-1][1]
+            continue
+        if in_sources:
+            sources.append(line)
+        else:
+            current.append(line)
+
+    def body(lines):
+        return "\n".join(lines).strip()
+
+    return ResearchDoc(
+        title=title,
+        preamble=body(preamble),
+        sections=tuple(
+            Section(heading, body(lines), tuple(Section(t, body(b)) for t, b in children))
+            for heading, lines, children in sections
+        ),
+        # Footnote definitions need a blank line between them to render as a list
+        sources="\n\n".join(line for line in sources if line.strip()),
+    )
+
+
+def load_research(path):
+    """Parsed ``ResearchDoc`` for ``path``, re-read only when the file changes."""
+    path = Path(path)
+    stat = path.stat()
+    key = (str(path.resolve()), stat.st_size, stat.st_mtime_ns)
+    return _DOCS.get_or_build(key, lambda: parse_research(path.read_text()))
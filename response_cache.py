@@ -0,0 +1,192 @@
+# response_cache.py
+
+from concurrent.futures import Future
+from contextlib import contextmanager
+import hashlib
+import json
+from pathlib import Path
+import sqlite3
+import threading
+import time
+
+DEFAULT_CACHE_PATH = Path("build") / "kultie_cache.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    created REAL NOT NULL,
+    used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_used ON responses (used);
+"""
+
+
+def _digest(text):
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+
+def normalize_prompt(prompt):
+    """Case- and whitespace-insensitive form of a question, minus trailing punctuation."""
+    return " ".join(prompt.lower().split()).rstrip("?!. ")
+
+
+def response_key(model, system_context, context, prompt, temperature):
+    """Cache key for one completion request."""
+    parts = [model, _digest(system_context), _digest(context), normalize_prompt(prompt), temperature]
+    return _digest(json.dumps(parts))
+
+
+class UpstreamIncomplete(RuntimeError):
+    """Set on an in-flight call whose owner stopped before finishing (cancelled, timed out or failed)."""
+
+
+class ResponseCache:
+    """Disk-backed LLM response cache with TTL, LRU size bound and in-flight coalescing.
+
+    Entries live in SQLite so they survive restarts and are shared by every
+    worker on the host. Concurrent misses for the same key within one process
+    wait on a single upstream call instead of each making their own; if that
+    call does not finish, one waiter takes over and calls upstream itself.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl=24 * 3600, max_entries=2000):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._inflight = {}  # key -> Future of the upstream call
+        self._ready = False
+
+    @contextmanager
+    def _connect(self):
+        if not self._ready:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            with conn:
+                if not self._ready:
+                    conn.executescript(_SCHEMA)
+                    self._ready = True
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key):
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value FROM responses WHERE key = ? AND created > ?", (key, now - self.ttl)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE responses SET used = ? WHERE key = ?", (now, key))
+        return row[0]
+
+    def put(self, key, value):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created, used) VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            conn.execute("DELETE FROM responses WHERE created <= ?", (now - self.ttl,))
+            conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                " SELECT key FROM responses ORDER BY used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def _join(self, key, timeout=None):
+        """Claim ``key`` or wait for the identical call in flight.
+
+        Returns (future, None) when the caller owns the call and must finish it
+        with ``_release``, or (None, value) with the owner's answer. A waiter
+        whose owner gives up claims the key itself. Raises TimeoutError after
+        ``timeout`` seconds of waiting.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                future = self._inflight.get(key)
+                if future is None:
+                    future = self._inflight[key] = Future()
+                    return future, None
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                return None, future.result(timeout=remaining)
+            except UpstreamIncomplete:
+                continue
+
+    def _release(self, key, future, value):
+        """End an owned call: hand ``value`` to waiters, or None to let one of them take over."""
+        # Unregister first so a waiter that takes over claims a fresh slot
+        with self._lock:
+            self._inflight.pop(key, None)
+        if value is None:
+            future.set_exception(UpstreamIncomplete("upstream answer did not complete"))
+        else:
+            future.set_result(value)
+
+    def get_or_compute(self, key, compute, timeout=None):
+        """Return (value, cached); ``cached`` is True if no upstream call was made here.
+
+        ``timeout`` bounds the wait for an identical call already in flight.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value, True
+        future, value = self._join(key, timeout)
+        if future is None:
+            return value, True
+        try:
+            value = compute()
+            self.put(key, value)
+            return value, False
+        finally:
+            self._release(key, future, value)
+
+    def stream(self, key, produce, timeout=None):
+        """Like ``get_or_compute`` for streamed answers; see ``CachedStream``."""
+        return CachedStream(self, key, produce, timeout)
+
+
+class CachedStream:
+    """Iterable of text pieces for one cache key.
+
+    A hit (or an identical call already in flight) yields the whole answer at
+    once. A miss iterates ``produce()`` and stores the joined text only if the
+    stream ran to completion, so cancelled or timed-out answers are not cached;
+    sessions waiting on such an answer take over and ask upstream themselves.
+    ``timeout`` bounds the wait for another session's answer.
+    ``cached`` tells, after iteration started, whether no upstream call was made.
+    """
+
+    def __init__(self, cache, key, produce, timeout=None):
+        self.cache = cache
+        self.key = key
+        self.produce = produce
+        self.timeout = timeout
+        self.cached = False
+
+    def __iter__(self):
+        cache, key = self.cache, self.key
+        value = cache.get(key)
+        if value is not None:
+            self.cached = True
+            yield value
+            return
+        future, value = cache._join(key, self.timeout)
+        if future is None:
+            self.cached = True
+            yield value
+            return
+        parts = []
+        try:
+            for piece in self.produce():
+                parts.append(piece)
+                yield piece
+            value = "".join(parts)
+            cache.put(key, value)
+        finally:
+            cache._release(key, future, value)
@@ -0,0 +1,87 @@
+# retrieval.py
+"""Local TF-IDF retrieval over a study and its research note, for grounding Kultie.
+
+Documents from ``corpus`` are split into paragraph-sized chunks, vectorized once
+per study version, and the best-scoring chunks are packed into a prompt context
+that stays under a token budget.
+"""
+
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from corpus import research_documents, study_documents
+
+DEFAULT_TOKEN_BUDGET = 1500
+
+
+def estimate_tokens(text):
+    """Rough token count (~4 characters per token for English prose)."""
+    return len(text) // 4 + 1
+
+
+def chunk_documents(documents, max_chars=1200):
+    """Yield (document, text) pairs, splitting long bodies on paragraph breaks."""
+    for doc in documents:
+        piece = ""
+        for para in doc.body.split("\n"):
+            para = para.strip()
+            if not para:
+                continue
+            para = para[:max_chars]  # one run-on paragraph must not blow the budget
+            if piece and len(piece) + len(para) + 1 > max_chars:
+                yield doc, piece
+                piece = ""
+            piece = f"{piece}\n{para}" if piece else para
+        if piece:
+            yield doc, piece
+
+
+class ContextRetriever:
+    """Cosine-similarity search over TF-IDF vectors of study/research chunks."""
+
+    def __init__(self, documents):
+        self.chunks = list(chunk_documents(documents))
+        self._vectorizer = TfidfVectorizer(stop_words="english", sublinear_tf=True, ngram_range=(1, 2))
+        texts = [f"{doc.title}\n{text}" for doc, text in self.chunks]
+        try:
+            self._matrix = self._vectorizer.fit_transform(texts)
+        except ValueError:  # no chunks, or nothing but stop words
+            self._matrix = None
+
+    @classmethod
+    def for_study(cls, study, research_path=None):
+        documents = list(study_documents("", "", study))
+        if research_path is not None and research_path.exists():
+            documents.extend(research_documents(research_path))
+        return cls(documents)
+
+    def top_k(self, query, k=8):
+        """Best (document, chunk text, score) triples for ``query``, highest first."""
+        if self._matrix is None:
+            return []
+        scores = (self._matrix @ self._vectorizer.transform([query]).T).toarray().ravel()
+        best = scores.argsort()[::-1][:k]
+        return [(*self.chunks[i], float(scores[i])) for i in best if scores[i] > 0]
+
+    def build_context(self, query, budget_tokens=DEFAULT_TOKEN_BUDGET, k=12):
+        """Pack the top chunks into one context string of at most ``budget_tokens``.
+
+        Returns (context, [(section, title), ...] of the chunks that were included).
+        """
+        return pack_chunks(((doc.section, doc.title, text) for doc, text, _ in self.top_k(query, k)), budget_tokens)
+
+
+def pack_chunks(chunks, budget_tokens):
+    """Join ranked (section, title, text) chunks into a context of at most ``budget_tokens``.
+
+    Returns (context, [(section, title), ...] of the chunks that were included).
+    """
+    parts, used, spent = [], [], 0
+    for section, title, text in chunks:
+        block = f"[{section}] {title}\n{text}"
+        cost = estimate_tokens(block)
+        if spent + cost > budget_tokens:
+            continue  # a smaller, lower-ranked chunk may still fit
+        parts.append(block)
+        used.append((section, title))
+        spent += cost
+    return "\n\n".join(parts), used
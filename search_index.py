@@ -0,0 +1,196 @@
+# search_index.py
+"""On-disk full-text index over every study and research note (SQLite FTS5).
+
+Sources are tracked by checksum, so ``update()`` only re-indexes studies and
+research files that changed since the last run; the index file survives
+restarts and is shared by every session. The research file each indexed study
+cites is stored alongside it, so research notes are linked to their study
+without parsing studies that did not change.
+"""
+
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+import re
+import sqlite3
+import threading
+import time
+
+from corpus import research_documents, study_documents
+from data_store import file_checksum, read_study
+from study_model import parse_study
+
+DEFAULT_INDEX_PATH = Path("build") / "search.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    source TEXT PRIMARY KEY,
+    checksum TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS citations (
+    source TEXT PRIMARY KEY,  -- study source
+    research_file TEXT NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS docs USING fts5(
+    title, body,
+    brand UNINDEXED, study UNINDEXED, section UNINDEXED, source UNINDEXED,
+    tokenize = 'porter unicode61'
+);
+"""
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+@dataclass(frozen=True, slots=True)
+class SearchHit:
+    brand: str
+    study: str
+    section: str
+    title: str
+    snippet: str
+    score: float
+    body: str = ""
+
+
+def fts_query(text, any_term=False):
+    """Turn free text into a safe FTS5 query.
+
+    By default every word must match (the last one as a prefix, for search-as-
+    you-type); ``any_term`` ORs the words instead, for natural-language questions.
+    """
+    tokens = _TOKEN_RE.findall(text.lower())
+    if not tokens:
+        return ""
+    if any_term:
+        return " OR ".join(f'"{t}"' for t in tokens)
+    terms = [f'"{t}"' for t in tokens[:-1]] + [f'"{tokens[-1]}"*']
+    return " ".join(terms)
+
+
+class SearchIndex:
+    """Incrementally maintained FTS5 index of ``corpus.Document`` rows."""
+
+    def __init__(self, path=DEFAULT_INDEX_PATH, research_dir="research", refresh_interval=2.0):
+        self.path = Path(path)
+        self.research_dir = Path(research_dir)
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._checked_at = None
+        self._research_stats = {}  # path -> (size, mtime_ns, checksum)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        # One short-lived connection per call keeps sessions on different threads independent
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _research_checksum(self, path):
+        """sha256 of a research file, rehashed only when its size or mtime changed."""
+        stat = path.stat()
+        known = self._research_stats.get(path)
+        if known and known[:2] == (stat.st_size, stat.st_mtime_ns):
+            return known[2]
+        checksum = file_checksum(path)
+        self._research_stats[path] = (stat.st_size, stat.st_mtime_ns, checksum)
+        return checksum
+
+    def _replace(self, conn, source, docs, checksum):
+        conn.execute("DELETE FROM docs WHERE source = ?", (source,))
+        conn.executemany(
+            "INSERT INTO docs (title, body, brand, study, section, source) VALUES (?, ?, ?, ?, ?, ?)",
+            [(d.title, d.body, d.brand, d.study, d.section, source) for d in docs],
+        )
+        conn.execute("INSERT OR REPLACE INTO sources (source, checksum) VALUES (?, ?)", (source, checksum))
+
+    def update(self, store, force=False):
+        """Re-index changed sources from a ``data_store.StudyStore``; returns how many changed.
+
+        Only studies whose checksum changed are parsed, straight from disk
+        rather than through the store, so indexing does not pin every study in
+        the store's caches. Research files are rehashed when their size or
+        mtime changed, and re-indexed when their content or owning study (the
+        first study citing them) changed.
+        """
+        now = time.monotonic()
+        if not force and self._checked_at is not None and now - self._checked_at < self.refresh_interval:
+            return 0
+        with self._lock:
+            self._checked_at = now
+            with self._connect() as conn:
+                indexed = dict(conn.execute("SELECT source, checksum FROM sources"))
+                cited = dict(conn.execute("SELECT source, research_file FROM citations"))
+                studies = {}
+                for brand in store.brands():
+                    for study in store.studies(brand):
+                        entry = store.entry(brand, study)
+                        studies[str(entry.path)] = entry
+                research = {}
+                if self.research_dir.is_dir():
+                    research = {str(p): p for p in sorted(self.research_dir.glob("*.md"))}
+
+                changed = 0
+                for source in [s for s in indexed if s not in studies and s not in research]:
+                    conn.execute("DELETE FROM docs WHERE source = ?", (source,))
+                    conn.execute("DELETE FROM sources WHERE source = ?", (source,))
+                    conn.execute("DELETE FROM citations WHERE source = ?", (source,))
+                    cited.pop(source, None)
+                    changed += 1
+                for source, entry in studies.items():
+                    # Studies indexed before citations were stored are parsed once to record theirs
+                    if indexed.get(source) == entry.checksum and source in cited:
+                        continue
+                    try:
+                        model = parse_study(read_study(entry))
+                    except (OSError, ValueError):
+                        continue  # malformed or just deleted: keep whatever was indexed before
+                    cited[source] = model.ai_context.research_file
+                    conn.execute("INSERT OR REPLACE INTO citations (source, research_file) VALUES (?, ?)",
+                                 (source, cited[source]))
+                    if indexed.get(source) != entry.checksum:
+                        self._replace(conn, source, study_documents(entry.brand, entry.name, model, source),
+                                      entry.checksum)
+                        changed += 1
+
+                owners = {}  # research file name -> (brand, study) of the first study citing it
+                for source, entry in studies.items():
+                    if cited.get(source):
+                        owners.setdefault(cited[source], (entry.brand, entry.name))
+                for source, path in research.items():
+                    try:
+                        digest = self._research_checksum(path)
+                    except OSError:
+                        continue  # deleted since the scan: dropped on the next update
+                    # The owning study is part of the key so a re-pointed research_file re-links hits
+                    checksum = f"{digest}:{'/'.join(owners.get(path.name, ()))}"
+                    if indexed.get(source) != checksum:
+                        brand, study = owners.get(path.name, ("", ""))
+                        self._replace(conn, source, research_documents(path, brand, study), checksum)
+                        changed += 1
+            return changed
+
+    def search(self, text, limit=20, brand=None):
+        """Best-ranked hits for ``text`` (bm25, titles weighted above bodies)."""
+        query = fts_query(text)
+        if not query:
+            return []
+        sql = (
+            "SELECT brand, study, section, title,"
+            " snippet(docs, 1, '**', '**', ' … ', 12), bm25(docs, 5.0, 1.0)"
+            " FROM docs WHERE docs MATCH ?"
+        )
+        params = [query]
+        if brand:
+            sql += " AND brand = ?"
+            params.append(brand)
+        sql += " ORDER BY bm25(docs, 5.0, 1.0) LIMIT ?"
+        params.append(limit)
+        with self._connect() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        return [SearchHit(*row) for row in rows]
@@ -0,0 +1,125 @@
+# snapshot.py
+"""Compile data/ into one binary snapshot that workers mmap and decode per study.
+
+Layout (all integers little-endian):
+
+    b"KSNP" | u16 format version | u32 header length | header JSON | payloads
+
+The header lists every study with its source size, mtime and checksum plus the
+offset/length of its pickled payload. Readers treat an entry as stale when the
+JSON file on disk no longer matches, and fall back to parsing the file. Journal
+deltas are not compiled in; the store replays them on top.
+
+Build with:  python snapshot.py [--data-dir data] [--out build/data.snapshot]
+"""
+
+import argparse
+import json
+import mmap
+import os
+from pathlib import Path
+import pickle
+import struct
+
+from data_store import StudyEntry, build_manifest
+
+MAGIC = b"KSNP"
+FORMAT_VERSION = 1
+DEFAULT_SNAPSHOT_PATH = Path("build") / "data.snapshot"
+
+_PREAMBLE = struct.Struct("<4sHI")
+
+
+class Snapshot:
+    """Read-only view over a snapshot file; payloads are unpickled on demand."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path, "rb") as fh:
+            self._buf = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, header_len = _PREAMBLE.unpack_from(self._buf, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            self._buf.close()
+            raise ValueError(f"Unsupported snapshot format in {self.path}")
+        start = _PREAMBLE.size
+        header = json.loads(self._buf[start:start + header_len])
+        self._data_start = start + header_len
+        self._entries = {(e["brand"], e["study"]): e for e in header["entries"]}
+
+    def manifest(self, data_dir):
+        """Manifest entries as recorded at build time, for reuse by build_manifest."""
+        manifest = {}
+        for (brand, study), e in self._entries.items():
+            manifest.setdefault(brand, {})[study] = StudyEntry(
+                brand=brand,
+                name=study,
+                path=Path(data_dir) / e["dir"] / f"{study}.json",
+                size=e["size"],
+                mtime_ns=e["mtime_ns"],
+                checksum=e["checksum"],
+                base_checksum=e["checksum"],
+            )
+        return manifest
+
+    def load(self, entry):
+        """Decode a study if the snapshot copy matches ``entry``; None if stale or absent."""
+        e = self._entries.get((entry.brand, entry.name))
+        if e is None or e["checksum"] != entry.base_checksum:
+            return None
+        offset = self._data_start + e["offset"]
+        return pickle.loads(self._buf[offset:offset + e["length"]])
+
+
+def open_snapshot(path=DEFAULT_SNAPSHOT_PATH):
+    """Open a snapshot, or return None when it is missing or from another format version."""
+    try:
+        return Snapshot(path)
+    except (OSError, ValueError, struct.error):
+        return None
+
+
+def build_snapshot(data_dir="data", out=DEFAULT_SNAPSHOT_PATH):
+    """Parse every study once and write the snapshot atomically. Returns the entry count."""
+    manifest = build_manifest(data_dir)
+    entries, payloads, offset = [], [], 0
+    for brand, studies in manifest.items():
+        for study, entry in studies.items():
+            raw = entry.path.read_bytes()
+            payload = pickle.dumps(json.loads(raw), protocol=pickle.HIGHEST_PROTOCOL)
+            entries.append({
+                "brand": brand,
+                "study": study,
+                "dir": entry.path.parent.name,
+                "size": entry.size,
+                "mtime_ns": entry.mtime_ns,
+                "checksum": entry.base_checksum,
+                "offset": offset,
+                "length": len(payload),
+            })
+            payloads.append(payload)
+            offset += len(payload)
+
+    header = json.dumps({"entries": entries}).encode()
+    out = Path(out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out.with_suffix(out.suffix + ".tmp")
+    with open(tmp, "wb") as fh:
+        fh.write(_PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header)))
+        fh.write(header)
+        for payload in payloads:
+            fh.write(payload)
+    os.replace(tmp, out)
+    return len(entries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile data/ into a binary snapshot.")
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--out", default=str(DEFAULT_SNAPSHOT_PATH))
+    args = parser.parse_args()
+    count = build_snapshot(args.data_dir, args.out)
+    print(f"Wrote {count} studies to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+# space_builder.py
+"""Build pipelines for cultural spaces ("Build Cultural Space") and their projects.
+
+``build_space`` and ``build_project`` do the real setup work and yield a
+``BuildEvent`` after every unit of it, so the UI can show progress that
+reflects what actually happened and finish as soon as the work is done.
+"""
+
+from dataclasses import dataclass
+import hashlib
+import json
+import os
+from pathlib import Path
+import re
+import time
+
+SPACES_DIR = Path("build") / "spaces"
+
+_HANDLE_RE = re.compile(r"^@?([A-Za-z0-9_.]{1,30})$")
+
+
+@dataclass(frozen=True, slots=True)
+class BuildEvent:
+    step: str  # "studies", "search", "references", "metrics", "done"
+    message: str
+    done: int
+    total: int
+    elapsed: float  # seconds since the build started
+
+
+def space_dir(brand):
+    return SPACES_DIR / brand
+
+
+def split_lines(text):
+    """Non-empty, stripped, de-duplicated lines of a text area, in order."""
+    seen = []
+    for line in (text or "").splitlines():
+        line = line.strip()
+        if line and line not in seen:
+            seen.append(line)
+    return seen
+
+
+def normalize_references(config):
+    """Clean the free-text reference fields of a space config."""
+    websites = [u if "://" in u else f"https://{u}" for u in split_lines(config.get("websites"))]
+    handles = []
+    for line in split_lines(config.get("social_handles")):
+        match = _HANDLE_RE.match(line)
+        if match and f"@{match.group(1).lower()}" not in handles:
+            handles.append(f"@{match.group(1).lower()}")
+    return {
+        "websites": websites,
+        "report_urls": split_lines(config.get("report_urls")),
+        "social_handles": handles,
+        "brand_keywords": split_lines(config.get("brand_keywords")),
+        "cultural_keywords": split_lines(config.get("cultural_keywords")),
+    }
+
+
+def _theme_summary(study):
+    themes = study.stories.themes
+    momentum = {}
+    for t in themes:
+        momentum[t.momentum or "Unknown"] = momentum.get(t.momentum or "Unknown", 0) + 1
+    confidence = [t.confidence for t in themes]
+    return {
+        "themes": len(themes),
+        "personas": len(study.people),
+        "brokers": sum(len(m.brokers) for m in study.influencers.brokers),
+        "mean_confidence": round(sum(confidence) / len(confidence), 3) if confidence else None,
+        "momentum": momentum,
+    }
+
+
+def build_space(store, search_index, config, files=(), ingest=None):
+    """Set up the space for ``config["brand_name"]``, yielding progress as it goes.
+
+    ``files`` are (name, binary file object) pairs of uploaded reference
+    documents; they are copied to build/spaces/<brand>/uploads/ and each saved
+    path is handed to ``ingest(path, sha256)``, which should schedule parsing
+    (see reference_ingest.py) off the page. The cleaned config, reference list
+    and per-study metrics are written to build/spaces/<brand>/space.json.
+    """
+    started = time.monotonic()
+    brand = config["brand_name"]
+    event = lambda step, message, done, total: BuildEvent(step, message, done, total, time.monotonic() - started)
+
+    studies = store.studies(brand)
+    parsed, errors = {}, {}
+    yield event("studies", "Loading studies...", 0, len(studies))
+    for i, name in enumerate(studies, 1):
+        try:
+            parsed[name] = store.study(brand, name)
+        except ValueError as e:
+            errors[name] = str(e)
+        yield event("studies", f"Loaded {name}", i, len(studies))
+
+    yield event("search", "Indexing studies and research notes for search...", 0, 1)
+    changed = search_index.update(store, force=True)
+    yield event("search", f"Search index up to date ({changed} sources re-indexed)", 1, 1)
+
+    references = normalize_references(config)
+    root = space_dir(brand)
+    uploads = root / "uploads"
+    saved = []
+    yield event("references", "Ingesting references...", 0, len(files))
+    for i, (name, fh) in enumerate(files, 1):
+        uploads.mkdir(parents=True, exist_ok=True)
+        path = uploads / Path(name).name
+        digest, size = hashlib.sha256(), 0
+        with open(path, "wb") as out:
+            for block in iter(lambda: fh.read(1 << 20), b""):
+                digest.update(block)
+                out.write(block)
+                size += len(block)
+        saved.append({"name": path.name, "size": size, "sha256": digest.hexdigest()})
+        if ingest is not None:
+            ingest(path, digest.hexdigest())
+        yield event("references", f"Stored {path.name}", i, len(files))
+    references["uploaded_files"] = saved
+
+    metrics = {}
+    yield event("metrics", "Precomputing sort orders and theme metrics...", 0, len(parsed))
+    for i, name in enumerate(parsed, 1):
+        store.index(brand, name)
+        metrics[name] = _theme_summary(parsed[name])
+        yield event("metrics", f"Indexed {name}", i, len(parsed))
+
+    root.mkdir(parents=True, exist_ok=True)
+    profile = {key: value for key, value in config.items() if key not in references}
+    payload = {
+        "config": profile,
+        "references": references,
+        "studies": metrics,
+        "errors": errors,
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    tmp = root / "space.json.tmp"
+    tmp.write_text(json.dumps(payload, indent=2, ensure_ascii=False))
+    os.replace(tmp, root / "space.json")
+    yield event("done", f"Space ready: {len(parsed)} studies, {len(saved)} documents", 1, 1)
+
+
+def build_project(store, brand, project):
+    """Set up a project (a study within a space), yielding progress as it goes.
+
+    Parses the project's study, builds its list indexes and writes the project
+    brief plus a metrics summary to build/spaces/<brand>/projects/<name>.json.
+    """
+    started = time.monotonic()
+    name = project["name"]
+    event = lambda step, message, done, total: BuildEvent(step, message, done, total, time.monotonic() - started)
+
+    yield event("studies", f"Loading {name}...", 0, 1)
+    study = store.study(brand, name)
+    if study is None:
+        raise ValueError(f"No study data for {brand}/{name}")
+    yield event("studies", f"Loaded {name}", 1, 1)
+
+    yield event("metrics", "Building sort and filter indexes...", 0, 1)
+    store.index(brand, name)
+    summary = _theme_summary(study)
+    yield event("metrics", f"Indexed {summary['themes']} themes, {summary['personas']} personas", 1, 1)
+
+    root = space_dir(brand) / "projects"
+    root.mkdir(parents=True, exist_ok=True)
+    slug = re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-") or "project"
+    payload = {"project": project, "metrics": summary, "built_at": time.strftime("%Y-%m-%dT%H:%M:%S")}
+    tmp = root / f"{slug}.json.tmp"
+    tmp.write_text(json.dumps(payload, indent=2, ensure_ascii=False))
+    os.replace(tmp, root / f"{slug}.json")
+    yield event("done", f"Project '{name}' ready", 1, 1)
+
@@ -0,0 +1,132 @@
+# study_index.py
+"""Sort orders and filter facets for a study's long lists, built once per study.
+
+The renderer only ever asks for "page N of these items in this order with these
+filters", which is an index intersection plus a slice, so only the visible cards
+are built and sent to the browser.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from influence_graph import broker_scores
+from study_model import parse_count, parse_percent
+
+# Lifecycle stages in order; unknown labels sort between Growing and Scaling
+MATURITY_ORDER = {
+    "Nascent": 0, "Emerging": 1, "Early Growth": 2, "Growing": 3,
+    "Scaling": 4, "Expanding": 5, "Established": 6, "Mature": 7,
+}
+
+
+@dataclass(frozen=True, slots=True)
+class ListIndex:
+    """Precomputed descending sort orders and facet -> value -> positions maps."""
+    size: int
+    orders: dict
+    facets: dict
+
+    def select(self, sort_key=None, filters=None, page=1, page_size=10):
+        """Return (positions on the requested page, total matching items)."""
+        order = self.orders[sort_key] if sort_key else np.arange(self.size)
+        if filters:
+            mask = np.ones(self.size, dtype=bool)
+            for facet, values in filters.items():
+                if not values:
+                    continue
+                allowed = np.zeros(self.size, dtype=bool)
+                for value in values:
+                    allowed[self.facets[facet].get(value, [])] = True
+                mask &= allowed
+            order = order[mask[order]]
+        total = len(order)
+        start = (max(page, 1) - 1) * page_size
+        return order[start:start + page_size].tolist(), total
+
+
+@dataclass(frozen=True, slots=True)
+class StudyIndex:
+    themes: ListIndex
+    people: ListIndex
+    brokers: ListIndex
+    broker_rows: tuple  # ((market position, broker position), ...) in file order
+    broker_scores: object = None  # influence_graph.BrokerScores aligned with broker_rows
+
+
+def _descending(values):
+    """Stable descending argsort that keeps NaN (unknown) values last."""
+    values = np.asarray(values, dtype=float)
+    keyed = np.where(np.isnan(values), np.inf, -values)
+    return np.argsort(keyed, kind="stable")
+
+
+def _facet(labels):
+    positions = {}
+    for i, label in enumerate(labels):
+        positions.setdefault(label, []).append(i)
+    return {label: np.array(idx) for label, idx in positions.items()}
+
+
+def _tiers(scores):
+    """'High' / 'Medium' / 'Low' influence by tercile of the study's brokers."""
+    if not len(scores):
+        return []
+    low, high = np.quantile(scores, [1 / 3, 2 / 3])
+    return ["High" if s > high else "Medium" if s > low else "Low" for s in scores]
+
+
+def _safe(fn, value):
+    try:
+        return fn(value)
+    except ValueError:
+        return None
+
+
+def build_index(study):
+    """Build list indexes for a ``study_model.Study``."""
+    themes = study.stories.themes
+    theme_index = ListIndex(
+        size=len(themes),
+        orders={
+            "momentum": _descending([np.nan if t.growth_pct is None else t.growth_pct for t in themes]),
+            "confidence": _descending([t.confidence for t in themes]),
+            "volume": _descending([t.volume for t in themes]),
+            "maturity": _descending([MATURITY_ORDER.get(t.maturity, 3.5) for t in themes]),
+        },
+        facets={
+            "maturity": _facet([t.maturity for t in themes]),
+            "momentum": _facet([t.momentum for t in themes]),
+        },
+    )
+
+    people = study.people
+    people_index = ListIndex(
+        size=len(people),
+        orders={"share": _descending([np.nan if p.share_pct is None else p.share_pct for p in people])},
+        facets={},
+    )
+
+    rows, reach, markets = [], [], []
+    for m, market in enumerate(study.influencers.brokers):
+        for b, broker in enumerate(market.brokers):
+            rows.append((m, b))
+            followers = _safe(parse_count, broker.followers)
+            reach.append(np.nan if followers is None else followers)
+            markets.append(market.market)
+    engagement = [
+        parse_percent(study.influencers.brokers[m].brokers[b].engagement) for m, b in rows
+    ]
+    scores = broker_scores(study.influencers)
+    broker_index = ListIndex(
+        size=len(rows),
+        orders={
+            "followers": _descending(reach),
+            "engagement": _descending([np.nan if e is None else e for e in engagement]),
+            "influence": _descending(scores.influence),
+            "reach": _descending(scores.reach),
+            "betweenness": _descending(scores.betweenness),
+        },
+        facets={"market": _facet(markets), "tier": _facet(_tiers(scores.influence))},
+    )
+    return StudyIndex(theme_index, people_index, broker_index, tuple(rows), scores)
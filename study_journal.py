@@ -0,0 +1,327 @@
+# study_journal.py
+"""Append-only journals of study deltas, compacted into the study JSON.
+
+A scan that changes a few items appends deltas to
+data/<brand>/journal/<study>.jsonl instead of rewriting
+data/<brand>/<study>.json. One delta per line:
+
+    {"op": "add", "section": "themes", "item": {"title": "...", ...}}
+    {"op": "update", "section": "people", "key": "Gen Z Sneakerheads", "item": {"share": "31%"}}
+    {"op": "retire", "section": "brokers", "market": "Vietnam", "key": "@handle"}
+
+Sections are themes, people, brokers (within a ``market``) and the idea lists
+(hypotheses, gaps, playbooks, scenarios, recommendations). Items are identified
+by title (name for people and brokers, statement for hypotheses). "add"
+inserts or replaces a whole item, "update" merges fields into it (null removes
+a field), and "retire" drops it. Every delta is idempotent, so replaying a
+journal over a study that already contains it changes nothing.
+
+``data_store.StudyStore`` replays a journal on top of the study file and, as
+the journal grows, only the bytes it has not read yet. ``compact`` folds the
+journal into a new study file and empties it:
+
+    python study_journal.py append <brand> <study> deltas.jsonl
+    python study_journal.py compact [--data-dir data] [--all]
+"""
+
+import argparse
+import fcntl
+import json
+import os
+from pathlib import Path
+import sys
+
+from study_model import parse_study
+
+JOURNAL_DIR = "journal"
+# Compact once replaying the journal would read this fraction of the study file
+COMPACT_RATIO = 0.25
+
+OPS = ("add", "update", "retire")
+# section -> (path to its list in the study payload, identifying field)
+SECTIONS = {
+    "themes": (("stories", "themes"), "title"),
+    "people": (("people",), "name"),
+    "brokers": (("influencers", "brokers"), "name"),
+    "hypotheses": (("ideas", "hypotheses"), "statement"),
+    "gaps": (("ideas", "gaps"), "title"),
+    "playbooks": (("ideas", "playbooks"), "title"),
+    "scenarios": (("ideas", "scenarios"), "title"),
+    "recommendations": (("ideas", "recommendations"), "title"),
+}
+# Smallest item of each section that parse_study accepts, for checking an update on its own
+_MINIMAL_ITEMS = {
+    "themes": {"title": "", "story": "", "first_seen": "2000-01-01", "volume": 0, "confidence": 0},
+    "people": {"name": ""},
+    "brokers": {"name": ""},
+    "hypotheses": {"statement": ""},
+}
+
+
+def journal_path(study_path):
+    """data/<brand>/journal/<study>.jsonl for data/<brand>/<study>.json."""
+    study_path = Path(study_path)
+    return study_path.parent / JOURNAL_DIR / f"{study_path.stem}.jsonl"
+
+
+def validate_delta(delta):
+    """Raise ValueError unless ``delta`` is a well-formed delta."""
+    if not isinstance(delta, dict):
+        raise ValueError(f"delta: expected an object, got {type(delta).__name__}")
+    op, section = delta.get("op"), delta.get("section")
+    if op not in OPS:
+        raise ValueError(f"delta.op: expected one of {', '.join(OPS)}, got {op!r}")
+    if section not in SECTIONS:
+        raise ValueError(f"delta.section: unknown section {section!r}")
+    field = SECTIONS[section][1]
+    if section == "brokers" and not isinstance(delta.get("market"), str):
+        raise ValueError("delta.market: broker deltas need a market name")
+    if op != "retire" and not isinstance(delta.get("item"), dict):
+        raise ValueError(f"delta.item: {op} needs an object")
+    if op == "add" and not isinstance(delta["item"].get(field), str):
+        raise ValueError(f"delta.item.{field}: add needs the item's {field}")
+    if op != "add" and not isinstance(delta.get("key"), str):
+        raise ValueError(f"delta.key: {op} needs the {field} of the item")
+
+
+def _apply_items(items, delta, field):
+    items = list(items)
+    key = delta["item"][field] if delta["op"] == "add" else delta["key"]
+    at = next((i for i, item in enumerate(items) if item.get(field) == key), None)
+    if delta["op"] == "add":
+        if at is None:
+            items.append(delta["item"])
+        else:
+            items[at] = delta["item"]
+    elif at is not None:
+        if delta["op"] == "update":
+            merged = {**items[at], **delta["item"]}
+            items[at] = {k: v for k, v in merged.items() if v is not None}
+        else:
+            del items[at]
+    return items
+
+
+def apply_delta(data, delta):
+    """Study payload with one delta applied.
+
+    Only the containers on the path to the changed list are copied, so
+    ``data`` itself (e.g. a cached payload) is left untouched.
+    """
+    path, field = SECTIONS[delta["section"]]
+    data = dict(data)
+    parent = data
+    for name in path[:-1]:
+        parent[name] = dict(parent.get(name) or {})
+        parent = parent[name]
+    if delta["section"] != "brokers":
+        parent[path[-1]] = _apply_items(parent.get(path[-1]) or [], delta, field)
+        return data
+    markets = list(parent.get("brokers") or [])
+    at = next((i for i, m in enumerate(markets) if m.get("market") == delta["market"]), None)
+    if at is None:
+        if delta["op"] != "add":
+            return data
+        markets.append({"market": delta["market"], "brokers": []})
+        at = len(markets) - 1
+    markets[at] = {**markets[at], "brokers": _apply_items(markets[at].get("brokers") or [], delta, field)}
+    parent["brokers"] = markets
+    return data
+
+
+def _parse_lines(chunk, path, start):
+    """(deltas, bytes consumed) for the complete lines of ``chunk``."""
+    # A line still being written has no newline yet; it is read on the next replay
+    complete = chunk.rfind(b"\n") + 1
+    deltas, offset = [], start
+    for line in chunk[:complete].splitlines(keepends=True):
+        if line.strip():
+            try:
+                delta = json.loads(line)
+                validate_delta(delta)
+            except ValueError as e:
+                raise ValueError(f"{path} at byte {offset}: {e}") from None
+            deltas.append(delta)
+        offset += len(line)
+    return deltas, complete
+
+
+def read_deltas(path, start=0, end=None):
+    """(deltas, offset) for the complete lines of a journal between byte ``start`` and ``end``.
+
+    ``offset`` is where the next read should start. A missing journal has no deltas.
+    """
+    try:
+        with open(path, "rb") as fh:
+            fh.seek(start)
+            chunk = fh.read(-1 if end is None else max(0, end - start))
+    except FileNotFoundError:
+        return [], start
+    deltas, consumed = _parse_lines(chunk, path, start)
+    return deltas, start + consumed
+
+
+def replay(data, path, start=0, end=None):
+    """(payload, offset): ``data`` with the journal deltas from byte ``start`` applied."""
+    deltas, offset = read_deltas(path, start, end)
+    for delta in deltas:
+        data = apply_delta(data, delta)
+    return data, offset
+
+
+def check_item(delta):
+    """Raise ValueError if the item a delta adds or updates would not parse.
+
+    Only the item is checked, as the one item of an otherwise empty study; an
+    update is merged into a minimal valid item, so it may not null a required
+    field or give a field the wrong type.
+    """
+    if delta["op"] == "retire":
+        return
+    item = delta["item"]
+    if delta["op"] == "update":
+        _, field = SECTIONS[delta["section"]]
+        minimal = _MINIMAL_ITEMS.get(delta["section"], {"title": ""})
+        merged = {**minimal, field: delta["key"], **item}
+        dropped = [k for k, v in item.items() if v is None and k in minimal]
+        if dropped:
+            raise ValueError(f"delta.item.{dropped[0]}: update cannot remove a required field")
+        item = {k: v for k, v in merged.items() if v is not None}
+    parse_study(apply_delta({}, {**delta, "op": "add", "item": item}))
+
+
+def _fold(study_path, deltas):
+    """The study file with ``deltas`` applied, validated with ``parse_study``."""
+    data = json.loads(Path(study_path).read_bytes())
+    for delta in deltas:
+        data = apply_delta(data, delta)
+    parse_study(data)
+    return data
+
+
+def append(study_path, deltas):
+    """Validate ``deltas`` and append them to the study's journal; returns the bytes written.
+
+    Each delta and the item it touches are checked on their own (see
+    ``check_item``): a delta that would leave the study unloadable, e.g. a
+    theme without ``first_seen``, raises ValueError and nothing is written.
+    Neither the journal nor the study file is read, so appending costs the
+    same however large they grow; ``compact`` validates the whole study.
+    """
+    deltas = list(deltas)
+    for i, delta in enumerate(deltas):
+        try:
+            validate_delta(delta)
+            check_item(delta)
+        except ValueError as e:
+            raise ValueError(f"delta {i + 1}: {e}") from None
+    if not deltas:
+        return 0
+    payload = "".join(json.dumps(d, ensure_ascii=False) + "\n" for d in deltas).encode()
+    path = journal_path(study_path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "ab") as fh:
+        # Excludes a concurrent compaction, which would otherwise truncate these lines unmerged
+        fcntl.flock(fh, fcntl.LOCK_EX)
+        fh.write(payload)
+        fh.flush()
+        os.fsync(fh.fileno())
+    return len(payload)
+
+
+def compact(study_path):
+    """Fold a study's journal into its JSON file and empty the journal; returns the deltas merged.
+
+    The new file is validated with ``parse_study`` and replaced atomically. If
+    the process dies before the journal is emptied, the next replay re-applies
+    deltas that are already in the file, which changes nothing.
+    """
+    study_path = Path(study_path)
+    path = journal_path(study_path)
+    if not path.exists():
+        return 0
+    with open(path, "r+b") as fh:
+        fcntl.flock(fh, fcntl.LOCK_EX)
+        chunk = fh.read()
+        deltas, consumed = _parse_lines(chunk, path, 0)
+        if deltas:
+            data = _fold(study_path, deltas)  # never replace a loadable study with one that is not
+            tmp = study_path.with_suffix(".json.tmp")
+            tmp.write_text(json.dumps(data, indent=4, ensure_ascii=False) + "\n")
+            os.replace(tmp, study_path)
+        # Keep a torn last line (an append that died mid-write) for inspection
+        fh.seek(0)
+        fh.write(chunk[consumed:])
+        fh.truncate()
+    return len(deltas)
+
+
+def needs_compaction(study_path, ratio=COMPACT_RATIO):
+    try:
+        journal = journal_path(study_path).stat().st_size
+    except FileNotFoundError:
+        return False
+    return journal > 0 and journal >= ratio * Path(study_path).stat().st_size
+
+
+def compact_all(data_dir="data", force=False, ratio=COMPACT_RATIO):
+    """Compact every journal that has grown past ``ratio`` of its study (every one with ``force``).
+
+    Returns ({"<brand>/<study>": deltas merged}, {"<brand>/<study>": error}).
+    A study that fails to compact keeps its journal and the rest carry on.
+    """
+    merged, failed = {}, {}
+    for path in sorted(Path(data_dir).glob(f"*/{JOURNAL_DIR}/*.jsonl")):
+        study_path = path.parent.parent / f"{path.stem}.json"
+        if not study_path.exists():
+            continue
+        name = f"{study_path.parent.name}/{study_path.stem}"
+        try:
+            if force or needs_compaction(study_path, ratio):
+                merged[name] = compact(study_path)
+        except (OSError, ValueError) as e:
+            failed[name] = str(e)
+    return merged, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Append study deltas or compact study journals.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    add = commands.add_parser("append", help="append deltas (JSON lines) to a study's journal")
+    add.add_argument("brand")
+    add.add_argument("study")
+    add.add_argument("deltas", help="file of deltas, one JSON object per line ('-' for stdin)")
+    add.add_argument("--data-dir", default="data")
+    fold = commands.add_parser("compact", help="fold journals into their study files")
+    fold.add_argument("--data-dir", default="data")
+    fold.add_argument("--all", action="store_true", help="compact every journal, not just the large ones")
+    args = parser.parse_args()
+
+    if args.command == "append":
+        study_path = Path(args.data_dir) / args.brand / f"{args.study}.json"
+        if not study_path.exists():
+            parser.error(f"No study at {study_path}")
+        text = sys.stdin.read() if args.deltas == "-" else Path(args.deltas).read_text()
+        deltas = []
+        for number, line in enumerate(text.splitlines(), 1):
+            if line.strip():
+                try:
+                    deltas.append(json.loads(line))
+                except ValueError as e:
+                    parser.error(f"{args.deltas}, line {number}: {e}")
+        try:
+            written = append(study_path, deltas)
+        except ValueError as e:
+            parser.error(f"Deltas not appended: {e}")
+        print(f"Appended {len(deltas)} deltas ({written} bytes) to {journal_path(study_path)}")
+    else:
+        merged, failed = compact_all(args.data_dir, force=args.all)
+        for study, count in merged.items():
+            print(f"{study}: {count} deltas merged")
+        for study, error in failed.items():
+            print(f"{study}: failed ({error})")
+        print(f"Compacted {len(merged)} journals, {len(failed)} failed")
+
+
+if __name__ == "__main__":
+    main()
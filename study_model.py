@@ -0,0 +1,558 @@
+# study_model.py
+"""Typed, normalized study records built once when a study is loaded.
+
+``parse_study`` validates the raw JSON, converts display strings such as
+"542.3K mentions" or "+1,247%" into numbers, parses dates, derives momentum and
+maturity, and precomputes the few display strings the renderer needs. Theme metrics are
+computed for the whole study at once (see theme_metrics.py). Schema
+problems raise ``StudySchemaError`` naming the offending path.
+"""
+
+from dataclasses import dataclass
+from datetime import date, datetime
+import re
+
+import pandas as pd
+
+from theme_metrics import compute_theme_metrics
+
+
+class StudySchemaError(ValueError):
+    """Raised when a study payload does not match the expected schema."""
+
+
+# ---------- value normalization ----------
+
+_COUNT_RE = re.compile(r"([-+]?\d[\d,]*(?:\.\d+)?)\s*([KkMmBb]\b)?")
+_SUFFIX = {"k": 1_000, "m": 1_000_000, "b": 1_000_000_000}
+_DATE_FORMATS = ("%Y-%m-%d", "%b %d, %Y", "%B %d, %Y")
+
+
+def parse_count(value):
+    """'542.3K mentions' -> 542300, '1,900 mentions' -> 1900; ints pass through."""
+    if isinstance(value, bool):
+        raise ValueError(f"not a count: {value!r}")
+    if isinstance(value, (int, float)):
+        return int(value)
+    match = _COUNT_RE.search(str(value))
+    if not match:
+        raise ValueError(f"not a count: {value!r}")
+    number = float(match.group(1).replace(",", ""))
+    suffix = (match.group(2) or "").lower()
+    return int(round(number * _SUFFIX.get(suffix, 1)))
+
+
+def parse_percent(value):
+    """'+1,247%' -> 1247.0, '25-30%' -> 27.5; returns None when no number is present."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    numbers = [float(n.replace(",", "")) for n in re.findall(r"[-+]?\d[\d,]*(?:\.\d+)?", str(value))]
+    if not numbers:
+        return None
+    if len(numbers) == 2 and "-" in str(value).strip().lstrip("+-"):
+        return (abs(numbers[0]) + abs(numbers[1])) / 2
+    return numbers[0]
+
+
+def parse_date(value):
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(value.strip(), fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(f"unrecognized date: {value!r}")
+
+
+def format_number(n):
+    """Convert raw integers to readable strings (e.g., 210000 -> 210k)."""
+    if abs(n) >= 1_000_000:
+        return f"{n/1_000_000:.1f}M"
+    if abs(n) >= 1_000:
+        return f"{n/1_000:.0f}k"
+    return str(n)
+
+
+# ---------- records ----------
+
+@dataclass(frozen=True, slots=True)
+class Theme:
+    title: str
+    story: str
+    evidence: tuple
+    impact: str
+    first_seen: date
+    last_seen: date | None
+    volume: int
+    velocity: int | None
+    previous_volume: int | None  # previous-period count, when the study reports one
+    growth_pct: float | None
+    confidence: int
+    momentum: str
+    maturity: str
+    trend_color: str
+    perspectives: tuple
+    story_preview: str = ""
+    coder_views: str = ""
+    interpretive_conflict: str = ""
+    symbolic_meaning: str = ""
+    value_conflicts: str = ""
+    representative_signal: str = ""
+    evolution: str = ""
+    momentum_display: str = ""
+    volume_display: str = ""
+    velocity_display: str = ""
+    first_seen_display: str = ""
+    last_seen_display: str = ""
+
+
+@dataclass(frozen=True, slots=True)
+class Dimension:
+    axis: str
+    strength: str
+    key_markers: tuple
+    narrative: str
+    intuitive_label: str = ""
+    key_markers_display: str = ""
+
+
+@dataclass(frozen=True, slots=True)
+class Metaphor:
+    title: str
+    metaphor: str
+    narrative: str
+    columns: tuple
+    rows: tuple
+
+
+@dataclass(frozen=True, slots=True)
+class Framing:
+    title: str
+    rows: tuple
+    evidence: tuple
+    strategic_impact: str
+
+
+@dataclass(frozen=True, slots=True)
+class WordShift:
+    title: str
+    evolution: tuple  # ((year, meaning), ...)
+    shift_driver: str
+
+
+@dataclass(frozen=True, slots=True)
+class Persona:
+    name: str
+    share: str
+    share_pct: float | None
+    traits: tuple
+    behaviors: str
+    evidence: tuple
+    implications: str
+    border_color: str = "#DDD"
+
+
+@dataclass(frozen=True, slots=True)
+class Narrative:
+    title: str
+    color: str
+    story: str
+    evidence: tuple
+    takeaway: str
+
+
+@dataclass(frozen=True, slots=True)
+class PathwayNode:
+    id: str
+    label: str
+    tooltip: str
+
+
+@dataclass(frozen=True, slots=True)
+class Pathway:
+    name: str
+    color: str
+    nodes: tuple
+
+
+@dataclass(frozen=True, slots=True)
+class Broker:
+    name: str
+    role: str
+    impact: str
+    followers: str
+    engagement: str
+    specialty: str
+    brands: tuple
+    brands_display: str = ""
+
+
+@dataclass(frozen=True, slots=True)
+class BrokerMarket:
+    market: str
+    color: str
+    description: str
+    brokers: tuple
+
+
+@dataclass(frozen=True, slots=True)
+class Hypothesis:
+    statement: str
+    source: str
+
+
+@dataclass(frozen=True, slots=True)
+class Gap:
+    title: str
+    body: str
+    source: str
+
+
+@dataclass(frozen=True, slots=True)
+class Playbook:
+    title: str
+    goal: str
+    steps: tuple
+    metrics: tuple
+    source: str
+    border: str = "1px solid #ccc"
+    bg: str = ""
+
+
+@dataclass(frozen=True, slots=True)
+class Scenario:
+    title: str
+    body: str
+    source: str
+
+
+@dataclass(frozen=True, slots=True)
+class Recommendation:
+    priority: int
+    title: str
+    body: str
+
+
+@dataclass(frozen=True, slots=True)
+class Stories:
+    themes: tuple = ()
+    dimensions: tuple = ()
+    metaphors: tuple = ()
+    framing: tuple = ()
+    evolution: tuple = ()
+
+
+@dataclass(frozen=True, slots=True)
+class Influencers:
+    narratives: tuple = ()
+    pathways: tuple = ()
+    brokers: tuple = ()
+
+
+@dataclass(frozen=True, slots=True)
+class Ideas:
+    hypotheses: tuple = ()
+    gaps: tuple = ()
+    playbooks: tuple = ()
+    scenarios: tuple = ()
+    recommendations: tuple = ()
+
+
+@dataclass(frozen=True, slots=True)
+class AIContext:
+    system_context: str = ""
+    research_file: str = ""
+
+
+@dataclass(frozen=True, slots=True)
+class Study:
+    stories: Stories
+    people: tuple
+    influencers: Influencers
+    ideas: Ideas
+    ai_context: AIContext
+
+
+# ---------- parsing ----------
+
+def _require(raw, key, path):
+    if not isinstance(raw, dict):
+        raise StudySchemaError(f"{path}: expected an object, got {type(raw).__name__}")
+    if key not in raw or raw[key] is None:
+        raise StudySchemaError(f"{path}.{key}: missing required field")
+    return raw[key]
+
+
+def _text(raw, key, path, default=None):
+    if default is None:
+        value = _require(raw, key, path)
+    elif not isinstance(raw, dict):
+        raise StudySchemaError(f"{path}: expected an object, got {type(raw).__name__}")
+    else:
+        value = raw.get(key)
+        if value is None:
+            return default
+    if not isinstance(value, str):
+        raise StudySchemaError(f"{path}.{key}: expected a string, got {type(value).__name__}")
+    return value
+
+
+def _strings(value, path):
+    """Accept a single string or a list of strings; always return a tuple."""
+    if isinstance(value, str):
+        return (value,)
+    if isinstance(value, (list, tuple)) and all(isinstance(v, str) for v in value):
+        return tuple(value)
+    raise StudySchemaError(f"{path}: expected a string or list of strings")
+
+
+def _list(raw, key, path):
+    value = raw.get(key) or []
+    if not isinstance(value, list):
+        raise StudySchemaError(f"{path}.{key}: expected a list, got {type(value).__name__}")
+    return value
+
+
+def _convert(fn, value, path):
+    try:
+        return fn(value)
+    except (TypeError, ValueError) as exc:
+        raise StudySchemaError(f"{path}: {exc}") from None
+
+
+def _theme_row(raw, path):
+    """Validate one raw theme and convert its scalar fields; metrics come later."""
+    first_raw = _text(raw, "first_seen", path)
+    last_raw = _text(raw, "last_seen", path, "")
+    has_pair = raw.get("current_volume") is not None and raw.get("previous_volume") is not None
+    confidence = _convert(float, _require(raw, "confidence", path), f"{path}.confidence")
+    perspectives = raw.get("perspectives") or {}
+    if not isinstance(perspectives, dict):
+        raise StudySchemaError(f"{path}.perspectives: expected an object")
+    return {
+        "title": _text(raw, "title", path),
+        "story": _text(raw, "story", path),
+        "evidence": _strings(raw.get("evidence", []), f"{path}.evidence"),
+        "impact": _text(raw, "impact", path, ""),
+        "first_seen": _convert(parse_date, first_raw, f"{path}.first_seen"),
+        "last_seen": _convert(parse_date, last_raw, f"{path}.last_seen") if last_raw else None,
+        "volume": _convert(parse_count, _require(raw, "volume", path), f"{path}.volume"),
+        "current_volume": _convert(parse_count, raw["current_volume"], f"{path}.current_volume") if has_pair else None,
+        "previous_volume": _convert(parse_count, raw["previous_volume"], f"{path}.previous_volume") if has_pair else None,
+        "reported_growth": _convert(parse_percent, raw.get("velocity", ""), f"{path}.velocity"),
+        "confidence": int(round(confidence * 100)) if confidence <= 1 else int(confidence),
+        "momentum": _text(raw, "momentum", path, ""),
+        "maturity": _text(raw, "maturity", path, ""),
+        "trend_color": _text(raw, "trend_color", path, "#DDD"),
+        "perspectives": tuple(perspectives.items()),
+        "story_preview": _text(raw, "story_preview", path, ""),
+        "coder_views": _text(raw, "coder_views", path, ""),
+        "interpretive_conflict": _text(raw, "interpretive_conflict", path, ""),
+        "symbolic_meaning": _text(raw, "symbolic_meaning", path, ""),
+        "value_conflicts": _text(raw, "value_conflicts", path, ""),
+        "representative_signal": _text(raw, "representative_signal", path, ""),
+        "evolution": _text(raw, "evolution", path, ""),
+        "first_seen_display": first_raw,
+        "last_seen_display": last_raw,
+    }
+
+
+def parse_themes(raw_themes, path="themes"):
+    """Parse a study's themes; metrics are computed in one vectorized pass."""
+    rows = [_theme_row(t, f"{path}[{i}]") for i, t in enumerate(raw_themes)]
+    if not rows:
+        return ()
+    metrics = compute_theme_metrics(pd.DataFrame(rows))
+
+    themes = []
+    for row, growth, velocity, momentum, maturity in zip(
+        rows, metrics["growth_pct"], metrics["velocity"], metrics["momentum"], metrics["maturity"]
+    ):
+        growth = None if pd.isna(growth) else float(growth)
+        velocity = None if pd.isna(velocity) else int(velocity)
+        if velocity is not None:
+            sign = "+" if velocity > 0 else ""
+            velocity_display = f"{sign}{format_number(velocity)} signals (MoM)"
+        else:
+            velocity_display = "n/a"
+        for key in ("current_volume", "reported_growth", "momentum", "maturity"):
+            row.pop(key)
+        themes.append(Theme(
+            **row,
+            velocity=velocity,
+            growth_pct=growth,
+            momentum=momentum,
+            maturity=maturity,
+            momentum_display=f"{momentum} ({growth:+.1f}% MoM)" if growth is not None else momentum,
+            volume_display=f"{format_number(row['volume'])} signals",
+            velocity_display=velocity_display,
+        ))
+    return tuple(themes)
+
+
+def parse_persona(raw, path="persona"):
+    share = str(raw.get("share", ""))
+    return Persona(
+        name=_text(raw, "name", path),
+        share=share,
+        share_pct=parse_percent(share),
+        traits=_strings(raw.get("traits", []), f"{path}.traits"),
+        behaviors=_text(raw, "behaviors", path, ""),
+        evidence=_strings(raw.get("evidence", []), f"{path}.evidence"),
+        implications=_text(raw, "implications", path, ""),
+        border_color=_text(raw, "border_color", path, "#DDD"),
+    )
+
+
+def parse_broker(raw, path="broker"):
+    brands = _strings(raw.get("brands", []), f"{path}.brands")
+    return Broker(
+        name=_text(raw, "name", path),
+        role=_text(raw, "role", path, ""),
+        impact=_text(raw, "impact", path, ""),
+        followers=str(raw.get("followers", "")),
+        engagement=str(raw.get("engagement", "")),
+        specialty=_text(raw, "specialty", path, ""),
+        brands=brands,
+        brands_display=", ".join(brands),
+    )
+
+
+def _parse_stories(raw, path):
+    themes = parse_themes(_list(raw, "themes", path), f"{path}.themes")
+    dimensions = []
+    for i, d in enumerate(_list(raw, "dimensions", path)):
+        p = f"{path}.dimensions[{i}]"
+        markers = _strings(d.get("key_markers", []), f"{p}.key_markers")
+        dimensions.append(Dimension(
+            axis=_text(d, "axis", p),
+            strength=_text(d, "strength", p, ""),
+            key_markers=markers,
+            narrative=_text(d, "narrative", p, ""),
+            intuitive_label=_text(d, "intuitive_label", p, ""),
+            key_markers_display=", ".join(markers),
+        ))
+    metaphors = []
+    for i, m in enumerate(_list(raw, "metaphors", path)):
+        p = f"{path}.metaphors[{i}]"
+        metaphors.append(Metaphor(
+            title=_text(m, "title", p),
+            metaphor=_text(m, "metaphor", p, ""),
+            narrative=_text(m, "narrative", p, ""),
+            columns=_strings(_require(m, "columns", p), f"{p}.columns"),
+            rows=tuple(_list(m, "rows", p)),
+        ))
+    framing = []
+    for i, f in enumerate(_list(raw, "framing", path)):
+        p = f"{path}.framing[{i}]"
+        framing.append(Framing(
+            title=_text(f, "title", p),
+            rows=tuple(_list(f, "data", p)),
+            evidence=_strings(f.get("evidence", []), f"{p}.evidence"),
+            strategic_impact=_text(f, "strategic_impact", p, ""),
+        ))
+    evolution = []
+    for i, e in enumerate(_list(raw, "evolution", path)):
+        p = f"{path}.evolution[{i}]"
+        timeline = _require(e, "evolution", p)
+        if not isinstance(timeline, dict):
+            raise StudySchemaError(f"{p}.evolution: expected an object")
+        evolution.append(WordShift(
+            title=_text(e, "title", p),
+            evolution=tuple(timeline.items()),
+            shift_driver=_text(e, "shift_driver", p, ""),
+        ))
+    return Stories(themes, tuple(dimensions), tuple(metaphors), tuple(framing), tuple(evolution))
+
+
+def _parse_influencers(raw, path):
+    narratives = tuple(
+        Narrative(
+            title=_text(n, "title", f"{path}.narratives[{i}]"),
+            color=_text(n, "color", f"{path}.narratives[{i}]", "#DDD"),
+            story=_text(n, "story", f"{path}.narratives[{i}]", ""),
+            evidence=_strings(n.get("evidence", []), f"{path}.narratives[{i}].evidence"),
+            takeaway=_text(n, "takeaway", f"{path}.narratives[{i}]", ""),
+        )
+        for i, n in enumerate(_list(raw, "narratives", path))
+    )
+    pathways = []
+    for i, pw in enumerate(_list(raw, "pathways", path)):
+        p = f"{path}.pathways[{i}]"
+        nodes = tuple(
+            PathwayNode(
+                id=str(_require(n, "id", f"{p}.nodes[{j}]")),
+                label=_text(n, "label", f"{p}.nodes[{j}]", str(n.get("id", ""))),
+                tooltip=_text(n, "tooltip", f"{p}.nodes[{j}]", ""),
+            )
+            for j, n in enumerate(_list(pw, "nodes", p))
+        )
+        pathways.append(Pathway(name=_text(pw, "name", p), color=_text(pw, "color", p, "#999"), nodes=nodes))
+    markets = []
+    for i, m in enumerate(_list(raw, "brokers", path)):
+        p = f"{path}.brokers[{i}]"
+        markets.append(BrokerMarket(
+            market=_text(m, "market", p),
+            color=_text(m, "color", p, "#DDD"),
+            description=_text(m, "description", p, ""),
+            brokers=tuple(parse_broker(b, f"{p}.brokers[{j}]") for j, b in enumerate(_list(m, "brokers", p))),
+        ))
+    return Influencers(narratives, tuple(pathways), tuple(markets))
+
+
+def _parse_ideas(raw, path):
+    def items(key):
+        return enumerate(_list(raw, key, path))
+
+    hypotheses = tuple(
+        Hypothesis(_text(h, "statement", f"{path}.hypotheses[{i}]"), _text(h, "source", f"{path}.hypotheses[{i}]", ""))
+        for i, h in items("hypotheses")
+    )
+    gaps = tuple(
+        Gap(_text(g, "title", f"{path}.gaps[{i}]"), _text(g, "body", f"{path}.gaps[{i}]", ""),
+            _text(g, "source", f"{path}.gaps[{i}]", ""))
+        for i, g in items("gaps")
+    )
+    playbooks = tuple(
+        Playbook(
+            title=_text(c, "title", f"{path}.playbooks[{i}]"),
+            goal=_text(c, "goal", f"{path}.playbooks[{i}]", ""),
+            steps=_strings(c.get("steps", []), f"{path}.playbooks[{i}].steps"),
+            metrics=_strings(c.get("metrics", []), f"{path}.playbooks[{i}].metrics"),
+            source=_text(c, "source", f"{path}.playbooks[{i}]", ""),
+            border=_text(c, "border", f"{path}.playbooks[{i}]", "1px solid #ccc"),
+            bg=_text(c, "bg", f"{path}.playbooks[{i}]", ""),
+        )
+        for i, c in items("playbooks")
+    )
+    scenarios = tuple(
+        Scenario(_text(s, "title", f"{path}.scenarios[{i}]"), _text(s, "body", f"{path}.scenarios[{i}]", ""),
+                 _text(s, "source", f"{path}.scenarios[{i}]", ""))
+        for i, s in items("scenarios")
+    )
+    recommendations = tuple(
+        Recommendation(
+            priority=_convert(int, r.get("priority", i + 1), f"{path}.recommendations[{i}].priority"),
+            title=_text(r, "title", f"{path}.recommendations[{i}]"),
+            body=_text(r, "body", f"{path}.recommendations[{i}]", ""),
+        )
+        for i, r in items("recommendations")
+    )
+    return Ideas(hypotheses, gaps, playbooks, scenarios, recommendations)
+
+
+def parse_study(raw):
+    """Validate and normalize a raw study dict into a ``Study``."""
+    if not isinstance(raw, dict):
+        raise StudySchemaError("study: expected an object")
+    people = tuple(parse_persona(p, f"people[{i}]") for i, p in enumerate(_list(raw, "people", "study")))
+    ai = raw.get("ai_context") or {}
+    return Study(
+        stories=_parse_stories(raw.get("stories") or {}, "stories"),
+        people=people,
+        influencers=_parse_influencers(raw.get("influencers") or {}, "influencers"),
+        ideas=_parse_ideas(raw.get("ideas") or {}, "ideas"),
+        ai_context=AIContext(
+            system_context=_text(ai, "system_context", "ai_context", ""),
+            research_file=_text(ai, "research_file", "ai_context", ""),
+        ),
+    )
@@ -0,0 +1,14 @@
+# conftest.py
+
+from pathlib import Path
+import shutil
+
+import pytest
+
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    """A scratch copy of data/ that tests may edit."""
+    return Path(shutil.copytree(DATA_DIR, tmp_path / "data", ignore=shutil.ignore_patterns("answers", "journal")))
@@ -0,0 +1,44 @@
+# test_columnar_store.py
+
+import json
+
+from columnar_store import ColumnarStore, export, join_study, split_study
+from data_store import StudyStore, build_manifest
+
+
+def test_split_join_round_trips_every_study(data_dir):
+    for studies in build_manifest(data_dir).values():
+        for entry in studies.values():
+            data = json.loads(entry.path.read_bytes())
+            assert join_study(*split_study(data)) == data, entry.path.name
+
+
+def test_export_loads_back_and_goes_stale(data_dir, tmp_path):
+    root = tmp_path / "columnar"
+    manifest = build_manifest(data_dir)
+    count = sum(len(studies) for studies in manifest.values())
+    assert export(data_dir, root) == (count, 0, 0)
+    assert export(data_dir, root) == (0, count, 0)
+
+    store = ColumnarStore(root)
+    for studies in manifest.values():
+        for entry in studies.values():
+            assert store.load(entry) == json.loads(entry.path.read_bytes())
+
+    path = data_dir / "puma" / "Southeast Asia.json"
+    data = json.loads(path.read_bytes())
+    data["stories"]["themes"] = data["stories"]["themes"][:1]
+    path.write_text(json.dumps(data))
+    assert store.load(build_manifest(data_dir)["puma"]["Southeast Asia"]) is None
+    assert StudyStore(data_dir, columnar=store).load("puma", "Southeast Asia") == data
+    assert export(data_dir, root) == (1, count - 1, 0)
+    assert store.load(build_manifest(data_dir)["puma"]["Southeast Asia"]) == data
+
+
+def test_export_removes_deleted_studies(data_dir, tmp_path):
+    root = tmp_path / "columnar"
+    export(data_dir, root)
+    (data_dir / "puma" / "Southeast Asia.json").unlink()
+    written, skipped, removed = export(data_dir, root)
+    assert (written, removed) == (0, 1)
+    assert ColumnarStore(root).read("themes", ["title"], studies=["Southeast Asia"]).empty
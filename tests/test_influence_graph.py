@@ -0,0 +1,57 @@
+# test_influence_graph.py
+
+import numpy as np
+from scipy import sparse
+
+from influence_graph import pagerank, sampled_betweenness
+
+
+def _graph(n, edges):
+    rows, cols = zip(*edges)
+    return sparse.csr_matrix((np.ones(len(edges)), (rows, cols)), shape=(n, n))
+
+
+def test_betweenness_of_a_path():
+    # Node i sits on every path between its i left and n - 1 - i right neighbours
+    scores = sampled_betweenness(_graph(5, [(0, 1), (1, 2), (2, 3), (3, 4)]))
+    np.testing.assert_allclose(scores, [0, 3, 4, 3, 0])
+
+
+def test_betweenness_of_a_star_ignores_direction():
+    scores = sampled_betweenness(_graph(5, [(0, 1), (2, 0), (0, 3), (4, 0)]))
+    np.testing.assert_allclose(scores, [6, 0, 0, 0, 0])
+
+
+def test_betweenness_splits_over_equal_paths():
+    # Opposite corners of a square are joined by two shortest paths
+    scores = sampled_betweenness(_graph(4, [(0, 1), (1, 2), (2, 3), (3, 0)]))
+    np.testing.assert_allclose(scores, [0.5, 0.5, 0.5, 0.5])
+
+
+def test_sampled_betweenness_scales_to_all_sources():
+    n = 60
+    adjacency = _graph(n, [(i, i + 1) for i in range(n - 1)])
+    exact = np.array([i * (n - 1 - i) for i in range(n)], dtype=float)
+    estimate = sampled_betweenness(adjacency, samples=30)
+    assert np.corrcoef(estimate, exact)[0, 1] > 0.9
+
+
+def test_pagerank_of_a_cycle_is_uniform():
+    rank = pagerank(_graph(3, [(0, 1), (1, 2), (2, 0)]), np.ones(3))
+    np.testing.assert_allclose(rank, [1 / 3] * 3)
+
+
+def test_pagerank_matches_the_linear_solution():
+    # Node 3 is dangling; its rank is redistributed by the personalization
+    adjacency = _graph(4, [(0, 1), (0, 2), (1, 2), (2, 0), (2, 3)])
+    personalization = np.array([1.0, 2.0, 1.0, 0.0])
+    alpha = 0.85
+    rank = pagerank(adjacency, personalization, alpha=alpha)
+
+    dense = adjacency.toarray()
+    out = dense.sum(axis=1)
+    p = personalization / personalization.sum()
+    transition = np.where(out[:, None] > 0, dense / np.maximum(out, 1)[:, None], p)
+    expected = np.linalg.solve(np.eye(4) - alpha * transition.T, (1 - alpha) * p)
+    np.testing.assert_allclose(rank, expected, atol=1e-9)
+    assert abs(rank.sum() - 1) < 1e-9
@@ -0,0 +1,54 @@
+# test_snapshot.py
+
+import json
+import os
+
+from data_store import StudyStore, build_manifest
+from snapshot import build_snapshot, open_snapshot
+from study_journal import append
+
+
+def test_current_entries_load_from_snapshot(data_dir, tmp_path):
+    out = tmp_path / "data.snapshot"
+    manifest = build_manifest(data_dir)
+    assert build_snapshot(data_dir, out) == sum(len(studies) for studies in manifest.values())
+    snapshot = open_snapshot(out)
+    for studies in manifest.values():
+        for entry in studies.values():
+            assert snapshot.load(entry) == json.loads(entry.path.read_bytes())
+
+
+def test_edited_study_is_stale(data_dir, tmp_path):
+    out = tmp_path / "data.snapshot"
+    build_snapshot(data_dir, out)
+    snapshot = open_snapshot(out)
+    path = data_dir / "puma" / "Global Insights.json"
+    data = json.loads(path.read_bytes())
+    data["people"] = data.get("people", [])[:1]
+    stat = path.stat()
+    path.write_text(json.dumps(data))
+    # Same mtime as at build time: the size change alone must force a rehash
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    store = StudyStore(data_dir, snapshot=snapshot)
+    entry = store.entry("puma", "Global Insights")
+    assert snapshot.load(entry) is None
+    assert store.load("puma", "Global Insights") == data
+
+
+def test_journal_replays_over_snapshot_copy(data_dir, tmp_path):
+    out = tmp_path / "data.snapshot"
+    build_snapshot(data_dir, out)
+    path = data_dir / "puma" / "Global Insights.json"
+    append(path, [{"op": "add", "section": "gaps", "item": {"title": "Trail gear"}}])
+
+    store = StudyStore(data_dir, snapshot=open_snapshot(out))
+    assert open_snapshot(out).load(store.entry("puma", "Global Insights")) is not None
+    gaps = store.load("puma", "Global Insights")["ideas"]["gaps"]
+    assert gaps[-1] == {"title": "Trail gear"}
+
+
+def test_missing_or_foreign_snapshot_is_ignored(tmp_path):
+    assert open_snapshot(tmp_path / "missing.snapshot") is None
+    (tmp_path / "bad.snapshot").write_bytes(b"NOPE" + bytes(16))
+    assert open_snapshot(tmp_path / "bad.snapshot") is None
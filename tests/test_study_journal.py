@@ -0,0 +1,61 @@
+# test_study_journal.py
+
+import json
+
+import pytest
+
+from data_store import StudyStore
+from study_journal import append, compact, journal_path
+from study_model import parse_study
+
+DELTAS = [
+    {"op": "add", "section": "themes",
+     "item": {"title": "Night Runs", "story": "s", "first_seen": "2024-05-01", "volume": "1.2K", "confidence": 0.7}},
+    {"op": "update", "section": "themes", "key": "Night Runs", "item": {"volume": "2K", "impact": "High"}},
+    {"op": "add", "section": "people", "item": {"name": "Weekend Racers", "share": "12%"}},
+    {"op": "add", "section": "brokers", "market": "Vietnam", "item": {"name": "@pace_setter"}},
+    {"op": "add", "section": "gaps", "item": {"title": "Trail gear", "body": "Nobody owns it"}},
+    {"op": "retire", "section": "gaps", "key": "Trail gear"},
+]
+
+
+def test_append_load_compact_agree(data_dir):
+    path = data_dir / "puma" / "Southeast Asia.json"
+    append(path, DELTAS[:3])
+    append(path, DELTAS[3:])
+    store = StudyStore(data_dir)
+    replayed = store.load("puma", "Southeast Asia")
+
+    assert compact(path) == len(DELTAS)
+    assert journal_path(path).read_bytes() == b""
+    assert json.loads(path.read_bytes()) == replayed
+    assert StudyStore(data_dir).load("puma", "Southeast Asia") == replayed
+
+    themes = {t.title: t for t in parse_study(replayed).stories.themes}
+    assert themes["Night Runs"].volume == 2000
+
+
+def test_journal_growth_replays_on_cached_payload(data_dir):
+    path = data_dir / "puma" / "Southeast Asia.json"
+    store = StudyStore(data_dir, refresh_interval=0)
+    append(path, DELTAS[:1])
+    store.refresh(force=True)
+    first = store.load("puma", "Southeast Asia")
+    append(path, DELTAS[1:2])
+    store.refresh(force=True)
+    assert store.load("puma", "Southeast Asia") == StudyStore(data_dir).load("puma", "Southeast Asia") != first
+
+
+@pytest.mark.parametrize("delta", [
+    {"op": "add", "section": "themes", "item": {"title": "T", "story": "s", "volume": 1, "confidence": 1}},
+    {"op": "update", "section": "themes", "key": "T", "item": {"first_seen": None}},
+    {"op": "update", "section": "people", "key": "P", "item": {"traits": 5}},
+    {"op": "drop", "section": "themes", "key": "T"},
+])
+def test_rejected_deltas_are_not_journaled(data_dir, delta):
+    path = data_dir / "puma" / "Southeast Asia.json"
+    append(path, DELTAS[:1])
+    before = journal_path(path).read_bytes()
+    with pytest.raises(ValueError):
+        append(path, [DELTAS[1], delta])
+    assert journal_path(path).read_bytes() == before
@@ -0,0 +1,197 @@
+# theme_history.py
+"""Append-only history of per-scan theme metrics, for trend charts.
+
+Every study version (checksum) seen by ``record()`` is one scan: each of its
+themes gets a point (volume, confidence, growth) on the scan date, which is the
+latest ``last_seen`` of its themes, or the file's modification date when none
+is given. The previous-period volume a theme reports is kept as a point one
+month earlier, unless a real scan covers that day. Points are never deleted and
+only give way to a later scan of the same day, so editing a study adds to its
+history instead of replacing it.
+
+The app records the study being viewed; a build step can record every study:
+
+    python theme_history.py [--data-dir data] [--out build/theme_history.sqlite]
+
+Points live in build/theme_history.sqlite, clustered by (brand, study, theme,
+day). ``series()`` averages them into at most ``max_points`` equal-width
+buckets in SQL, so years of weekly scans cost the same to chart as a few
+months; rolling aggregates are computed on the bucketed series.
+"""
+
+import argparse
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import date, datetime
+from pathlib import Path
+import sqlite3
+import threading
+import time
+
+import pandas as pd
+
+from data_store import StudyStore
+
+DEFAULT_HISTORY_PATH = Path("build") / "theme_history.sqlite"
+PREVIOUS_PERIOD_DAYS = 30
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS scans (
+    brand TEXT NOT NULL,
+    study TEXT NOT NULL,
+    checksum TEXT NOT NULL,
+    day INTEGER NOT NULL,
+    recorded_at REAL NOT NULL,
+    PRIMARY KEY (brand, study, checksum)
+);
+CREATE TABLE IF NOT EXISTS points (
+    brand TEXT NOT NULL,
+    study TEXT NOT NULL,
+    theme TEXT NOT NULL,
+    day INTEGER NOT NULL,  -- date.toordinal()
+    volume REAL,
+    confidence REAL,
+    growth_pct REAL,
+    source TEXT NOT NULL,  -- "scan" or "previous"
+    PRIMARY KEY (brand, study, theme, day)
+) WITHOUT ROWID;
+"""
+
+
+def _scan_points(model, mtime_ns):
+    """(day, [(theme, day, volume, confidence, growth, source)]) for one study version."""
+    themes = model.stories.themes
+    seen = [t.last_seen for t in themes if t.last_seen is not None]
+    day = max(seen) if seen else datetime.fromtimestamp(mtime_ns / 1e9).date()
+    points = []
+    for t in themes:
+        current = (t.last_seen or day).toordinal()
+        points.append((t.title, current, t.volume, t.confidence, t.growth_pct, "scan"))
+        # Synthesized only without a reported previous volume, the way theme_metrics derives velocity
+        previous = t.previous_volume
+        if previous is None and t.velocity is not None:
+            previous = t.volume - t.velocity
+        if previous is not None:
+            points.append((t.title, current - PREVIOUS_PERIOD_DAYS, previous, None, None, "previous"))
+    return day, points
+
+
+class ThemeHistory:
+    def __init__(self, path=DEFAULT_HISTORY_PATH):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._checked = {}  # (brand, study) -> checksum last checked in this process
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def record(self, store, brand, study):
+        """Append a scan for the study's current version if it is new; returns whether one was added.
+
+        Each version is checked once per process, so a malformed study is not
+        parsed again until it changes.
+        """
+        entry = store.entry(brand, study)
+        if entry is None:
+            return False
+        with self._lock:
+            if self._checked.get((brand, study)) == entry.checksum:
+                return False
+            self._checked[brand, study] = entry.checksum
+        try:
+            model = store.study(brand, study)
+        except ValueError:
+            return False  # malformed study: recorded once a fixed version parses
+        with self._connect() as conn:
+            if conn.execute("SELECT 1 FROM scans WHERE brand = ? AND study = ? AND checksum = ?",
+                            (brand, study, entry.checksum)).fetchone():
+                return False
+            self.append(conn, brand, study, entry.checksum, *_scan_points(model, entry.mtime_ns))
+        return True
+
+    def record_all(self, store):
+        """``record`` every study of ``store``; returns how many scans were added."""
+        return sum(self.record(store, brand, study) for brand in store.brands() for study in store.studies(brand))
+
+    @staticmethod
+    def append(conn, brand, study, checksum, day, points):
+        """Write one scan; its points replace earlier estimates for their day, and its scan points earlier scans."""
+        conn.executemany(
+            "INSERT INTO points (brand, study, theme, day, volume, confidence, growth_pct, source)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+            " ON CONFLICT (brand, study, theme, day) DO UPDATE SET volume = excluded.volume,"
+            " confidence = excluded.confidence, growth_pct = excluded.growth_pct, source = excluded.source"
+            " WHERE points.source = 'previous' OR excluded.source = 'scan'",
+            [(brand, study, *p) for p in points],
+        )
+        conn.execute(
+            "INSERT OR IGNORE INTO scans (brand, study, checksum, day, recorded_at) VALUES (?, ?, ?, ?, ?)",
+            (brand, study, checksum, day.toordinal(), time.time()),
+        )
+
+    def series(self, brand, study, max_points=120, window=4):
+        """Bucketed history of every theme of a study.
+
+        Returns a DataFrame with theme, date, volume, confidence, growth_pct,
+        points (raw points per bucket), plus rolling_volume (mean over
+        ``window`` buckets) and rolling_growth_pct (volume change across the
+        window), ordered by theme and date.
+        """
+        with self._connect() as conn:
+            first, last = conn.execute(
+                "SELECT MIN(day), MAX(day) FROM points WHERE brand = ? AND study = ?", (brand, study)
+            ).fetchone()
+            if first is None:
+                return pd.DataFrame(columns=["theme", "date", "volume", "confidence", "growth_pct", "points",
+                                             "rolling_volume", "rolling_growth_pct"])
+            width = max(1, -(-(last - first + 1) // max_points))
+            rows = conn.execute(
+                "SELECT theme, MAX(day), AVG(volume), AVG(confidence), AVG(growth_pct), COUNT(*)"
+                " FROM points WHERE brand = ? AND study = ?"
+                " GROUP BY theme, (day - ?) / ? ORDER BY theme, MAX(day)",
+                (brand, study, first, width),
+            ).fetchall()
+        frame = pd.DataFrame(rows, columns=["theme", "day", "volume", "confidence", "growth_pct", "points"])
+        frame = frame.astype({"volume": float, "confidence": float, "growth_pct": float})
+        frame["date"] = pd.to_datetime([date.fromordinal(d) for d in frame.pop("day")])
+        grouped = frame.groupby("theme", sort=False)["volume"]
+        frame["rolling_volume"] = grouped.transform(lambda v: v.rolling(window, min_periods=1).mean())
+        frame["rolling_growth_pct"] = grouped.transform(lambda v: v.pct_change(window - 1, fill_method=None) * 100)
+        return frame[["theme", "date", "volume", "confidence", "growth_pct", "points",
+                      "rolling_volume", "rolling_growth_pct"]]
+
+    def for_study(self, brand, study):
+        return StudyHistory(self, brand, study)
+
+
+@dataclass(frozen=True, slots=True)
+class StudyHistory:
+    """A ``ThemeHistory`` bound to one study, as handed to the renderer."""
+    history: ThemeHistory
+    brand: str
+    study: str
+
+    def series(self, max_points=120, window=4):
+        return self.history.series(self.brand, self.study, max_points, window)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record a theme history scan for every changed study.")
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--out", default=str(DEFAULT_HISTORY_PATH))
+    args = parser.parse_args()
+    added = ThemeHistory(args.out).record_all(StudyStore(args.data_dir))
+    print(f"Recorded {added} new scans to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
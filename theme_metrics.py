@@ -0,0 +1,68 @@
+# theme_metrics.py
+"""Vectorized theme metrics: one pandas/NumPy pass over all themes of a study."""
+
+import numpy as np
+import pandas as pd
+
+MOMENTUM_LABELS = ["Declining", "Plateauing", "Stable", "Rising", "Surging"]
+MATURITY_LABELS = ["Nascent", "Emerging", "Scaling", "Established"]
+
+
+def compute_theme_metrics(frame, scan_date=None):
+    """Derive velocity, growth %, momentum and maturity for every theme at once.
+
+    ``frame`` holds one row per theme with columns ``volume``, ``current_volume``,
+    ``previous_volume``, ``reported_growth`` (growth % as shipped, NaN if absent),
+    ``first_seen``/``last_seen`` (dates or NaT) and curated ``momentum``/``maturity``
+    labels ("" when absent). Curated labels win; computed ones fill the gaps.
+
+    Growth comes from the current/previous volume pair when both exist, otherwise
+    from the reported growth; velocity is the absolute month-over-month change.
+    """
+    volume = frame["volume"].astype(float).to_numpy()
+    current = frame["current_volume"].astype(float).to_numpy()
+    previous = frame["previous_volume"].astype(float).to_numpy()
+    reported = frame["reported_growth"].astype(float).to_numpy()
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        has_pair = ~np.isnan(current) & ~np.isnan(previous)
+        pair_velocity = current - previous
+        pair_growth = np.where(
+            previous > 0,
+            pair_velocity / previous * 100,
+            np.where(pair_velocity > 0, 100.0, 0.0),
+        )
+        implied_previous = volume / (1 + reported / 100)
+        growth = np.where(has_pair, pair_growth, reported)
+        velocity = np.where(has_pair, pair_velocity, volume - implied_previous)
+    velocity[~np.isfinite(velocity)] = np.nan
+
+    momentum = np.select(
+        [growth > 50, growth > 10, growth > -10, growth > -50],
+        MOMENTUM_LABELS[:0:-1],
+        default=MOMENTUM_LABELS[0],
+    ).astype(object)
+    momentum[np.isnan(growth)] = ""
+
+    first = pd.to_datetime(frame["first_seen"])
+    last = pd.to_datetime(frame["last_seen"])
+    fallback = last.max() if last.notna().any() else pd.Timestamp(scan_date or pd.Timestamp.today().normalize())
+    last = last.fillna(fallback)
+    months = ((last.dt.year - first.dt.year) * 12 + (last.dt.month - first.dt.month)).to_numpy()
+    maturity = np.select(
+        [months < 3, months < 6, months < 18],
+        MATURITY_LABELS[:3],
+        default=MATURITY_LABELS[3],
+    ).astype(object)
+
+    curated_momentum = frame["momentum"].fillna("").to_numpy(dtype=object)
+    curated_maturity = frame["maturity"].fillna("").to_numpy(dtype=object)
+    return pd.DataFrame(
+        {
+            "growth_pct": growth,
+            "velocity": np.round(velocity),
+            "momentum": np.where(curated_momentum != "", curated_momentum, momentum),
+            "maturity": np.where(curated_maturity != "", curated_maturity, maturity),
+        },
+        index=frame.index,
+    )